@@ -1,24 +1,27 @@
 import json
-import random
-from functools import lru_cache
 
 from constance.admin import Config, ConstanceAdmin
 from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import PAGE_VAR
 from django.contrib.auth.admin import GroupAdmin as BaseGroupAdmin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
+from django.core.exceptions import PermissionDenied
 from django.core.validators import EMPTY_VALUES
 from django.db import models
-from django.db.models import OuterRef, Q, Sum
-from django.http import Http404
+from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.templatetags.static import static
-from django.urls import path, reverse_lazy
+from django.urls import path, reverse, reverse_lazy
+from django.utils.decorators import method_decorator
 from django.utils.html import format_html
-from django.utils.timezone import now, timedelta
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 from django_celery_beat.admin import ClockedScheduleAdmin as BaseClockedScheduleAdmin
 from django_celery_beat.admin import CrontabScheduleAdmin as BaseCrontabScheduleAdmin
 from django_celery_beat.admin import PeriodicTaskAdmin as BasePeriodicTaskAdmin
@@ -56,8 +59,8 @@ from unfold.contrib.import_export.forms import ExportForm, ImportForm
 from unfold.contrib.inlines.admin import NonrelatedStackedInline
 from unfold.decorators import action, display
 from unfold.enums import ActionVariant
+from unfold.views import ChangeList
 from unfold.forms import AdminPasswordChangeForm, UserChangeForm, UserCreationForm
-from unfold.paginator import InfinitePaginator
 from unfold.sections import TableSection, TemplateSection
 from unfold.widgets import (
     UnfoldAdminCheckboxSelectMultiple,
@@ -67,6 +70,21 @@ from unfold.widgets import (
     UnfoldAdminTextInputWidget,
 )
 
+from formula.championship import (
+    constructor_table,
+    driver_progression,
+    get_championship,
+)
+from formula.exports import STREAMS, export_response
+from formula.history import deferred_history
+from formula.jobs import (
+    IMPORT_STREAMS,
+    confirm_import_job,
+    create_export_job,
+    create_import_job,
+)
+from formula.metrics import get_metrics, progress
+from formula.paginator import CURSOR_VAR, KeysetPaginator
 from formula.models import (
     Circuit,
     Constructor,
@@ -75,6 +93,7 @@ from formula.models import (
     DriverWithFilters,
     Profile,
     Race,
+    RollupPeriod,
     Standing,
     Tag,
     User,
@@ -83,15 +102,21 @@ from formula.models import (
     Category,
     Page,
     Media,
+    MediaKind,
     # Contact & Inquiry Models
     Contact,
     Inquiry,
     Message,
     ContentStatus,
     InquiryStatus,
+    # Import/Export Jobs
+    ImportExportJob,
+    JobStatus,
 )
+from formula.rollups import ARTICLE_VIEWS, read_rollups
 from formula.resources import AnotherConstructorResource, ConstructorResource
 from formula.sites import formula_admin_site
+from formula.thumbnails import thumbnail_url
 from formula.views import CrispyFormsetView, CrispyFormView
 from formula.forms import RichTextWidget
 
@@ -104,6 +129,208 @@ admin.site.unregister(ClockedSchedule)
 admin.site.unregister(Group)
 
 
+class KeysetChangeList(ChangeList):
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        # 搜索表单会把 params 作为隐藏字段提交
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        # 游标不是过滤条件
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # 修改过滤或排序后从第一页重新开始
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+
+
+class KeysetPaginationMixin:
+    """后台列表使用游标分页，深层页面和第一页的开销相同"""
+
+    paginator = KeysetPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_paginator(
+        self, request, queryset, per_page, orphans=0, allow_empty_first_page=True
+    ):
+        return self.paginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            cursor=request.GET.get(CURSOR_VAR),
+        )
+
+
+class DeferredHistoryMixin:
+    """列表页批量编辑时，所有修改的历史记录在最后一次写入"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method == "POST" and "_save" in request.POST:
+            with deferred_history():
+                return super().changelist_view(request, extra_context)
+
+        return super().changelist_view(request, extra_context)
+
+
+class StreamingExportMixin:
+    """以 CSV/XLSX 流式导出列表
+
+    列表页的导出按钮使用当前的过滤、搜索和排序条件，批量操作导出选中的对象。
+    export_fields 是 values_list() 使用的字段路径。
+    """
+
+    export_fields = None
+
+    def get_export_fields(self, request):
+        return self.export_fields or [
+            field.attname for field in self.model._meta.concrete_fields
+        ]
+
+    def has_export_permission(self, request):
+        return self.has_view_permission(request)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+
+        if actions is not None and self.has_export_permission(request):
+            for name in ("export_selected_csv", "export_selected_xlsx"):
+                actions.setdefault(name, self.get_action(name))
+
+        return actions
+
+    def export_queryset(self, request, queryset, export_format):
+        return export_response(
+            queryset,
+            self.get_export_fields(request),
+            export_format,
+            f"{self.model._meta.model_name}-{now():%Y%m%d-%H%M%S}",
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, "context_data", None)
+
+        # 导出按钮的链接带上列表页的过滤、搜索和排序条件
+        if context and context.get("actions_list"):
+            params = request.GET.copy()
+
+            for name in (PAGE_VAR, CURSOR_VAR):
+                params.pop(name, None)
+
+            if params:
+                paths = {
+                    reverse(
+                        f"{self.admin_site.name}:{self.opts.app_label}_"
+                        f"{self.opts.model_name}_{name}"
+                    )
+                    for name in ("export_csv", "export_xlsx")
+                }
+
+                for item in context["actions_list"]:
+                    for link in item.get("items", [item]):
+                        if link.get("path") in paths:
+                            link["path"] = f"{link['path']}?{params.urlencode()}"
+
+        return response
+
+    def export_changelist(self, request, export_format):
+        # 过滤条件是列表页通过导出链接传递的查询参数，没有参数时导出整个列表
+        changelist = self.get_changelist_instance(request)
+        return self.export_queryset(request, changelist.queryset, export_format)
+
+    @action(description=_("Export CSV"), icon="download", permissions=["export"])
+    def export_csv(self, request):
+        return self.export_changelist(request, "csv")
+
+    @action(description=_("Export XLSX"), icon="download", permissions=["export"])
+    def export_xlsx(self, request):
+        return self.export_changelist(request, "xlsx")
+
+    @action(description=_("Export selected as CSV"), permissions=["export"])
+    def export_selected_csv(self, request, queryset):
+        return self.export_queryset(request, queryset, "csv")
+
+    @action(description=_("Export selected as XLSX"), permissions=["export"])
+    def export_selected_xlsx(self, request, queryset):
+        return self.export_queryset(request, queryset, "xlsx")
+
+
+class BackgroundImportExportMixin:
+    """ImportExportModelAdmin 的导入和 CSV/XLSX 导出交给后台任务执行
+
+    导入先由后台任务预览，确认后再创建导入任务；启用 skip_import_confirm 时
+    直接导入。提交后跳转到任务页面，页面轮询进度，完成后可以确认导入或下载
+    导出文件。只提供可以逐行读取的导入格式，资源类在任务中不带参数实例化。
+    """
+
+    def get_import_formats(self):
+        return [
+            file_format
+            for file_format in super().get_import_formats()
+            if file_format().get_extension() in IMPORT_STREAMS
+        ]
+
+    def _do_file_export(self, file_format, request, queryset, export_form=None):
+        if file_format.get_extension() not in STREAMS:
+            return super()._do_file_export(file_format, request, queryset, export_form)
+
+        # 任务中用列表页的查询参数重新查询，只有勾选的对象才保存主键
+        pks = None
+
+        if export_form is not None and "export_items" in export_form.changed_data:
+            pks = export_form.cleaned_data["export_items"]
+        elif request.POST.get("action") and request.POST.get("select_across") != "1":
+            pks = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+
+        job = create_export_job(
+            request.user,
+            self.choose_export_resource_class(export_form, request),
+            file_format,
+            self.model,
+            request.GET.urlencode(),
+            pks,
+            self.get_export_resource_fields_from_form(export_form),
+        )
+        return self.redirect_to_job(request, job)
+
+    def import_action(self, request, **kwargs):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        if request.method == "POST":
+            import_form = self.create_import_form(request)
+
+            if import_form.is_valid():
+                import_formats = self.get_import_formats()
+                file_format = import_formats[int(import_form.cleaned_data["format"])]()
+                job = create_import_job(
+                    request.user,
+                    self.choose_import_resource_class(import_form, request),
+                    file_format,
+                    self.model,
+                    import_form.cleaned_data["import_file"],
+                    dry_run=not self.is_skip_import_confirm_enabled(),
+                )
+                return self.redirect_to_job(request, job)
+
+        return super().import_action(request, **kwargs)
+
+    def redirect_to_job(self, request, job):
+        messages.info(
+            request,
+            _("%(job)s is running in the background.") % {"job": job},
+        )
+        return redirect(
+            f"{self.admin_site.name}:formula_importexportjob_change", job.pk
+        )
+
+
 class UnfoldTaskSelectWidget(UnfoldAdminSelectWidget, TaskSelectWidget):
     pass
 
@@ -306,7 +533,12 @@ class DriverTableSection(TableSection):
 
 
 @admin.register(Constructor, site=formula_admin_site)
-class ConstructorAdmin(ModelAdmin, ImportExportModelAdmin, ExportActionModelAdmin):
+class ConstructorAdmin(
+    BackgroundImportExportMixin,
+    ModelAdmin,
+    ImportExportModelAdmin,
+    ExportActionModelAdmin,
+):
     search_fields = ["name"]
     list_display = ["name"]
     list_sections = [DriverTableSection]
@@ -534,9 +766,13 @@ class ContructorTableSection(TableSection):
         "custom_field",
     ]
 
-    @admin.display(description=_("Points"))
+    @admin.display(description=_("Season points"))
     def custom_field(self, instance):
-        return random.randint(0, 50)
+        points = {
+            row["constructor"]: row["points"]
+            for row in constructor_table(get_championship())
+        }
+        return points.get(instance.pk, "-")
 
 
 class ChartSection(TemplateSection):
@@ -598,27 +834,15 @@ class DriverAdminMixin(ModelAdmin):
         return (
             super()
             .get_queryset(request)
-            .annotate(total_points=Sum("standing__points"))
-            .annotate(
-                constructor_name=Constructor.objects.filter(
-                    standing__driver_id=OuterRef("pk")
-                ).values("name")[:1]
-            )
-            .prefetch_related(
-                "constructors",
-                "race_set",
-                "race_set__circuit",
-                "standings",
-                "standings__race",
-                "standings__race__circuit",
-            )
+            .select_related("statistics")
+            .prefetch_related("constructors")
         )
 
     @display(description=_("Driver"), header=True)
     def display_header(self, instance: Driver) -> list:
-        standing = instance.standings.all().first()
+        statistics = getattr(instance, "statistics", None)
 
-        if not standing:
+        if not statistics or not statistics.total_races:
             return []
 
         return [
@@ -670,13 +894,15 @@ class DriverAdminMixin(ModelAdmin):
             # "width": 320,  # Optional
         }
 
-    @display(description=_("Total points"), ordering="total_points")
+    @display(description=_("Total points"), ordering="statistics__total_points")
     def display_total_points(self, instance: Driver):
-        return instance.total_points
+        statistics = getattr(instance, "statistics", None)
+        return statistics.total_points if statistics else None
 
-    @display(description=_("Total wins"))
+    @display(description=_("Total wins"), ordering="statistics__total_wins")
     def display_total_wins(self, instance: Driver):
-        return instance.race_set.count()
+        statistics = getattr(instance, "statistics", None)
+        return statistics.total_wins if statistics else 0
 
     @display(
         description=_("Status"),
@@ -697,7 +923,24 @@ class DriverAdminMixin(ModelAdmin):
 
 
 @admin.register(Driver, site=formula_admin_site)
-class DriverAdmin(GuardedModelAdmin, SimpleHistoryAdmin, DriverAdminMixin):
+class DriverAdmin(
+    StreamingExportMixin, GuardedModelAdmin, SimpleHistoryAdmin, DriverAdminMixin
+):
+    export_fields = [
+        "first_name",
+        "last_name",
+        "code",
+        "category",
+        "status",
+        "born_at",
+        "first_race_at",
+        "last_race_at",
+        "statistics__total_points",
+        "statistics__total_wins",
+        "statistics__total_races",
+        "is_active",
+        "is_retired",
+    ]
     fieldsets = [
         (
             None,
@@ -760,6 +1003,10 @@ class DriverAdmin(GuardedModelAdmin, SimpleHistoryAdmin, DriverAdminMixin):
                 "changelist_action5",
             ],
         },
+        {
+            "title": _("Export"),
+            "items": ["export_csv", "export_xlsx"],
+        },
     ]
     actions_detail = [
         "change_detail_action3",
@@ -953,7 +1200,7 @@ class DriverWithFiltersAdmin(DriverAdminMixin):
 
 
 @admin.register(Race, site=formula_admin_site)
-class RaceAdmin(ModelAdmin):
+class RaceAdmin(StreamingExportMixin, ModelAdmin):
     date_hierarchy = "date"
     search_fields = [
         "circuit__name",
@@ -975,10 +1222,20 @@ class RaceAdmin(ModelAdmin):
     list_display = ["circuit", "winner", "year", "laps", "date"]
     list_fullwidth = True
     autocomplete_fields = ["circuit", "winner"]
+    actions_list = ["export_csv", "export_xlsx"]
+    export_fields = [
+        "circuit__name",
+        "circuit__country",
+        "year",
+        "date",
+        "laps",
+        "winner__first_name",
+        "winner__last_name",
+    ]
 
 
 @admin.register(Standing, site=formula_admin_site)
-class StandingAdmin(ModelAdmin):
+class StandingAdmin(StreamingExportMixin, KeysetPaginationMixin, ModelAdmin):
     # list_disable_select_all = True
     search_fields = [
         "race__circuit__name",
@@ -991,10 +1248,21 @@ class StandingAdmin(ModelAdmin):
     list_filter = ["driver"]
     autocomplete_fields = ["driver", "constructor", "race"]
     readonly_fields = ["laps"]
-    paginator = InfinitePaginator
-    show_full_result_count = False
+    ordering = ["weight", "created_at", "pk"]
     list_disable_select_all = True
     list_per_page = 10
+    actions_list = ["export_csv", "export_xlsx"]
+    export_fields = [
+        "race__circuit__name",
+        "race__date",
+        "driver__first_name",
+        "driver__last_name",
+        "constructor__name",
+        "position",
+        "number",
+        "laps",
+        "points",
+    ]
 
 
 try:
@@ -1009,24 +1277,41 @@ except (ImportError, RuntimeError):
     pass
 
 
-@lru_cache
-def tracker_random_data():
-    data = []
+TRACKER_DAYS = 63
 
-    for _i in range(1, 64):
-        has_value = random.choice([True, True, True, True, False])
-        color = None
-        tooltip = None
+COHORT_WEEKS = 8
 
-        if has_value:
-            value = random.randint(2, 6)
-            color = "bg-primary-500"
-            tooltip = f"Value {value}"
+COHORT_SERIES = [
+    ("races", _("Races")),
+    ("points", _("Points")),
+    (ARTICLE_VIEWS, _("Article views")),
+    ("contacts", _("Contacts")),
+    ("inquiries", _("Inquiries")),
+    ("messages", _("Messages")),
+]
+
+
+def intensity(value, maximum, steps=8):
+    """把数值映射为 1 到 steps 的颜色深度，没有数值时返回 0"""
+    if not value or not maximum:
+        return 0
+
+    return max(1, round(value * steps / maximum))
+
+
+def tracker_data():
+    days, values = read_rollups([ARTICLE_VIEWS], RollupPeriod.DAY, TRACKER_DAYS)
+    views = values[ARTICLE_VIEWS]
+    maximum = max(views)
+    data = []
+
+    for day, value in zip(days, views, strict=True):
+        level = intensity(value, maximum, steps=5)
 
         data.append(
             {
-                "color": color,
-                "tooltip": tooltip,
+                "color": f"bg-primary-{level + 4}00" if level else None,
+                "tooltip": f"{day:%B %d, %Y}: {value:,.0f} views",
             }
         )
 
@@ -1037,26 +1322,25 @@ def tracker_random_data():
 class TrackerComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["data"] = tracker_random_data()
+        context["data"] = tracker_data()
         return context
 
 
-@lru_cache
-def cohort_random_data():
+def cohort_data():
+    """最近几周每个序列的周汇总，颜色按每列的最大值计算"""
+    names = [name for name, _label in COHORT_SERIES]
+    weeks, values = read_rollups(names, RollupPeriod.WEEK, COHORT_WEEKS)
+    totals = {name: sum(values[name]) for name in names}
+    maxima = {name: max(values[name]) for name in names}
     rows = []
-    headers = []
-    cols = []
-
-    dates = reversed(
-        [(now() - timedelta(days=x)).strftime("%B %d, %Y") for x in range(8)]
-    )
-    groups = range(1, 10)
 
-    for row_index, date in enumerate(dates):
+    for index, week in enumerate(reversed(weeks)):
+        position = len(weeks) - index - 1
         cols = []
 
-        for col_index, _col in enumerate(groups):
-            color_index = 8 - row_index - col_index
+        for name in names:
+            value = values[name][position]
+            color_index = intensity(value, maxima[name])
             col_classes = []
 
             if color_index > 0:
@@ -1070,44 +1354,28 @@ def cohort_random_data():
             if color_index >= 6:
                 col_classes.append("dark:text-base-800")
 
-            value = random.randint(
-                4000 - (col_index * row_index * 225),
-                5000 - (col_index * row_index * 225),
-            )
-
-            subtitle = f"{random.randint(10, 100)}%"
-
-            if value <= 0:
-                value = 0
-                subtitle = None
-
             cols.append(
                 {
-                    "value": value,
+                    "value": f"{value:,.0f}",
                     "color": " ".join(col_classes),
-                    "subtitle": subtitle,
+                    "subtitle": f"{value * 100 / totals[name]:.0f}%" if value else None,
                 }
             )
 
         rows.append(
             {
                 "header": {
-                    "title": date,
-                    "subtitle": f"Total {sum(col['value'] for col in cols):,}",
+                    "title": week.strftime("%B %d, %Y"),
+                    "subtitle": _("Week %(week)s") % {"week": week.isocalendar()[1]},
                 },
                 "cols": cols,
             }
         )
 
-    for index, group in enumerate(groups):
-        total = sum(row["cols"][index]["value"] for row in rows)
-
-        headers.append(
-            {
-                "title": f"Group #{group}",
-                "subtitle": f"Total {total:,}",
-            }
-        )
+    headers = [
+        {"title": label, "subtitle": f"Total {totals[name]:,.0f}"}
+        for name, label in COHORT_SERIES
+    ]
 
     return {
         "headers": headers,
@@ -1119,22 +1387,31 @@ def cohort_random_data():
 class CohortComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["data"] = cohort_random_data()
+        context["data"] = cohort_data()
         return context
 
 
+def kpi_progress(total, change=None, share=None):
+    # 占比没有方向，只显示百分比
+    if share is not None:
+        trend, percentage = None, f"{share:.1f}%"
+    else:
+        trend, percentage = progress(change)
+
+    return render_to_string(
+        "formula/helpers/kpi_progress.html",
+        {"total": total, "progress": trend, "percentage": percentage},
+    )
+
+
 @register_component
 class DriverActiveComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        drivers = get_metrics()["drivers"]
 
-        context["children"] = render_to_string(
-            "formula/helpers/kpi_progress.html",
-            {
-                "total": Driver.objects.filter(status=DriverStatus.ACTIVE).count(),
-                "progress": "positive",
-                "percentage": "2.8%",
-            },
+        context["children"] = kpi_progress(
+            drivers["active"], share=drivers["active_share"] or 0
         )
         return context
 
@@ -1143,14 +1420,10 @@ class DriverActiveComponent(BaseComponent):
 class DriverInactiveComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        drivers = get_metrics()["drivers"]
 
-        context["children"] = render_to_string(
-            "formula/helpers/kpi_progress.html",
-            {
-                "total": Driver.objects.filter(status=DriverStatus.INACTIVE).count(),
-                "progress": "negative",
-                "percentage": "-12.8%",
-            },
+        context["children"] = kpi_progress(
+            drivers["inactive"], share=drivers["inactive_share"] or 0
         )
         return context
 
@@ -1159,17 +1432,9 @@ class DriverInactiveComponent(BaseComponent):
 class DriverTotalPointsComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        points = get_metrics()["points"]
 
-        context["children"] = render_to_string(
-            "formula/helpers/kpi_progress.html",
-            {
-                "total": Standing.objects.aggregate(total_points=Sum("points"))[
-                    "total_points"
-                ],
-                "progress": "positive",
-                "percentage": "24.2%",
-            },
-        )
+        context["children"] = kpi_progress(points["total"], change=points["change"])
         return context
 
 
@@ -1177,15 +1442,9 @@ class DriverTotalPointsComponent(BaseComponent):
 class DriverRacesComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        races = get_metrics()["races"]
 
-        context["children"] = render_to_string(
-            "formula/helpers/kpi_progress.html",
-            {
-                "total": Race.objects.count(),
-                "progress": "negative",
-                "percentage": "-10.0%",
-            },
-        )
+        context["children"] = kpi_progress(races["total"], change=races["change"])
         return context
 
 
@@ -1193,25 +1452,19 @@ class DriverRacesComponent(BaseComponent):
 class DriverSectionChangeComponent(BaseComponent):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        WEEKDAYS = [
-            "Mon",
-            "Tue",
-            "Wed",
-            "Thu",
-            "Fri",
-            "Sat",
-            "Sun",
-        ]
-        OF_DAYS = 21
+        championship = get_championship()
+        progression = driver_progression(championship, kwargs.get("driver"))
 
         context["data"] = json.dumps(
             {
-                "labels": [WEEKDAYS[day % 7] for day in range(1, OF_DAYS)],
+                "labels": [
+                    championship.labels["races"][race]
+                    for race, _points, _rank in progression
+                ],
                 "datasets": [
                     {
-                        "data": [
-                            [1, random.randrange(8, OF_DAYS)] for i in range(1, OF_DAYS)
-                        ],
+                        "label": str(_("Points")),
+                        "data": [float(points) for _race, points, _rank in progression],
                         "backgroundColor": "var(--color-primary-600)",
                     }
                 ],
@@ -1231,7 +1484,7 @@ class ConstanceConfigAdmin(ConstanceAdmin):
 
 
 @admin.register(Category, site=formula_admin_site)
-class CategoryAdmin(ModelAdmin, SimpleHistoryAdmin):
+class CategoryAdmin(DeferredHistoryMixin, ModelAdmin, SimpleHistoryAdmin):
     list_display = ["name", "slug", "parent", "is_active", "order", "created_at"]
     list_filter = [
         "is_active",
@@ -1251,7 +1504,7 @@ class CategoryAdmin(ModelAdmin, SimpleHistoryAdmin):
 
 
 @admin.register(Article, site=formula_admin_site)
-class ArticleAdmin(ModelAdmin, SimpleHistoryAdmin):
+class ArticleAdmin(DeferredHistoryMixin, ModelAdmin, SimpleHistoryAdmin):
     formfield_overrides = {
         models.TextField: {
             "widget": RichTextWidget,
@@ -1302,7 +1555,7 @@ class ArticleAdmin(ModelAdmin, SimpleHistoryAdmin):
 
 
 @admin.register(Page, site=formula_admin_site)
-class PageAdmin(ModelAdmin, SimpleHistoryAdmin):
+class PageAdmin(DeferredHistoryMixin, ModelAdmin, SimpleHistoryAdmin):
     formfield_overrides = {
         models.TextField: {
             "widget": RichTextWidget,
@@ -1339,14 +1592,25 @@ class PageAdmin(ModelAdmin, SimpleHistoryAdmin):
 
 @admin.register(Media, site=formula_admin_site)
 class MediaAdmin(ModelAdmin):
-    list_display = ["title", "file_type", "file_size", "uploaded_by", "created_at", "preview"]
+    list_display = ["title", "media_kind", "file_type", "file_size", "uploaded_by", "created_at", "preview"]
     list_filter = [
+        "media_kind",
         "file_type",
         ("uploaded_by", RelatedDropdownFilter),
         "created_at",
     ]
     search_fields = ["title", "description", "alt_text"]
-    readonly_fields = ["file_type", "file_size", "preview"]
+    readonly_fields = [
+        "media_kind",
+        "file_type",
+        "file_size",
+        "preview",
+        "checksum",
+        "width",
+        "height",
+        "duration",
+        "metadata_extracted_at",
+    ]
     ordering = ["-created_at"]
     
     def save_model(self, request, obj, form, change):
@@ -1357,12 +1621,11 @@ class MediaAdmin(ModelAdmin):
     def preview(self, obj):
         """显示文件预览"""
         if obj.file:
-            file_ext = obj.file_type.lower()
-            if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                return f'<img src="{obj.file.url}" style="max-width: 50px; max-height: 50px;" />'
-            elif file_ext in ['.mp4', '.avi', '.mov', '.wmv']:
+            if obj.media_kind == MediaKind.IMAGE:
+                return f'<img src="{thumbnail_url(obj.file, 100)}" style="max-width: 50px; max-height: 50px;" />'
+            elif obj.media_kind == MediaKind.VIDEO:
                 return f'<video width="50" height="50" controls><source src="{obj.file.url}" type="video/mp4"></video>'
-            elif file_ext in ['.mp3', '.wav', '.ogg']:
+            elif obj.media_kind == MediaKind.AUDIO:
                 return f'<audio controls style="width: 100px;"><source src="{obj.file.url}" type="audio/mpeg"></audio>'
             else:
                 return f'<i class="fas fa-file" style="font-size: 20px;"></i> {obj.file_type}'
@@ -1373,9 +1636,20 @@ class MediaAdmin(ModelAdmin):
     fieldsets = (
         (
             _("File Information"),
-            {"fields": ("title", "file", "file_type", "file_size", "preview")},
+            {"fields": ("title", "file", "media_kind", "file_type", "file_size", "preview")},
         ),
         (_("Description"), {"fields": ("alt_text", "description")}),
+        (
+            _("Metadata"),
+            {
+                "fields": (
+                    "checksum",
+                    ("width", "height", "duration"),
+                    "metadata_extracted_at",
+                ),
+                "classes": ("collapse",),
+            },
+        ),
         (
             _("Upload Information"),
             {"fields": ("uploaded_by",), "classes": ("collapse",)},
@@ -1451,7 +1725,7 @@ class ContactAdmin(ModelAdmin):
 
 
 @admin.register(Inquiry, site=formula_admin_site)
-class InquiryAdmin(ModelAdmin):
+class InquiryAdmin(StreamingExportMixin, ModelAdmin):
     # 禁用新增、删除和历史记录功能
     object_history_template = None  # 隐藏历史记录模板
     
@@ -1509,6 +1783,21 @@ class InquiryAdmin(ModelAdmin):
     )
 
     actions = ["assign_to_me", "mark_as_responded"]
+    actions_list = ["export_csv", "export_xlsx"]
+    export_fields = [
+        "name",
+        "email",
+        "phone",
+        "company",
+        "product_interest",
+        "quantity",
+        "budget",
+        "message",
+        "status",
+        "assigned_to__username",
+        "created_at",
+        "responded_at",
+    ]
 
     @action(
         description=_("Assign selected inquiries to me"),
@@ -1541,7 +1830,7 @@ class InquiryAdmin(ModelAdmin):
 
 
 @admin.register(Message, site=formula_admin_site)
-class MessageAdmin(ModelAdmin):
+class MessageAdmin(StreamingExportMixin, ModelAdmin):
 
     
     def has_add_permission(self, request):
@@ -1578,6 +1867,17 @@ class MessageAdmin(ModelAdmin):
     )
 
     actions = ["mark_as_read", "mark_as_unread", "mark_as_spam", "mark_as_not_spam"]
+    actions_list = ["export_csv", "export_xlsx"]
+    export_fields = [
+        "name",
+        "email",
+        "subject",
+        "message",
+        "is_read",
+        "is_spam",
+        "created_at",
+        "responded_at",
+    ]
 
     @action(
         description=_("Mark selected messages as read"),
@@ -1622,3 +1922,151 @@ class MessageAdmin(ModelAdmin):
             _("Successfully marked %(count)d messages as not spam.")
             % {"count": updated},
         )
+
+
+######################################################################
+# Import/Export Jobs Admin
+######################################################################
+
+
+@admin.register(ImportExportJob, site=formula_admin_site)
+class ImportExportJobAdmin(ModelAdmin):
+    list_display = [
+        "__str__",
+        "content_type",
+        "display_status",
+        "display_progress",
+        "created_by",
+        "created_at",
+        "finished_at",
+    ]
+    list_filter = ["kind", "status", "created_at"]
+    fields = [
+        "kind",
+        "status",
+        "content_type",
+        "resource",
+        "file_format",
+        "input_file",
+        "total",
+        "processed",
+        "summary",
+        "error",
+        "created_by",
+        "created_at",
+        "started_at",
+        "finished_at",
+    ]
+    readonly_fields = fields
+    change_form_before_template = "formula/job_progress.html"
+
+    def get_queryset(self, request):
+        queryset = (
+            super().get_queryset(request).select_related("content_type", "created_by")
+        )
+
+        # 其他用户的导出文件可能包含当前用户无权查看的数据
+        if not request.user.is_superuser:
+            queryset = queryset.filter(created_by=request.user)
+
+        return queryset
+
+    def has_module_permission(self, request):
+        return True
+
+    def has_view_permission(self, request, obj=None):
+        # 导入导出后会跳转到任务页面，创建者总是可以查看自己的任务
+        if obj is None or obj.created_by_id == request.user.pk:
+            return True
+
+        return super().has_view_permission(request, obj)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<path:object_id>/progress/",
+                self.admin_site.admin_view(self.progress_view),
+                name="formula_importexportjob_progress",
+            ),
+            path(
+                "<path:object_id>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="formula_importexportjob_download",
+            ),
+            path(
+                "<path:object_id>/confirm/",
+                self.admin_site.admin_view(self.confirm_view),
+                name="formula_importexportjob_confirm",
+            ),
+        ] + super().get_urls()
+
+    def progress_view(self, request, object_id):
+        job = get_object_or_404(self.get_queryset(request), pk=object_id)
+
+        return JsonResponse(
+            {
+                "status": job.status,
+                "processed": job.processed,
+                "total": job.total,
+                "percentage": job.percentage,
+                "finished": job.is_finished,
+            }
+        )
+
+    def download_view(self, request, object_id):
+        job = get_object_or_404(self.get_queryset(request), pk=object_id)
+
+        if not job.result_file:
+            raise Http404
+
+        return FileResponse(
+            job.result_file.open("rb"),
+            as_attachment=True,
+            filename=job.result_file.name.rsplit("/", 1)[-1],
+        )
+
+    @method_decorator(require_POST)
+    def confirm_view(self, request, object_id):
+        preview = get_object_or_404(
+            self.get_queryset(request), pk=object_id, created_by=request.user
+        )
+        model_admin = self.admin_site._registry.get(preview.content_type.model_class())
+
+        if (
+            not preview.can_confirm
+            or model_admin is None
+            or not model_admin.has_import_permission(request)
+        ):
+            raise PermissionDenied
+
+        # 重复提交时跳转到已经创建的导入任务
+        job = ImportExportJob.objects.filter(options__preview=preview.pk).first()
+
+        if job is not None:
+            return redirect(
+                f"{self.admin_site.name}:formula_importexportjob_change", job.pk
+            )
+
+        return model_admin.redirect_to_job(request, confirm_import_job(preview))
+
+    @display(
+        description=_("Status"),
+        label={
+            JobStatus.PENDING: "info",
+            JobStatus.RUNNING: "warning",
+            JobStatus.COMPLETED: "success",
+            JobStatus.FAILED: "danger",
+        },
+    )
+    def display_status(self, instance):
+        return instance.status
+
+    @display(description=_("Progress"))
+    def display_progress(self, instance):
+        return f"{instance.percentage}%"
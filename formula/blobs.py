@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from formula.models import Article, Blob, Category, Driver, Media, Profile
+from formula.storage import blob_storage
+from formula.thumbnails import delete_thumbnails
+
+# 使用内容寻址存储的文件字段
+BLOB_FIELDS = [
+    (Media, "file"),
+    (Article, "featured_image"),
+    (Category, "image"),
+    (Driver, "picture"),
+    (Profile, "picture"),
+]
+
+BLOB_BATCH_SIZE = 500
+
+
+def blob_field(model):
+    for blob_model, field in BLOB_FIELDS:
+        if blob_model is model:
+            return field
+
+    return None
+
+
+def change_references(names, delta):
+    """调整引用计数，names 中重复的名称会被累加"""
+    for name, count in Counter(name for name in names if name).items():
+        Blob.objects.filter(name=name).update(
+            reference_count=F("reference_count") + count * delta
+        )
+
+
+def count_references():
+    """从所有文件字段重新统计引用次数"""
+    counts = Counter()
+
+    for model, field in BLOB_FIELDS:
+        rows = (
+            model.objects.exclude(**{f"{field}__isnull": True})
+            .exclude(**{field: ""})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values_list(field, "total")
+        )
+        counts.update(dict(rows))
+
+    return counts
+
+
+def recount_references():
+    """修正引用计数，queryset.update() 等绕过信号的修改会导致计数不准"""
+    counts = count_references()
+    blobs = []
+
+    for blob in Blob.objects.only("pk", "name", "reference_count").iterator(
+        chunk_size=BLOB_BATCH_SIZE
+    ):
+        if blob.reference_count != counts.get(blob.name, 0):
+            blob.reference_count = counts.get(blob.name, 0)
+            blobs.append(blob)
+
+    Blob.objects.bulk_update(blobs, ["reference_count"], batch_size=BLOB_BATCH_SIZE)
+    return len(blobs)
+
+
+def _delete_orphan(blob, cutoff):
+    """在行锁中重新检查引用和时间，期间被重新上传的文件不会被删除"""
+    with transaction.atomic():
+        blob = (
+            Blob.objects.select_for_update()
+            .filter(pk=blob.pk, reference_count__lte=0, modified_at__lt=cutoff)
+            .first()
+        )
+
+        if blob is None:
+            return None
+
+        blob_storage().delete(blob.name)
+        delete_thumbnails(blob.name)
+        blob.delete()
+
+    return blob
+
+
+def collect_garbage(min_age, dry_run=False):
+    """删除没有被引用且超过 min_age 的文件及其缩略图，返回删除的 Blob 列表
+
+    刚上传但还没有保存到模型中的文件同样没有引用，所以需要保留一段时间。
+    重复上传会更新 modified_at，年龄从最后一次上传开始计算。
+    """
+    recount_references()
+
+    cutoff = timezone.now() - min_age
+    orphans = list(Blob.objects.filter(reference_count__lte=0, modified_at__lt=cutoff))
+
+    if dry_run:
+        return orphans
+
+    deleted = [_delete_orphan(blob, cutoff) for blob in orphans]
+    return [blob for blob in deleted if blob is not None]
@@ -0,0 +1,85 @@
+import hashlib
+import time
+
+from constance import config
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.translation import get_language
+
+PAGE_CACHE_PREFIX = "page-cache"
+
+
+def _version_key(namespace):
+    return f"{PAGE_CACHE_PREFIX}:version:{namespace}"
+
+
+def page_cache_versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+
+    # 版本号从当前时间开始，缓存被清空后旧的页面不会被重新命中
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    for key, version in missing.items():
+        cache.add(key, version, timeout=None)
+
+    if missing:
+        versions.update(cache.get_many(list(missing)))
+
+    return [versions.get(key, 0) for key in keys]
+
+
+def invalidate_page_cache(*namespaces):
+    """让依赖这些命名空间的所有页面缓存失效"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def page_cache_key(request, namespaces):
+    query = sorted(request.GET.lists())
+    digest = hashlib.md5(
+        f"{request.path}?{query}".encode(), usedforsecurity=False
+    ).hexdigest()
+    versions = ".".join(str(version) for version in page_cache_versions(namespaces))
+    return f"{PAGE_CACHE_PREFIX}:{versions}:{get_language()}:{digest}"
+
+
+class CachedPageMixin:
+    """缓存公开页面的渲染结果，TTL 由 SITE_CACHE_TTL 控制"""
+
+    cache_namespaces = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        # 有待显示的消息时不能使用缓存
+        if request.method not in ("GET", "HEAD") or len(get_messages(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = page_cache_key(request, self.cache_namespaces)
+        cached = cache.get(key)
+
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        def store(response):
+            timeout = config.SITE_CACHE_TTL
+
+            if timeout and timeout > 0:
+                cache.set(key, (response.content, response["Content-Type"]), timeout)
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+
+        return response
@@ -0,0 +1,9 @@
+from os import environ
+
+from celery import Celery
+
+environ.setdefault("DJANGO_SETTINGS_MODULE", "formula.settings")
+
+app = Celery("formula")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
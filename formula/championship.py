@@ -0,0 +1,237 @@
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from formula.models import Race, Standing
+
+CHAMPIONSHIP_CACHE_PREFIX = "championship"
+
+# 矩阵的行是比赛（按日期排序），列是车手或车队，积分按分保存为整数
+Championship = namedtuple(
+    "Championship",
+    [
+        "season",
+        "races",
+        "drivers",
+        "constructors",
+        "points",
+        "wins",
+        "ranks",
+        "positions",
+        "constructor_points",
+        "labels",
+    ],
+)
+
+
+def load_standings(season):
+    """一次查询读取整个赛季的成绩，返回按列保存的数据和比赛、车手、车队的名称"""
+    rows = (
+        Standing.objects.filter(race__year=season)
+        .order_by("race__date", "race_id")
+        .values_list(
+            "race_id",
+            "driver_id",
+            "constructor_id",
+            "position",
+            "points",
+            "race__circuit__name",
+            "driver__first_name",
+            "driver__last_name",
+            "constructor__name",
+        )
+    )
+
+    columns = ([], [], [], [], [])
+    labels = {"races": {}, "drivers": {}, "constructors": {}}
+
+    for race, driver, constructor, position, points, circuit, first, last, name in rows:
+        for column, value in zip(
+            columns,
+            (race, driver, constructor, position, round(points * 100)),
+            strict=True,
+        ):
+            column.append(value)
+
+        labels["races"].setdefault(race, circuit)
+        labels["drivers"].setdefault(driver, f"{first} {last}")
+        labels["constructors"].setdefault(constructor, name)
+
+    return columns, labels
+
+
+def _compute(race, driver, constructor, position, points):
+    race, driver, constructor, position, points = (
+        np.asarray(column, dtype=np.int64)
+        for column in (race, driver, constructor, position, points)
+    )
+
+    # 成绩按比赛排序，比赛编号变化的地方是新的一行
+    starts = np.r_[True, race[1:] != race[:-1]]
+    race_index = np.cumsum(starts) - 1
+    drivers, driver_index = np.unique(driver, return_inverse=True)
+    constructors, constructor_index = np.unique(constructor, return_inverse=True)
+    shape = (int(starts.sum()), len(drivers))
+
+    scored = np.zeros(shape, dtype=np.int64)
+    np.add.at(scored, (race_index, driver_index), points)
+    wins = np.zeros(shape, dtype=np.int64)
+    np.add.at(wins, (race_index, driver_index), position == 1)
+    positions = np.zeros(shape, dtype=np.int64)
+    positions[race_index, driver_index] = position
+    constructor_scored = np.zeros((shape[0], len(constructors)), dtype=np.int64)
+    np.add.at(constructor_scored, (race_index, constructor_index), points)
+
+    points = scored.cumsum(axis=0)
+    wins = wins.cumsum(axis=0)
+
+    # 积分相同时胜场多的排在前面，完全相同的名次并列
+    key = points * (shape[0] + 1) + wins
+    ranks = (key[:, None, :] > key[:, :, None]).sum(axis=2) + 1
+
+    return (
+        race[starts].tolist(),
+        drivers.tolist(),
+        constructors.tolist(),
+        points.tolist(),
+        wins.tolist(),
+        ranks.tolist(),
+        positions.tolist(),
+        constructor_scored.cumsum(axis=0).tolist(),
+    )
+
+
+def latest_season():
+    return Race.objects.aggregate(season=Max("year"))["season"]
+
+
+def compute_championship(season=None):
+    """用 NumPy 矩阵运算计算一个赛季（默认最近的赛季）每场比赛后的积分、胜场和排名"""
+    if season is None:
+        season = latest_season()
+
+    columns, labels = load_standings(season)
+
+    if not columns[0]:
+        return Championship(season, [], [], [], [], [], [], [], [], labels)
+
+    return Championship(season, *_compute(*columns), labels)
+
+
+def _version_key():
+    return f"{CHAMPIONSHIP_CACHE_PREFIX}:version"
+
+
+def _cache_key(season):
+    version = cache.get(_version_key())
+
+    if version is None:
+        version = time.time_ns()
+        cache.add(_version_key(), version, timeout=None)
+
+    return f"{CHAMPIONSHIP_CACHE_PREFIX}:{version}:{season or 'latest'}"
+
+
+def get_championship(season=None):
+    key = _cache_key(season)
+    championship = cache.get(key)
+
+    if championship is None:
+        championship = compute_championship(season)
+        cache.set(key, championship, settings.DASHBOARD_METRICS_TTL)
+
+    return championship
+
+
+def _invalidate():
+    try:
+        cache.incr(_version_key())
+    except ValueError:
+        cache.set(_version_key(), time.time_ns(), timeout=None)
+
+
+def invalidate_championships():
+    """提交后让所有赛季的缓存失效"""
+    transaction.on_commit(_invalidate)
+
+
+def _points(cents):
+    return Decimal(cents) / 100
+
+
+def driver_table(championship):
+    """最后一场比赛后的车手积分榜，change 是相对上一场比赛上升的名次"""
+    if not championship.races:
+        return []
+
+    ranks = championship.ranks[-1]
+    previous = championship.ranks[-2] if len(championship.races) > 1 else None
+    table = [
+        {
+            "driver": driver,
+            "name": championship.labels["drivers"][driver],
+            "rank": ranks[index],
+            "change": previous[index] - ranks[index] if previous else None,
+            "points": _points(championship.points[-1][index]),
+            "wins": championship.wins[-1][index],
+        }
+        for index, driver in enumerate(championship.drivers)
+    ]
+
+    return sorted(table, key=lambda row: (row["rank"], row["name"]))
+
+
+def constructor_table(championship):
+    if not championship.races:
+        return []
+
+    totals = championship.constructor_points[-1]
+    table = [
+        {
+            "constructor": constructor,
+            "name": championship.labels["constructors"][constructor],
+            "rank": sum(other > totals[index] for other in totals) + 1,
+            "points": _points(totals[index]),
+        }
+        for index, constructor in enumerate(championship.constructors)
+    ]
+
+    return sorted(table, key=lambda row: (row["rank"], row["name"]))
+
+
+def driver_progression(championship, driver):
+    """返回车手每场比赛后的 (比赛, 累计积分, 排名)，不在这个赛季时返回空列表"""
+    if driver not in championship.drivers:
+        return []
+
+    index = championship.drivers.index(driver)
+
+    return [
+        (race, _points(points[index]), ranks[index])
+        for race, points, ranks in zip(
+            championship.races, championship.points, championship.ranks, strict=True
+        )
+    ]
+
+
+def head_to_head(championship, driver, other):
+    """两名车手都完赛的比赛中各自名次领先的次数"""
+    if driver not in championship.drivers or other not in championship.drivers:
+        return 0, 0
+
+    first = championship.drivers.index(driver)
+    second = championship.drivers.index(other)
+    ahead = behind = 0
+
+    for positions in championship.positions:
+        if positions[first] and positions[second]:
+            ahead += positions[first] < positions[second]
+            behind += positions[first] > positions[second]
+
+    return ahead, behind
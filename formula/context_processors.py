@@ -1,5 +1,13 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from formula.navigation import get_navigation
 
 
 def variables(request):
     return {"plausible_domain": settings.PLAUSIBLE_DOMAIN}
+
+
+def navigation(request):
+    # 只有模板用到时才读取缓存，后台页面不受影响
+    return {"navigation": SimpleLazyObject(get_navigation)}
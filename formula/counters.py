@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from formula.models import Article
+from formula.rollups import ARTICLE_VIEWS, add_rollup
+
+VIEW_COUNT_PREFIX = "article-views"
+VIEW_COUNT_LOCK_TIMEOUT = 60
+
+# 每次刷新最多读取的槽位数量
+VIEW_COUNT_FLUSH_SLOTS = 5000
+
+# 登记标记的有效期，槽位被缓存淘汰后文章在过期后可以重新登记
+VIEW_COUNT_DIRTY_TIMEOUT = 60 * 60
+
+
+def _key(*parts):
+    return ":".join([VIEW_COUNT_PREFIX, *[str(part) for part in parts]])
+
+
+def _register(article_id):
+    cache.add(_key("slots"), 0, timeout=None)
+    slot = cache.incr(_key("slots"))
+    cache.set(_key("slot", slot), article_id, timeout=None)
+
+    # 刷新时槽位还没有写入，已经被当作丢失跳过，下次浏览时重新登记
+    if cache.get(_key("cursor"), 0) >= slot:
+        cache.delete_many([_key("slot", slot), _key("dirty", article_id)])
+
+
+def record_view(article_id):
+    """记录一次文章浏览，累加到缓存中，按间隔批量写入数据库"""
+    counter_key = _key("count", article_id)
+
+    # 每个文章ID在两次刷新之间只登记一次
+    if cache.add(_key("dirty", article_id), 1, timeout=VIEW_COUNT_DIRTY_TIMEOUT):
+        _register(article_id)
+
+    try:
+        cache.incr(counter_key)
+    except ValueError:
+        if not cache.add(counter_key, 1, timeout=None):
+            cache.incr(counter_key)
+
+    # 每个刷新间隔只有一个请求负责写入数据库
+    if cache.add(_key("interval"), 1, timeout=settings.VIEW_COUNT_FLUSH_INTERVAL):
+        flush_view_counts()
+
+
+def flush_view_counts():
+    """把缓存中的浏览次数通过 F() 表达式批量写入 Article.view_count"""
+    if not cache.add(_key("lock"), 1, timeout=VIEW_COUNT_LOCK_TIMEOUT):
+        return 0
+
+    try:
+        start = cache.get(_key("cursor"), 0)
+        end = cache.get(_key("slots"), 0)
+
+        # 槽位计数被缓存淘汰后会从 0 重新开始
+        if start > end:
+            start = 0
+
+        cursor = min(end, start + VIEW_COUNT_FLUSH_SLOTS)
+        slot_keys = [_key("slot", slot) for slot in range(start + 1, cursor + 1)]
+        slots = cache.get_many(slot_keys)
+
+        # 被淘汰的槽位直接跳过，对应文章的登记标记过期后会重新登记
+        article_ids = list(
+            dict.fromkeys(slots[key] for key in slot_keys if key in slots)
+        )
+
+        # 先清除登记标记，刷新期间的新浏览会重新登记
+        cache.delete_many([_key("dirty", article_id) for article_id in article_ids])
+        counts = cache.get_many(
+            [_key("count", article_id) for article_id in article_ids]
+        )
+
+        # 按增量分组，每种增量只需一条 UPDATE
+        groups = defaultdict(list)
+        for article_id in article_ids:
+            count = counts.get(_key("count", article_id), 0)
+            if count > 0:
+                groups[count].append(article_id)
+
+        total = sum(count * len(ids) for count, ids in groups.items())
+
+        # 浏览次数计入写入当天的汇总
+        with transaction.atomic():
+            for count, ids in groups.items():
+                Article.objects.filter(pk__in=ids).update(
+                    view_count=F("view_count") + count
+                )
+
+            add_rollup(ARTICLE_VIEWS, timezone.localdate(), total)
+
+        for count, ids in groups.items():
+            for article_id in ids:
+                try:
+                    cache.decr(_key("count", article_id), count)
+                except ValueError:
+                    pass
+
+        cache.delete_many(slot_keys)
+        cache.set(_key("cursor"), cursor, timeout=None)
+
+        return total
+    finally:
+        cache.delete(_key("lock"))
@@ -0,0 +1,73 @@
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from formula.models import Driver, DriverStatistics, Race, Standing
+
+STATISTICS_FIELDS = [
+    "total_points",
+    "total_wins",
+    "total_races",
+    "latest_constructor",
+    "modified_at",
+]
+
+STATISTICS_BATCH_SIZE = 500
+
+
+def refresh_driver_statistics(driver_ids=None):
+    """重新计算指定车手（默认全部）的统计数据"""
+    drivers = Driver.objects.all()
+    standings = Standing.objects.all()
+    races = Race.objects.all()
+
+    if driver_ids is not None:
+        driver_ids = {driver_id for driver_id in driver_ids if driver_id}
+
+        if not driver_ids:
+            return 0
+
+        drivers = drivers.filter(pk__in=driver_ids)
+        standings = standings.filter(driver_id__in=driver_ids)
+        races = races.filter(winner_id__in=driver_ids)
+
+    totals = {
+        row["driver"]: row
+        for row in standings.order_by()
+        .values("driver")
+        .annotate(points=Sum("points"), races=Count("race", distinct=True))
+    }
+    wins = dict(
+        races.order_by()
+        .values("winner")
+        .annotate(wins=Count("pk"))
+        .values_list("winner", "wins")
+    )
+    latest_constructors = dict(
+        drivers.annotate(
+            latest_constructor=Subquery(
+                Standing.objects.filter(driver=OuterRef("pk"))
+                .order_by("-race__date", "-pk")
+                .values("constructor")[:1]
+            )
+        ).values_list("pk", "latest_constructor")
+    )
+
+    statistics = [
+        DriverStatistics(
+            driver_id=driver_id,
+            total_points=totals.get(driver_id, {}).get("points") or 0,
+            total_races=totals.get(driver_id, {}).get("races") or 0,
+            total_wins=wins.get(driver_id, 0),
+            latest_constructor_id=latest_constructor_id,
+        )
+        for driver_id, latest_constructor_id in latest_constructors.items()
+    ]
+
+    DriverStatistics.objects.bulk_create(
+        statistics,
+        update_conflicts=True,
+        unique_fields=["driver"],
+        update_fields=STATISTICS_FIELDS,
+        batch_size=STATISTICS_BATCH_SIZE,
+    )
+
+    return len(statistics)
@@ -1,2 +1,6 @@
 class ReadonlyException(Exception):
     pass
+
+
+class ContentImportError(Exception):
+    pass
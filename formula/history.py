@@ -0,0 +1,206 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber, TruncDate
+from django.utils import timezone
+from simple_history.models import HistoricalRecords as BaseHistoricalRecords
+from simple_history.signals import (
+    post_create_historical_record,
+    pre_create_historical_record,
+)
+
+HISTORY_BATCH_SIZE = 500
+
+# deferred_history() 中待写入的历史记录和每个历史模型使用的数据库
+_deferred = ContextVar("deferred_history", default=None)
+
+
+class HistoricalRecords(BaseHistoricalRecords):
+    """simple-history 的扩展
+
+    skip_unchanged=True 时，如果被记录的字段都没有变化就不写历史记录，
+    配合 excluded_fields 可以忽略浏览次数等频繁变化的字段。在 deferred_history()
+    中保存的对象会在结束时一次性批量写入历史记录。
+    """
+
+    def __init__(self, *args, skip_unchanged=False, **kwargs):
+        self.skip_unchanged = skip_unchanged
+        super().__init__(*args, **kwargs)
+
+    def _previous_record(self, instance, manager, deferred):
+        pk_name = instance._meta.pk.attname
+
+        if deferred is not None:
+            for history_instance, _instance in reversed(deferred[manager.model]):
+                if getattr(history_instance, pk_name) == instance.pk:
+                    return history_instance
+
+        return manager.order_by("-history_date", "-history_id").first()
+
+    def create_historical_record(self, instance, history_type, using=None):
+        deferred = _deferred.get()
+
+        # 多对多字段需要在保存后写入，不能批量处理
+        if self.m2m_fields or (deferred is None and not self.skip_unchanged):
+            return super().create_historical_record(instance, history_type, using)
+
+        using = using if self.use_base_model_db else None
+        manager = getattr(instance, self.manager_name)
+        attrs = {
+            field.attname: getattr(instance, field.attname)
+            for field in self.fields_included(instance)
+        }
+
+        if self.skip_unchanged and history_type == "~":
+            previous = self._previous_record(
+                instance, manager, deferred[0] if deferred else None
+            )
+
+            # auto_now 字段每次保存都会变化，不参与比较；历史记录中的文件字段是
+            # 字符串，所以按序列化后的值比较
+            if previous is not None and all(
+                field.value_to_string(previous) == field.value_to_string(instance)
+                for field in self.fields_included(instance)
+                if not getattr(field, "auto_now", False)
+            ):
+                return
+
+        if deferred is None:
+            return super().create_historical_record(instance, history_type, using)
+
+        history_date = getattr(instance, "_history_date", timezone.now())
+        history_user = self.get_history_user(instance)
+        history_change_reason = self.get_change_reason_for_object(
+            instance, history_type, using
+        )
+
+        if getattr(manager.model, "history_relation", None) is not None:
+            attrs["history_relation"] = instance
+
+        history_instance = manager.model(
+            history_date=history_date,
+            history_type=history_type,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            **attrs,
+        )
+
+        pre_create_historical_record.send(
+            sender=manager.model,
+            instance=instance,
+            history_date=history_date,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            history_instance=history_instance,
+            using=using,
+        )
+
+        records, databases = deferred
+        records[manager.model].append((history_instance, instance))
+        databases[manager.model] = using
+
+
+@contextmanager
+def deferred_history():
+    """在同一个事务中保存多个对象，历史记录在结束时按模型批量写入"""
+    if _deferred.get() is not None:
+        yield
+        return
+
+    records, databases = defaultdict(list), {}
+    token = _deferred.set((records, databases))
+
+    try:
+        with transaction.atomic():
+            yield
+            _deferred.set(None)
+
+            for model, pending in records.items():
+                using = databases.get(model)
+                model._default_manager.using(using).bulk_create(
+                    [history_instance for history_instance, _instance in pending],
+                    batch_size=HISTORY_BATCH_SIZE,
+                )
+
+                for history_instance, instance in pending:
+                    post_create_historical_record.send(
+                        sender=model,
+                        instance=instance,
+                        history_instance=history_instance,
+                        history_date=history_instance.history_date,
+                        history_user=history_instance.history_user,
+                        history_change_reason=history_instance.history_change_reason,
+                        using=using,
+                    )
+    finally:
+        _deferred.reset(token)
+
+
+######################################################################
+# Pruning
+######################################################################
+
+
+def retention_policy(**overrides):
+    policy = {**settings.HISTORY_RETENTION}
+    policy.update({key: value for key, value in overrides.items() if value is not None})
+    return policy
+
+
+def prunable_history(history_model, keep_latest, compact_after_days, max_age_days):
+    """返回可以删除的历史记录主键
+
+    每个对象最新的 keep_latest 条记录总是保留。早于 compact_after_days 天的记录
+    每个对象每天只保留最后一条，早于 max_age_days 天的记录全部删除。
+    """
+    now = timezone.now()
+    pk_name = history_model.instance_type._meta.pk.attname
+    order_by = [F("history_date").desc(), F("history_id").desc()]
+
+    removable = Q(history_date__lt=now - timedelta(days=compact_after_days)) & Q(
+        day_rank__gt=1
+    )
+
+    # 日期条件必须和窗口函数用 OR 连接，否则会被放进 WHERE 先过滤，排名只在
+    # 较旧的记录中计算；不删除过期记录时用 Q(pk__in=[]) 代替
+    removable |= (
+        Q(history_date__lt=now - timedelta(days=max_age_days))
+        if max_age_days
+        else Q(pk__in=[])
+    )
+
+    return (
+        history_model.objects.annotate(
+            rank=Window(RowNumber(), partition_by=[F(pk_name)], order_by=order_by),
+            day_rank=Window(
+                RowNumber(),
+                partition_by=[F(pk_name), TruncDate("history_date")],
+                order_by=order_by,
+            ),
+        )
+        .filter(removable, rank__gt=keep_latest)
+        .values_list("history_id", flat=True)
+    )
+
+
+def prune_history(history_model, dry_run=False, **policy):
+    """按保留策略删除历史记录，返回删除（或将要删除）的数量"""
+    history_ids = list(prunable_history(history_model, **retention_policy(**policy)))
+
+    if dry_run:
+        return len(history_ids)
+
+    using = router.db_for_write(history_model)
+
+    with transaction.atomic(using=using):
+        for start in range(0, len(history_ids), HISTORY_BATCH_SIZE):
+            history_model.objects.filter(
+                history_id__in=history_ids[start : start + HISTORY_BATCH_SIZE]
+            ).delete()
+
+    return len(history_ids)
@@ -0,0 +1,451 @@
+import csv
+import json
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from datetime import UTC
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from simple_history.utils import bulk_create_with_history
+
+from formula.caching import invalidate_page_cache
+from formula.exceptions import ContentImportError
+from formula.metrics import invalidate_metrics
+from formula.models import Article, Category, ContentStatus, Page, User
+from formula.related import RELATED_BATCH_SIZE
+from formula.search import index_objects
+from formula.slugs import assign_unique_slugs
+from formula.tasks import refresh_related_articles
+
+IMPORT_BATCH_SIZE = 500
+
+IMPORT_FORMATS = ("csv", "jsonl", "wxr")
+
+IMPORT_TYPES = {"article": Article, "page": Page, "category": Category}
+
+ARTICLE_FIELDS = [
+    "title",
+    "slug",
+    "content",
+    "excerpt",
+    "meta_title",
+    "meta_description",
+    "meta_keywords",
+]
+
+PAGE_FIELDS = [
+    "title",
+    "slug",
+    "content",
+    "meta_title",
+    "meta_description",
+    "meta_keywords",
+]
+
+CATEGORY_FIELDS = ["name", "slug", "description"]
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+WXR_NAMESPACES = {
+    "content": "http://purl.org/rss/1.0/modules/content/",
+    "excerpt": "http://wordpress.org/export/1.2/excerpt/",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "wp": "http://wordpress.org/export/1.2/",
+}
+
+WXR_STATUSES = {
+    "publish": ContentStatus.PUBLISHED,
+    "draft": ContentStatus.DRAFT,
+    "pending": ContentStatus.DRAFT,
+    "future": ContentStatus.DRAFT,
+    "private": ContentStatus.ARCHIVED,
+    "trash": ContentStatus.ARCHIVED,
+}
+
+WXR_POST_TYPES = {"post": "article", "page": "page"}
+
+
+######################################################################
+# Readers
+######################################################################
+
+
+def read_csv(file, default_type):
+    for record in csv.DictReader(file):
+        record.setdefault("type", default_type)
+        yield record
+
+
+def read_jsonl(file, default_type):
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ContentImportError(f"Line {number}: {exc}") from None
+
+        record.setdefault("type", default_type)
+        yield record
+
+
+def _wxr(element, path):
+    value = element.findtext(path, default="", namespaces=WXR_NAMESPACES)
+    return value.strip()
+
+
+def _wxr_date(value):
+    # WordPress 用 0000-00-00 00:00:00 表示没有日期
+    if not value or value.startswith("0000"):
+        return None
+
+    return f"{value.replace(' ', 'T')}+00:00"
+
+
+def read_wxr(file, default_type=None):
+    """逐个解析 WordPress 导出文件中的分类和文章，不会把整个文件读入内存"""
+    context = ET.iterparse(file, events=("end",))
+
+    for _event, element in context:
+        tag = element.tag
+
+        if tag == f"{{{WXR_NAMESPACES['wp']}}}category":
+            yield {
+                "type": "category",
+                "name": _wxr(element, "wp:cat_name"),
+                "slug": _wxr(element, "wp:category_nicename"),
+                "parent": _wxr(element, "wp:category_parent"),
+                "description": _wxr(element, "wp:category_description"),
+            }
+            element.clear()
+        elif tag == "item":
+            post_type = WXR_POST_TYPES.get(_wxr(element, "wp:post_type"))
+
+            if post_type is not None:
+                category = next(
+                    (
+                        node.get("nicename", "")
+                        for node in element.iterfind("category")
+                        if node.get("domain") == "category"
+                    ),
+                    "",
+                )
+                yield {
+                    "type": post_type,
+                    "title": _wxr(element, "title"),
+                    "slug": _wxr(element, "wp:post_name"),
+                    "content": _wxr(element, "content:encoded"),
+                    "excerpt": _wxr(element, "excerpt:encoded"),
+                    "author": _wxr(element, "dc:creator"),
+                    "category": category,
+                    "status": WXR_STATUSES.get(
+                        _wxr(element, "wp:status"), ContentStatus.DRAFT
+                    ),
+                    "published_at": _wxr_date(_wxr(element, "wp:post_date_gmt")),
+                    "order": _wxr(element, "wp:menu_order"),
+                }
+
+            element.clear()
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "wxr": read_wxr}
+
+
+######################################################################
+# Importer
+######################################################################
+
+
+def _text(record, field):
+    value = record.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def _boolean(record, field, default=False):
+    value = record.get(field)
+
+    if value is None or value == "":
+        return default
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _integer(record, field):
+    try:
+        return int(record.get(field) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _datetime(record, field):
+    value = _text(record, field)
+
+    if not value:
+        return None
+
+    parsed = parse_datetime(value)
+
+    if parsed is None:
+        raise ContentImportError(f"Invalid {field}: {value}")
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, UTC)
+
+    return parsed
+
+
+def _status(record):
+    status = _text(record, "status").upper() or ContentStatus.DRAFT
+
+    if status not in ContentStatus.values:
+        raise ContentImportError(f"Invalid status: {status}")
+
+    return status
+
+
+class ContentImporter:
+    """分批导入分类、文章和页面
+
+    分类和作者通过内存中的 slug/用户名映射解析，每批只需要几次查询。对象通过
+    bulk_create 写入，不会触发信号，所以历史记录、分类路径、搜索索引和页面缓存
+    都在写入后批量处理。slug 已经存在的记录会被跳过，重复导入同一个文件是安全的。
+    """
+
+    def __init__(self, author=None, batch_size=IMPORT_BATCH_SIZE):
+        self.author = author
+        self.batch_size = batch_size
+        self.pending = defaultdict(list)
+        self.created = Counter()
+        self.skipped = Counter()
+        self.errors = []
+        self.category_parents = {}
+        self.published_articles = []
+        self.categories = dict(Category.objects.values_list("slug", "pk"))
+        self.authors = dict(User.objects.values_list("username", "pk"))
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        return sum(self.created.values()) / self.elapsed if self.elapsed else 0
+
+    def run(self, records):
+        for number, record in enumerate(records, 1):
+            try:
+                self.add(record)
+            except ContentImportError as exc:
+                self.errors.append(f"Record {number}: {exc}")
+
+            if any(len(rows) >= self.batch_size for rows in self.pending.values()):
+                self.flush()
+
+        self.flush()
+        self.finish()
+        return self
+
+    def add(self, record):
+        record_type = _text(record, "type")
+
+        if record_type not in IMPORT_TYPES:
+            raise ContentImportError(f"Unknown type: {record_type or '(empty)'}")
+
+        build = getattr(self, f"_build_{record_type}")
+        self.pending[record_type].append(build(record))
+
+    def _author_id(self, record):
+        username = _text(record, "author")
+
+        if username and username in self.authors:
+            return self.authors[username]
+
+        if self.author is None:
+            raise ContentImportError(f"Unknown author: {username or '(empty)'}")
+
+        return self.author.pk
+
+    def _build_category(self, record):
+        category = Category(
+            **{field: _text(record, field) for field in CATEGORY_FIELDS},
+            order=_integer(record, "order"),
+            is_active=_boolean(record, "is_active", default=True),
+        )
+
+        if not category.name:
+            raise ContentImportError("Category without name")
+
+        category.parent_slug = _text(record, "parent")
+        return category
+
+    def _build_content(self, model, fields, record, **extra):
+        instance = model(
+            **{field: _text(record, field) for field in fields},
+            status=_status(record),
+            published_at=_datetime(record, "published_at"),
+            **extra,
+        )
+
+        if not instance.title:
+            raise ContentImportError(f"{model._meta.verbose_name} without title")
+
+        # 与 save() 保持一致
+        if instance.status == ContentStatus.PUBLISHED and not instance.published_at:
+            instance.published_at = timezone.now()
+
+        return instance
+
+    def _build_article(self, record):
+        article = self._build_content(
+            Article,
+            ARTICLE_FIELDS,
+            record,
+            author_id=self._author_id(record),
+            is_featured=_boolean(record, "is_featured"),
+        )
+        article.category_slug = _text(record, "category")
+
+        if not article.category_slug:
+            raise ContentImportError("Article without category")
+
+        return article
+
+    def _build_page(self, record):
+        return self._build_content(
+            Page,
+            PAGE_FIELDS,
+            record,
+            template=_text(record, "template") or "default",
+            order=_integer(record, "order"),
+            is_homepage=_boolean(record, "is_homepage"),
+        )
+
+    def _new_instances(self, model, instances):
+        """跳过数据库中或本批中 slug 已经存在的对象"""
+        slugs = [instance.slug for instance in instances if instance.slug]
+        existing = set(
+            model.objects.filter(slug__in=slugs).values_list("slug", flat=True)
+        )
+        fresh = []
+
+        for instance in instances:
+            if instance.slug and instance.slug in existing:
+                self.skipped[model] += 1
+                continue
+
+            if instance.slug:
+                existing.add(instance.slug)
+
+            fresh.append(instance)
+
+        return fresh
+
+    def _create(self, model, instances):
+        instances = assign_unique_slugs(
+            self._new_instances(model, instances),
+            model.slug_source,
+            model.slug_fallback,
+        )
+
+        if not instances:
+            return []
+
+        if hasattr(model, "history"):
+            instances = bulk_create_with_history(
+                instances,
+                model,
+                batch_size=self.batch_size,
+                default_user=self.author,
+                default_change_reason="Imported",
+            )
+        else:
+            instances = model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+        self.created[model] += len(instances)
+        return instances
+
+    def _flush_categories(self, categories):
+        for category in self._create(Category, categories):
+            self.categories[category.slug] = category.pk
+
+            if getattr(category, "parent_slug", ""):
+                self.category_parents[category.pk] = category.parent_slug
+
+    def _resolve_categories(self, articles):
+        # 引用了不存在的分类时按 slug 自动创建
+        missing = {
+            article.category_slug
+            for article in articles
+            if article.category_slug not in self.categories
+        }
+
+        if missing:
+            self._flush_categories(
+                [Category(name=slug, slug=slug) for slug in sorted(missing)]
+            )
+
+        for article in articles:
+            article.category_id = self.categories[article.category_slug]
+
+    def flush(self):
+        # 文章依赖分类，所以分类先写入
+        with transaction.atomic():
+            categories = self.pending.pop("category", [])
+            if categories:
+                self._flush_categories(categories)
+
+            articles = self.pending.pop("article", [])
+            if articles:
+                self._resolve_categories(articles)
+                articles = self._create(Article, articles)
+                index_objects(Article, articles)
+                self.published_articles.extend(
+                    article.pk
+                    for article in articles
+                    if article.status == ContentStatus.PUBLISHED
+                )
+
+            pages = self.pending.pop("page", [])
+            if pages:
+                index_objects(Page, self._create(Page, pages))
+
+    def finish(self):
+        # 父分类可能出现在子分类之后，全部写入后再设置
+        parents = []
+
+        for pk, parent_slug in self.category_parents.items():
+            parent_id = self.categories.get(parent_slug)
+
+            if parent_id is None:
+                self.errors.append(f"Category {pk}: unknown parent {parent_slug}")
+            elif parent_id != pk:
+                parents.append(Category(pk=pk, parent_id=parent_id))
+
+        Category.objects.bulk_update(parents, ["parent"], batch_size=self.batch_size)
+
+        if self.created[Category]:
+            Category.objects.rebuild_tree()
+
+        # bulk_create 不会发送信号
+        if self.created:
+            invalidate_page_cache("article", "category", "page")
+            invalidate_metrics()
+
+        if self.published_articles:
+            # 无论更新多少文章都要读取全部文章，导入很多文章时直接全部重新计算
+            article_ids = self.published_articles
+
+            if len(article_ids) > RELATED_BATCH_SIZE:
+                article_ids = None
+
+            transaction.on_commit(lambda: refresh_related_articles.delay(article_ids))
+
+        self.finished = time.monotonic()
@@ -0,0 +1,299 @@
+import csv
+import io
+import logging
+import tempfile
+from collections import Counter
+from functools import partial
+from itertools import batched
+
+import tablib
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from formula.exports import STREAMS
+from formula.models import ImportExportJob, JobKind, JobStatus
+from formula.sites import formula_admin_site
+
+logger = logging.getLogger(__name__)
+
+# 每处理这么多行写入一次进度，导入时每块在一个事务中执行
+JOB_CHUNK_SIZE = 1000
+
+# summary 中最多保存的错误数量
+JOB_ERROR_LIMIT = 50
+
+
+def class_path(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _enqueue(job):
+    from formula.tasks import run_import_export_job
+
+    transaction.on_commit(lambda: run_import_export_job.delay(job.pk))
+    return job
+
+
+def create_export_job(
+    user, resource_class, file_format, model, filters, pks=None, export_fields=None
+):
+    """保存导出条件并安排后台任务，file_format 必须是 STREAMS 支持的格式
+
+    filters 是列表页的查询参数，任务中用同样的参数重新生成列表页的查询；pks
+    是用户勾选的对象，没有勾选时为 None。
+    """
+    job = ImportExportJob.objects.create(
+        kind=JobKind.EXPORT,
+        content_type=ContentType.objects.get_for_model(model),
+        resource=class_path(resource_class),
+        file_format=class_path(type(file_format)),
+        options={
+            "export_fields": export_fields,
+            "filters": filters,
+            "pks": [str(pk) for pk in pks] if pks is not None else None,
+        },
+        created_by=user,
+    )
+    return _enqueue(job)
+
+
+def create_import_job(
+    user, resource_class, file_format, model, import_file, dry_run=False
+):
+    """保存上传的文件并安排后台任务，dry_run 时只预览结果，不保存数据"""
+    job = ImportExportJob(
+        kind=JobKind.IMPORT,
+        content_type=ContentType.objects.get_for_model(model),
+        resource=class_path(resource_class),
+        file_format=class_path(type(file_format)),
+        options={"file_name": import_file.name, "dry_run": dry_run},
+        created_by=user,
+    )
+    job.input_file.save(import_file.name, import_file, save=False)
+    job.save()
+    return _enqueue(job)
+
+
+def confirm_import_job(preview):
+    """确认预览后用同一个文件安排真正的导入"""
+    job = ImportExportJob.objects.create(
+        kind=JobKind.IMPORT,
+        content_type=preview.content_type,
+        resource=preview.resource,
+        file_format=preview.file_format,
+        input_file=preview.input_file.name,
+        options={**preview.options, "dry_run": False, "preview": preview.pk},
+        created_by=preview.created_by,
+    )
+    return _enqueue(job)
+
+
+def _update(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+    ImportExportJob.objects.filter(pk=job.pk).update(
+        modified_at=timezone.now(), **fields
+    )
+
+
+def run_job(job_id):
+    """执行等待中的任务，失败时把错误记录到任务中"""
+    updated = ImportExportJob.objects.filter(
+        pk=job_id, status=JobStatus.PENDING
+    ).update(status=JobStatus.RUNNING, started_at=timezone.now())
+
+    # 任务已经被其他 worker 执行
+    if not updated:
+        return None
+
+    job = ImportExportJob.objects.select_related("content_type", "created_by").get(
+        pk=job_id
+    )
+
+    try:
+        if job.kind == JobKind.EXPORT:
+            run_export(job)
+        else:
+            run_import(job)
+    except Exception as exc:
+        logger.exception("Import/export job %s failed", job.pk)
+        _update(
+            job, status=JobStatus.FAILED, error=str(exc), finished_at=timezone.now()
+        )
+    else:
+        _update(job, status=JobStatus.COMPLETED, finished_at=timezone.now())
+
+    return job.status
+
+
+######################################################################
+# Export
+######################################################################
+
+
+def _changelist_queryset(job, model):
+    """用保存的查询参数和创建者重新生成列表页的查询"""
+    if job.created_by is None:
+        raise ValueError("The user who created the export no longer exists")
+
+    request = HttpRequest()
+    request.GET = QueryDict(job.options.get("filters", ""))
+    request.user = job.created_by
+
+    return formula_admin_site._registry[model].get_export_queryset(request)
+
+
+def _export_querysets(queryset, pks):
+    """主键列表按块过滤，避免一次查询的参数过多"""
+    if pks is None:
+        yield queryset
+        return
+
+    for chunk in batched(pks, JOB_CHUNK_SIZE):
+        yield queryset.filter(pk__in=chunk)
+
+
+def _export_rows(job, resource, querysets, export_fields):
+    processed = 0
+
+    for queryset in querysets:
+        for instance in resource.iter_queryset(queryset):
+            yield resource.export_resource(instance, selected_fields=export_fields)
+            processed += 1
+
+            if processed % JOB_CHUNK_SIZE == 0:
+                _update(job, processed=processed)
+
+    _update(job, processed=processed)
+
+
+def run_export(job):
+    """逐行写入临时文件，不会把整个数据集放在内存中"""
+    model = job.content_type.model_class()
+    resource = import_string(job.resource)()
+    extension = import_string(job.file_format)().get_extension()
+    export_fields = job.options.get("export_fields")
+    pks = job.options.get("pks")
+    queryset = resource.filter_export(_changelist_queryset(job, model))
+    _update(job, total=queryset.count() if pks is None else len(pks))
+
+    headers = resource.get_export_headers(selected_fields=export_fields)
+    rows = _export_rows(job, resource, _export_querysets(queryset, pks), export_fields)
+
+    with tempfile.TemporaryFile() as file:
+        for chunk in STREAMS[extension](headers, rows):
+            file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+
+        file.seek(0)
+        name = f"{model._meta.model_name}-{job.pk}.{extension}"
+        job.result_file.save(name, File(file), save=False)
+
+    _update(job, result_file=job.result_file.name)
+
+
+######################################################################
+# Import
+######################################################################
+
+
+def _csv_rows(file, delimiter=","):
+    yield from csv.reader(
+        io.TextIOWrapper(file, encoding="utf-8-sig", newline=""), delimiter=delimiter
+    )
+
+
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            if any(value is not None for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+# 后台导入支持的格式，都逐行读取，不会把整个文件放在内存中
+IMPORT_STREAMS = {
+    "csv": _csv_rows,
+    "tsv": partial(_csv_rows, delimiter="\t"),
+    "xlsx": _xlsx_rows,
+}
+
+
+def _input_rows(job, extension):
+    with job.input_file.open("rb") as file:
+        yield from IMPORT_STREAMS[extension](file)
+
+
+def _import_datasets(job, extension):
+    """返回 (总行数, 每块一个 Dataset 的迭代器)，文件读取两遍，第一遍只计数"""
+    total = max(sum(1 for _row in _input_rows(job, extension)) - 1, 0)
+
+    def chunks():
+        rows = _input_rows(job, extension)
+        headers = list(next(rows, []))
+
+        for chunk in batched(rows, JOB_CHUNK_SIZE):
+            yield tablib.Dataset(*chunk, headers=headers)
+
+    return total, chunks()
+
+
+def _result_errors(result, offset):
+    for error in result.base_errors:
+        yield str(error.error)
+
+    for number, errors in result.row_errors():
+        for error in errors:
+            yield f"Row {offset + number}: {error.error}"
+
+    for row in result.invalid_rows:
+        yield f"Row {offset + row.number}: {row.error_dict}"
+
+
+def run_import(job):
+    """按块导入，每块在自己的事务中执行
+
+    出错的块会回滚，错误记录在 summary 中，任务本身仍然算作完成。预览任务
+    使用 dry_run，每块执行后都回滚，只记录结果。
+    """
+    resource = import_string(job.resource)()
+    extension = import_string(job.file_format)().get_extension()
+    dry_run = job.options.get("dry_run", False)
+    total, datasets = _import_datasets(job, extension)
+    _update(job, total=total)
+
+    totals = Counter()
+    errors = []
+    processed = 0
+
+    for dataset in datasets:
+        result = resource.import_data(
+            dataset,
+            dry_run=dry_run,
+            raise_errors=False,
+            use_transactions=True,
+            user=job.created_by,
+            file_name=job.options.get("file_name"),
+        )
+        totals.update(result.totals)
+
+        if result.has_errors() and not dry_run:
+            errors.append(
+                f"Rows {processed + 1}-{processed + len(dataset)} were rolled back"
+            )
+
+        for error in _result_errors(result, processed):
+            if len(errors) < JOB_ERROR_LIMIT:
+                errors.append(error)
+
+        processed += len(dataset)
+        _update(job, processed=processed, summary={"totals": totals, "errors": errors})
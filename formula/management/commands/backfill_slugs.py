@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from formula.models import Article, Category, Page
+from formula.slugs import assign_unique_slugs
+
+SLUG_MODELS = [Category, Article, Page]
+
+BACKFILL_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Assign unique slugs to categories, articles and pages without one"
+
+    def handle(self, *args, **options):
+        for model in SLUG_MODELS:
+            instances = list(
+                model.objects.filter(slug="").only("pk", "slug", model.slug_source)
+            )
+            assign_unique_slugs(instances, model.slug_source, model.slug_fallback)
+            model.objects.bulk_update(
+                instances, ["slug"], batch_size=BACKFILL_BATCH_SIZE
+            )
+
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {len(instances)} slugs assigned"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Slugs backfilled"))
@@ -0,0 +1,281 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+import warnings
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, URLPattern, get_resolver, reverse
+from django.utils import translation
+
+from formula.models import (
+    Article,
+    Category,
+    Constructor,
+    ContentStatus,
+    Driver,
+    Page,
+    Race,
+    Standing,
+    User,
+)
+from formula.search import rebuild_index
+from formula.sites import formula_admin_site
+
+FIXTURES_DIR = Path(settings.BASE_DIR) / "formula" / "fixtures"
+
+BATCH_SIZE = 5_000
+
+SKIPPED_URLS = {"set_language", "djdt"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every public and admin view against a throwaway database "
+        "and write query counts, latency percentiles and peak memory to JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=100_000)
+        parser.add_argument("--standings", type=int, default=1_000_000)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument(
+            "--compare", help="Previous report to compare the results with"
+        )
+        parser.add_argument(
+            "--warm",
+            action="store_true",
+            help="Keep the cache between requests instead of measuring cold renders",
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            middleware = [m for m in settings.MIDDLEWARE if "debug_toolbar" not in m]
+
+            with override_settings(DEBUG=False, MIDDLEWARE=middleware):
+                self.load_data(options["articles"], options["standings"])
+                results = self.run(options["iterations"], options["warm"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "commit": self.get_commit(),
+            "vendor": connection.vendor,
+            "articles": options["articles"],
+            "standings": options["standings"],
+            "iterations": options["iterations"],
+            "warm": options["warm"],
+            "results": results,
+        }
+
+        Path(options["output"]).write_text(json.dumps(report, indent=4))
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options["compare"]:
+            previous = json.loads(Path(options["compare"]).read_text())
+            self.compare(previous["results"], results)
+
+    def get_commit(self):
+        try:
+            return subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def load_data(self, total_articles, total_standings):
+        fixtures = sorted(str(path) for path in FIXTURES_DIR.glob("*.json"))
+
+        # 夹具中的时间没有时区信息
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            call_command("loaddata", *fixtures, verbosity=0)
+
+        self.user = User.objects.create_superuser(
+            "benchmark", "benchmark@example.com", "benchmark"
+        )
+
+        categories = Category.objects.bulk_create(
+            Category(name=f"Category {i}", slug=f"category-{i}", order=i)
+            for i in range(20)
+        )
+
+        for start in range(0, total_articles, BATCH_SIZE):
+            Article.objects.bulk_create(
+                Article(
+                    title=f"Article {i}",
+                    slug=f"article-{i}",
+                    content=f"<p>Benchmark article {i} about Formula racing.</p>",
+                    excerpt=f"Benchmark article {i}",
+                    category=categories[i % len(categories)],
+                    author=self.user,
+                    status=ContentStatus.PUBLISHED,
+                    is_featured=i % 50 == 0,
+                    view_count=i % 1000,
+                )
+                for i in range(start, min(start + BATCH_SIZE, total_articles))
+            )
+
+        Page.objects.bulk_create(
+            Page(
+                title=f"Page {i}",
+                slug=f"page-{i}",
+                content=f"<p>Benchmark page {i}</p>",
+                status=ContentStatus.PUBLISHED,
+                order=i,
+            )
+            for i in range(20)
+        )
+
+        # 在夹具数据的基础上按比例扩充成绩表
+        races = list(Race.objects.values_list("pk", flat=True))
+        drivers = list(Driver.objects.values_list("pk", flat=True))
+        constructors = list(Constructor.objects.values_list("pk", flat=True))
+        missing = max(total_standings - Standing.objects.count(), 0)
+
+        for start in range(0, missing, BATCH_SIZE):
+            Standing.objects.bulk_create(
+                Standing(
+                    race_id=races[i % len(races)],
+                    driver_id=drivers[i % len(drivers)],
+                    constructor_id=constructors[i % len(constructors)],
+                    position=i % 20 + 1,
+                    number=i % 99 + 1,
+                    laps=50,
+                    points=Decimal(max(25 - i % 20, 0)),
+                    weight=i,
+                )
+                for i in range(start, min(start + BATCH_SIZE, missing))
+            )
+
+        rebuild_index()
+
+    def get_urls(self):
+        article = Article.objects.filter(status=ContentStatus.PUBLISHED).first()
+        page = Page.objects.filter(status=ContentStatus.PUBLISHED).first()
+        kwargs = {
+            "article_detail": {"slug": article.slug},
+            "category_detail": {"slug": article.category.slug},
+            "page_detail": {"slug": page.slug},
+        }
+        urls = {}
+
+        for pattern in get_resolver().url_patterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+
+            if pattern.name in SKIPPED_URLS:
+                continue
+
+            try:
+                urls[pattern.name] = reverse(
+                    pattern.name, kwargs=kwargs.get(pattern.name)
+                )
+            except NoReverseMatch:
+                continue
+
+        urls["search"] = f"{reverse('search')}?q=formula"
+
+        with translation.override(settings.LANGUAGE_CODE):
+            urls["admin:index"] = reverse("admin:index")
+
+            for model in formula_admin_site._registry:
+                info = f"admin:{model._meta.app_label}_{model._meta.model_name}"
+                obj = None
+
+                # constance 的 Config 不是真正的数据表
+                if getattr(model._meta, "managed", False):
+                    obj = model._default_manager.order_by("pk").first()
+
+                for view, args in (
+                    ("changelist", None),
+                    ("add", None),
+                    ("change", [obj.pk] if obj else None),
+                ):
+                    if view == "change" and not args:
+                        continue
+
+                    try:
+                        urls[f"{info}_{view}"] = reverse(f"{info}_{view}", args=args)
+                    except NoReverseMatch:
+                        continue
+
+        return urls
+
+    def run(self, iterations, warm):
+        # 视图出错时记录状态码而不是中断整个测试
+        client = Client(raise_request_exception=False)
+        client.force_login(self.user)
+        results = {}
+
+        for name, url in self.get_urls().items():
+            timings = []
+            queries = 0
+            status = None
+
+            for _i in range(iterations):
+                if not warm:
+                    cache.clear()
+
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                queries = len(context.captured_queries)
+                status = response.status_code
+
+            if not warm:
+                cache.clear()
+
+            # 内存单独测量一次，避免 tracemalloc 影响耗时
+            tracemalloc.start()
+            client.get(url)
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            timings.sort()
+            results[name] = {
+                "url": url,
+                "status": status,
+                "queries": queries,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+                "peak_memory_kb": round(peak / 1024, 1),
+            }
+
+            self.stdout.write(
+                f"{name:<50} {status} {queries:>4}q "
+                f"p50={results[name]['p50_ms']}ms p95={results[name]['p95_ms']}ms"
+            )
+
+        return results
+
+    def compare(self, previous, current):
+        self.stdout.write("")
+
+        for name, result in current.items():
+            before = previous.get(name)
+
+            if not before:
+                self.stdout.write(f"{name:<50} new")
+                continue
+
+            self.stdout.write(
+                f"{name:<50} "
+                f"queries {before['queries']} -> {result['queries']}, "
+                f"p50 {before['p50_ms']} -> {result['p50_ms']}ms, "
+                f"p95 {before['p95_ms']} -> {result['p95_ms']}ms"
+            )
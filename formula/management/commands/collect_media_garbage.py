@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from formula.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete stored files that are no longer referenced by any model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=24,
+            help="Keep unreferenced files younger than this many hours",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        orphans = collect_garbage(
+            timedelta(hours=options["min_age"]), dry_run=options["dry_run"]
+        )
+        size = sum(blob.size for blob in orphans)
+
+        for blob in orphans:
+            self.stdout.write(blob.name)
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {len(orphans)} files ({size} bytes)")
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from formula.counters import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = "Flush buffered article view counts into the database"
+
+    def handle(self, *args, **options):
+        total = flush_view_counts()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {total} article views"))
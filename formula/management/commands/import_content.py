@@ -0,0 +1,83 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formula.exceptions import ContentImportError
+from formula.importers import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    IMPORT_TYPES,
+    READERS,
+    ContentImporter,
+)
+from formula.models import User
+
+
+class Command(BaseCommand):
+    help = "Import categories, articles and pages from CSV, JSON Lines or WordPress WXR"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Defaults to the file extension (.xml is treated as WXR)",
+        )
+        parser.add_argument(
+            "--type",
+            choices=list(IMPORT_TYPES),
+            default="article",
+            help="Record type for rows without a type column",
+        )
+        parser.add_argument(
+            "--author", help="Username used when a record has no known author"
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+
+        if file_format == "xml":
+            file_format = "wxr"
+
+        if file_format not in READERS:
+            raise CommandError(f"Unknown format: {file_format}")
+
+        author = None
+        if options["author"]:
+            author = User.objects.filter(username=options["author"]).first()
+
+            if author is None:
+                raise CommandError(f"Unknown author: {options['author']}")
+
+        importer = ContentImporter(author=author, batch_size=options["batch_size"])
+
+        # WXR 由 iterparse 按字节读取
+        if file_format == "wxr":
+            options_open = {"mode": "rb"}
+        else:
+            options_open = {"mode": "r", "encoding": "utf-8-sig", "newline": ""}
+
+        try:
+            with path.open(**options_open) as file:
+                importer.run(READERS[file_format](file, options["type"]))
+        except (ContentImportError, OSError) as exc:
+            raise CommandError(str(exc)) from None
+
+        for error in importer.errors:
+            self.stderr.write(error)
+
+        for model in IMPORT_TYPES.values():
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: "
+                f"{importer.created[model]} created, "
+                f"{importer.skipped[model]} skipped"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {sum(importer.created.values())} objects in "
+                f"{importer.elapsed:.2f}s ({importer.throughput:.0f} objects/s)"
+            )
+        )
@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from simple_history.exceptions import NotHistoricalModelError
+from simple_history.utils import get_history_model_for_model
+
+from formula.history import prune_history
+
+
+class Command(BaseCommand):
+    help = "Delete history rows according to the HISTORY_RETENTION policy"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-latest", type=int)
+        parser.add_argument("--compact-after-days", type=int)
+        parser.add_argument("--max-age-days", type=int)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        total = 0
+
+        for model in apps.get_app_config("formula").get_models():
+            try:
+                history_model = get_history_model_for_model(model)
+            except NotHistoricalModelError:
+                continue
+
+            deleted = prune_history(
+                history_model,
+                dry_run=options["dry_run"],
+                keep_latest=options["keep_latest"],
+                compact_after_days=options["compact_after_days"],
+                max_age_days=options["max_age_days"],
+            )
+            total += deleted
+            self.stdout.write(f"{history_model._meta.verbose_name_plural}: {deleted}")
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{action} {total} history rows"))
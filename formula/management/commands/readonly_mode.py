@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from formula.exceptions import ReadonlyException
+from formula.readonly import is_readonly, reset_readonly, set_readonly
+
+
+class Command(BaseCommand):
+    help = "Show or toggle readonly mode for every process sharing the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "state", nargs="?", choices=["on", "off", "reset"], default=None
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["state"] == "reset":
+                reset_readonly()
+            elif options["state"]:
+                set_readonly(options["state"] == "on")
+        except ReadonlyException as e:
+            raise CommandError(
+                "Readonly mode is forced by the READONLY_MODE setting"
+            ) from e
+
+        state = "on" if is_readonly() else "off"
+        self.stdout.write(self.style.SUCCESS(f"Readonly mode is {state}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from formula.caching import invalidate_page_cache
+from formula.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recalculate the materialized path of every category"
+
+    def handle(self, *args, **options):
+        updated = Category.objects.rebuild_tree()
+
+        if updated:
+            invalidate_page_cache("category")
+
+        orphans = Category.objects.filter(path="").count()
+
+        if orphans:
+            self.stdout.write(
+                self.style.WARNING(f"{orphans} categories are part of a parent cycle")
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} categories"))
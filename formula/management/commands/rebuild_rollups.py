@@ -0,0 +1,19 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from formula.rollups import ROLLUP_SERIES, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily and weekly dashboard rollups from the source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--series", action="append", choices=list(ROLLUP_SERIES))
+        parser.add_argument(
+            "--since", type=date.fromisoformat, help="Only rebuild from YYYY-MM-DD"
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups(options["series"], options["since"])
+        self.stdout.write(self.style.SUCCESS(f"Stored {rows} rollups"))
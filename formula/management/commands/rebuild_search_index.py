@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from formula.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for articles and pages"
+
+    def handle(self, *args, **options):
+        totals = rebuild_index()
+
+        if not totals:
+            self.stdout.write(
+                self.style.WARNING("Full-text search is not supported by this database")
+            )
+            return
+
+        for model, total in totals.items():
+            self.stdout.write(
+                self.style.SUCCESS(f"Indexed {total} {model._meta.verbose_name_plural}")
+            )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from formula.driver_statistics import refresh_driver_statistics
+
+
+class Command(BaseCommand):
+    help = "Recalculate materialized statistics for all drivers"
+
+    def handle(self, *args, **options):
+        total = refresh_driver_statistics()
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed statistics for {total} drivers")
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from formula.related import refresh_related_articles
+
+
+class Command(BaseCommand):
+    help = "Recalculate the related articles of every published article"
+
+    def handle(self, *args, **options):
+        rows = refresh_related_articles()
+        self.stdout.write(self.style.SUCCESS(f"Stored {rows} related articles"))
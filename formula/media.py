@@ -0,0 +1,79 @@
+import json
+import shutil
+import subprocess
+
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from formula.models import Media
+
+
+def _image_metadata(media):
+    with media.file.open("rb") as file:
+        try:
+            with Image.open(file) as image:
+                return {"width": image.width, "height": image.height}
+        except (UnidentifiedImageError, OSError):
+            return None
+
+
+def _stream_metadata(media):
+    # 音视频时长需要 ffprobe，并且只能读取本地文件
+    ffprobe = shutil.which("ffprobe")
+
+    if ffprobe is None:
+        return None
+
+    try:
+        path = media.file.path
+    except NotImplementedError:
+        return None
+
+    try:
+        output = subprocess.run(
+            [
+                ffprobe,
+                "-v",
+                "error",
+                "-print_format",
+                "json",
+                "-show_format",
+                "-show_streams",
+                path,
+            ],
+            capture_output=True,
+            check=True,
+            timeout=60,
+        ).stdout
+        probe = json.loads(output)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+    metadata = {}
+
+    if probe.get("format", {}).get("duration"):
+        metadata["duration"] = float(probe["format"]["duration"])
+
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == "video":
+            metadata["width"] = stream.get("width")
+            metadata["height"] = stream.get("height")
+            break
+
+    return metadata
+
+
+def extract_metadata(media_id):
+    """读取图片尺寸和音视频时长，在后台任务中执行"""
+    media = Media.objects.filter(pk=media_id).first()
+
+    if media is None or not media.file:
+        return None
+
+    metadata = _image_metadata(media) or _stream_metadata(media) or {}
+
+    # update() 不会再次触发 post_save
+    Media.objects.filter(pk=media.pk).update(
+        metadata_extracted_at=timezone.now(), **metadata
+    )
+    return metadata
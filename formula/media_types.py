@@ -0,0 +1,94 @@
+import os
+
+# 扩展名只在无法识别文件头时使用
+IMAGE_EXTENSIONS = frozenset(
+    [".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".bmp", ".avif", ".tiff"]
+)
+VIDEO_EXTENSIONS = frozenset([".mp4", ".avi", ".mov", ".wmv", ".flv", ".webm", ".mkv"])
+AUDIO_EXTENSIONS = frozenset([".mp3", ".wav", ".ogg", ".aac", ".flac", ".wma", ".m4a"])
+DOCUMENT_EXTENSIONS = frozenset(
+    [".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".txt", ".csv"]
+)
+
+HEADER_SIZE = 512
+
+# (偏移, 文件头, 类型)
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image"),
+    (0, b"\x89PNG\r\n\x1a\n", "image"),
+    (0, b"GIF87a", "image"),
+    (0, b"GIF89a", "image"),
+    (0, b"BM", "image"),
+    (0, b"II*\x00", "image"),
+    (0, b"MM\x00*", "image"),
+    (0, b"\x00\x00\x01\x00", "image"),
+    (0, b"\x1a\x45\xdf\xa3", "video"),
+    (0, b"FLV", "video"),
+    (0, b"\x00\x00\x01\xba", "video"),
+    (0, b"\x00\x00\x01\xb3", "video"),
+    (0, b"ID3", "audio"),
+    (0, b"fLaC", "audio"),
+    (0, b"OggS", "audio"),
+    (0, b"\xff\xfb", "audio"),
+    (0, b"\xff\xf3", "audio"),
+    (0, b"\xff\xf2", "audio"),
+    (0, b"\xff\xf1", "audio"),
+    (0, b"\xff\xf9", "audio"),
+    (0, b"%PDF", "document"),
+]
+
+# RIFF 和 ISO BMFF 容器需要看子类型
+RIFF_TYPES = {b"WEBP": "image", b"AVI ": "video", b"WAVE": "audio"}
+FTYP_BRANDS = {
+    b"avif": "image",
+    b"avis": "image",
+    b"heic": "image",
+    b"heix": "image",
+    b"mif1": "image",
+    b"M4A ": "audio",
+    b"M4B ": "audio",
+}
+
+
+def kind_from_extension(filename):
+    extension = os.path.splitext(filename or "")[1].lower()
+
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    if extension in AUDIO_EXTENSIONS:
+        return "audio"
+    if extension in DOCUMENT_EXTENSIONS:
+        return "document"
+    return "other"
+
+
+def kind_from_header(header):
+    """根据文件头判断类型，无法识别时返回 None"""
+    if header[:4] == b"RIFF":
+        return RIFF_TYPES.get(header[8:12])
+
+    if header[4:8] == b"ftyp":
+        # 其余品牌（isom、mp42、qt 等）都是视频容器
+        return FTYP_BRANDS.get(header[8:12], "video")
+
+    for offset, signature, kind in SIGNATURES:
+        if header[offset : offset + len(signature)] == signature:
+            return kind
+
+    text = header.lstrip().lower()
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "image"
+
+    return None
+
+
+def detect_media_kind(file):
+    """读取文件头判断媒体类型，读取后恢复文件位置"""
+    position = file.tell()
+    file.seek(0)
+    header = file.read(HEADER_SIZE)
+    file.seek(position)
+
+    return kind_from_header(header) or kind_from_extension(file.name)
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from formula.models import (
+    Article,
+    ContentStatus,
+    Driver,
+    DriverStatus,
+    Inquiry,
+    Message,
+    Race,
+    Standing,
+)
+
+METRICS_CACHE_KEY = "dashboard-metrics"
+
+# 防止连续的修改重复安排后台刷新
+METRICS_REFRESH_LOCK_KEY = f"{METRICS_CACHE_KEY}:refresh"
+METRICS_REFRESH_DELAY = 10
+
+# 积分和比赛数按比赛日期比较最近两个周期，后台首页的卡片比较最近两周
+RACE_PERIOD = timedelta(days=30)
+KPI_PERIOD = timedelta(days=7)
+
+
+def change(recent, previous):
+    """返回环比变化的百分比，上个周期为 0 时返回 None"""
+    if not previous:
+        return None
+
+    return (recent - previous) * 100 / previous
+
+
+def progress(value):
+    """返回 kpi_progress.html 使用的趋势和格式化后的百分比"""
+    if value is None:
+        return None, "-"
+
+    if value > 0:
+        return "positive", f"{value:+.1f}%"
+
+    if value < 0:
+        return "negative", f"{value:+.1f}%"
+
+    return None, "0.0%"
+
+
+def _period_counts(queryset, field, now, period, condition=None):
+    """一次查询统计最近两个周期的数量"""
+    condition = condition or Q()
+    recent = Q(**{f"{field}__gte": now - period})
+    previous = Q(**{f"{field}__gte": now - 2 * period, f"{field}__lt": now - period})
+
+    return queryset.aggregate(
+        recent=Count("pk", filter=condition & recent),
+        previous=Count("pk", filter=condition & previous),
+    )
+
+
+def compute_metrics():
+    """计算后台首页和车手列表使用的所有指标，每个模型一次查询"""
+    now = timezone.now()
+    today = timezone.localdate()
+
+    drivers = Driver.objects.aggregate(
+        total=Count("pk"),
+        active=Count("pk", filter=Q(status=DriverStatus.ACTIVE)),
+        inactive=Count("pk", filter=Q(status=DriverStatus.INACTIVE)),
+    )
+    points = Standing.objects.aggregate(
+        total=Sum("points"),
+        recent=Sum("points", filter=Q(race__date__gt=today - RACE_PERIOD)),
+        previous=Sum(
+            "points",
+            filter=Q(
+                race__date__gt=today - 2 * RACE_PERIOD,
+                race__date__lte=today - RACE_PERIOD,
+            ),
+        ),
+    )
+    races = Race.objects.aggregate(
+        total=Count("pk"),
+        recent=Count("pk", filter=Q(date__gt=today - RACE_PERIOD)),
+        previous=Count(
+            "pk",
+            filter=Q(date__gt=today - 2 * RACE_PERIOD, date__lte=today - RACE_PERIOD),
+        ),
+    )
+
+    articles = _period_counts(
+        Article.objects.all(),
+        "published_at",
+        now,
+        KPI_PERIOD,
+        Q(status=ContentStatus.PUBLISHED),
+    )
+    inquiries = _period_counts(Inquiry.objects.all(), "created_at", now, KPI_PERIOD)
+    messages = _period_counts(Message.objects.all(), "created_at", now, KPI_PERIOD)
+
+    return {
+        "computed_at": now,
+        "drivers": {
+            **drivers,
+            "active_share": drivers["active"] * 100 / drivers["total"]
+            if drivers["total"]
+            else None,
+            "inactive_share": drivers["inactive"] * 100 / drivers["total"]
+            if drivers["total"]
+            else None,
+        },
+        "points": {
+            "total": points["total"] or 0,
+            "change": change(points["recent"] or 0, points["previous"] or 0),
+        },
+        "races": {**races, "change": change(races["recent"], races["previous"])},
+        "articles": {**articles, "change": change(**articles)},
+        "inquiries": {**inquiries, "change": change(**inquiries)},
+        "messages": {**messages, "change": change(**messages)},
+    }
+
+
+def get_metrics():
+    metrics = cache.get(METRICS_CACHE_KEY)
+
+    if metrics is None:
+        metrics = refresh_metrics()
+
+    return metrics
+
+
+def refresh_metrics():
+    metrics = compute_metrics()
+    cache.set(METRICS_CACHE_KEY, metrics, settings.DASHBOARD_METRICS_TTL)
+    return metrics
+
+
+def refresh_scheduled_metrics():
+    """后台任务使用，先释放锁，计算期间提交的修改会再安排一次刷新"""
+    cache.delete(METRICS_REFRESH_LOCK_KEY)
+    return refresh_metrics()
+
+
+def _invalidate():
+    from formula.tasks import refresh_dashboard_metrics
+
+    # 没有 Celery worker 时任务会在写入请求中执行，改为下一次渲染时重新计算
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        cache.delete(METRICS_CACHE_KEY)
+        return
+
+    if cache.add(METRICS_REFRESH_LOCK_KEY, 1, timeout=METRICS_REFRESH_DELAY):
+        refresh_dashboard_metrics.apply_async(countdown=METRICS_REFRESH_DELAY)
+
+
+def invalidate_metrics():
+    """提交后安排后台重新计算，计算完成前继续显示缓存的指标，渲染不需要等待查询"""
+    transaction.on_commit(_invalidate)
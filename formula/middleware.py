@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
+from formula.exceptions import ReadonlyException
+
 
 class ReadonlyExceptionHandlerMiddleware:
     def __init__(self, get_response):
@@ -13,11 +15,7 @@ class ReadonlyExceptionHandlerMiddleware:
         return response
 
     def process_exception(self, request, exception):
-        if (
-            exception
-            and repr(exception)
-            == "ReadonlyException('Database is operating in readonly mode. Not possible to save any data.')"
-        ):
+        if isinstance(exception, ReadonlyException):
             messages.warning(
                 request,
                 _(
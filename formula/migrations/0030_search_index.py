@@ -0,0 +1,58 @@
+from django.db import migrations
+from django.utils.html import strip_tags
+
+from formula.search import create_index_tables, drop_index_tables
+
+
+def create_search_index(apps, schema_editor):
+    create_index_tables(schema_editor)
+
+    vendor = schema_editor.connection.vendor
+
+    if vendor not in ("sqlite", "postgresql"):
+        return
+
+    for model_name, table, body_fields in (
+        ("Article", "cms_articles_search", ["excerpt", "content"]),
+        ("Page", "cms_pages_search", ["content"]),
+    ):
+        model = apps.get_model("formula", model_name)
+        rows = [
+            (
+                instance.pk,
+                instance.title,
+                " ".join(strip_tags(getattr(instance, field)) for field in body_fields),
+            )
+            for instance in model.objects.filter(status="PUBLISHED").iterator()
+        ]
+
+        if not rows:
+            continue
+
+        with schema_editor.connection.cursor() as cursor:
+            if vendor == "sqlite":
+                cursor.executemany(
+                    f"INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)",
+                    rows,
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {table} (id, document) VALUES (%s, "
+                    "setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'B'))",
+                    rows,
+                )
+
+
+def delete_search_index(apps, schema_editor):
+    drop_index_tables(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0029_historicalcategory"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, delete_search_index),
+    ]
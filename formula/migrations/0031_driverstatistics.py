@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+
+def populate_driver_statistics(apps, schema_editor):
+    Driver = apps.get_model("formula", "Driver")
+    DriverStatistics = apps.get_model("formula", "DriverStatistics")
+    Race = apps.get_model("formula", "Race")
+    Standing = apps.get_model("formula", "Standing")
+
+    totals = {
+        row["driver"]: row
+        for row in Standing.objects.order_by()
+        .values("driver")
+        .annotate(points=Sum("points"), races=Count("race", distinct=True))
+    }
+    wins = dict(
+        Race.objects.order_by()
+        .values("winner")
+        .annotate(wins=Count("pk"))
+        .values_list("winner", "wins")
+    )
+    drivers = Driver.objects.annotate(
+        latest_constructor=Subquery(
+            Standing.objects.filter(driver=OuterRef("pk"))
+            .order_by("-race__date", "-pk")
+            .values("constructor")[:1]
+        )
+    ).values_list("pk", "latest_constructor")
+
+    DriverStatistics.objects.bulk_create(
+        [
+            DriverStatistics(
+                driver_id=driver_id,
+                total_points=totals.get(driver_id, {}).get("points") or 0,
+                total_races=totals.get(driver_id, {}).get("races") or 0,
+                total_wins=wins.get(driver_id, 0),
+                latest_constructor_id=latest_constructor_id,
+            )
+            for driver_id, latest_constructor_id in drivers
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0030_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverStatistics",
+            fields=[
+                (
+                    "driver",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="formula.driver",
+                        verbose_name="driver",
+                    ),
+                ),
+                (
+                    "total_points",
+                    models.DecimalField(
+                        db_index=True,
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="total points",
+                    ),
+                ),
+                (
+                    "total_wins",
+                    models.PositiveIntegerField(default=0, verbose_name="total wins"),
+                ),
+                (
+                    "total_races",
+                    models.PositiveIntegerField(default=0, verbose_name="total races"),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(auto_now=True, verbose_name="modified at"),
+                ),
+                (
+                    "latest_constructor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="formula.constructor",
+                        verbose_name="latest constructor",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "driver statistics",
+                "verbose_name_plural": "driver statistics",
+                "db_table": "driver_statistics",
+            },
+        ),
+        migrations.RunPython(populate_driver_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0031_driverstatistics"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["status", "-published_at", "-created_at", "-id"],
+                name="cms_article_status_78dcfc_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["category", "status", "-published_at", "-created_at", "-id"],
+                name="cms_article_categor_59cdda_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="standing",
+            index=models.Index(
+                fields=["weight", "created_at", "id"],
+                name="standings_weight_d5e27a_idx",
+            ),
+        ),
+    ]
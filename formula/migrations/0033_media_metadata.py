@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0032_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="checksum",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                max_length=64,
+                verbose_name="checksum",
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="duration",
+            field=models.FloatField(blank=True, null=True, verbose_name="duration"),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="metadata_extracted_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="metadata extracted at",
+            ),
+        ),
+        migrations.AddField(
+            model_name="media",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="width"
+            ),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:54
+
+import formula.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0033_media_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Blob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(auto_now=True, verbose_name="modified at"),
+                ),
+                (
+                    "checksum",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="checksum"
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=255, unique=True, verbose_name="name"),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(default=0, verbose_name="size"),
+                ),
+                (
+                    "reference_count",
+                    models.IntegerField(default=0, verbose_name="reference count"),
+                ),
+            ],
+            options={
+                "verbose_name": "blob",
+                "verbose_name_plural": "blobs",
+                "db_table": "cms_blobs",
+            },
+        ),
+        migrations.AlterField(
+            model_name="article",
+            name="featured_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=formula.storage.blob_storage,
+                upload_to="",
+                verbose_name="featured image",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=formula.storage.blob_storage,
+                upload_to="",
+                verbose_name="image",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="driver",
+            name="picture",
+            field=models.ImageField(
+                blank=True,
+                default=None,
+                null=True,
+                storage=formula.storage.blob_storage,
+                upload_to="",
+                verbose_name="picture",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="media",
+            name="file",
+            field=models.FileField(
+                storage=formula.storage.blob_storage,
+                upload_to="cms/media/",
+                verbose_name="file",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="profile",
+            name="picture",
+            field=models.ImageField(
+                blank=True,
+                default=None,
+                null=True,
+                storage=formula.storage.blob_storage,
+                upload_to="",
+                verbose_name="picture",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+from formula.media_types import (
+    AUDIO_EXTENSIONS,
+    DOCUMENT_EXTENSIONS,
+    IMAGE_EXTENSIONS,
+    VIDEO_EXTENSIONS,
+)
+
+
+def populate_media_kind(apps, schema_editor):
+    # 已有文件按扩展名分类，不读取存储中的文件
+    Media = apps.get_model("formula", "Media")
+
+    for kind, extensions in (
+        ("image", IMAGE_EXTENSIONS),
+        ("video", VIDEO_EXTENSIONS),
+        ("audio", AUDIO_EXTENSIONS),
+        ("document", DOCUMENT_EXTENSIONS),
+    ):
+        Media.objects.filter(file_type__in=extensions).update(media_kind=kind)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0034_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="media",
+            name="media_kind",
+            field=models.CharField(
+                choices=[
+                    ("image", "Image"),
+                    ("video", "Video"),
+                    ("audio", "Audio"),
+                    ("document", "Document"),
+                    ("other", "Other"),
+                ],
+                default="other",
+                editable=False,
+                max_length=20,
+                verbose_name="media kind",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="media",
+            index=models.Index(
+                fields=["media_kind", "created_at"], name="cms_media_media_k_ec05de_idx"
+            ),
+        ),
+        migrations.RunPython(populate_media_kind, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def populate_category_path(apps, schema_editor):
+    Category = apps.get_model("formula", "Category")
+    children = defaultdict(list)
+
+    for pk, parent_id in Category.objects.values_list("pk", "parent_id"):
+        children[parent_id].append(pk)
+
+    categories = []
+    stack = [(pk, "", 0) for pk in children[None]]
+
+    while stack:
+        pk, prefix, depth = stack.pop()
+        path = f"{prefix}{pk:08x}/"
+        categories.append(Category(pk=pk, path=path, depth=depth))
+        stack.extend((child, path, depth + 1) for child in children[pk])
+
+    Category.objects.bulk_update(categories, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0035_media_kind"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="depth"
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=255,
+                verbose_name="tree path",
+            ),
+        ),
+        migrations.RunPython(populate_category_path, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0036_category_tree"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedArticle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="rank")),
+                ("score", models.FloatField(verbose_name="score")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="formula.article",
+                        verbose_name="article",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="formula.article",
+                        verbose_name="related article",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "related article",
+                "verbose_name_plural": "related articles",
+                "db_table": "cms_related_articles",
+                "ordering": ["article", "rank"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="relatedarticle",
+            constraint=models.UniqueConstraint(
+                fields=("article", "rank"), name="unique_related_article_rank"
+            ),
+        ),
+    ]
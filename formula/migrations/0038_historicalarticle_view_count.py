@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0037_related_articles"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="historicalarticle",
+            name="view_count",
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0038_historicalarticle_view_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Rollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("series", models.CharField(max_length=32, verbose_name="series")),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("DAY", "Day"), ("WEEK", "Week")],
+                        max_length=8,
+                        verbose_name="period",
+                    ),
+                ),
+                ("start", models.DateField(verbose_name="start")),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14, verbose_name="value"
+                    ),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(auto_now=True, verbose_name="modified at"),
+                ),
+            ],
+            options={
+                "verbose_name": "rollup",
+                "verbose_name_plural": "rollups",
+                "db_table": "dashboard_rollups",
+                "ordering": ["series", "period", "start"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("series", "period", "start"),
+                        name="unique_rollup_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
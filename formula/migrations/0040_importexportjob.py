@@ -0,0 +1,139 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:16
+
+import django.db.models.deletion
+import formula.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("formula", "0039_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(auto_now=True, verbose_name="modified at"),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("IMPORT", "Import"), ("EXPORT", "Export")],
+                        max_length=8,
+                        verbose_name="kind",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("COMPLETED", "Completed"),
+                            ("FAILED", "Failed"),
+                        ],
+                        db_index=True,
+                        default="PENDING",
+                        max_length=16,
+                        verbose_name="status",
+                    ),
+                ),
+                ("resource", models.CharField(max_length=255, verbose_name="resource")),
+                (
+                    "file_format",
+                    models.CharField(max_length=255, verbose_name="format"),
+                ),
+                (
+                    "query",
+                    models.BinaryField(blank=True, null=True, verbose_name="query"),
+                ),
+                (
+                    "options",
+                    models.JSONField(blank=True, default=dict, verbose_name="options"),
+                ),
+                (
+                    "input_file",
+                    models.FileField(
+                        blank=True,
+                        storage=formula.storage.job_storage,
+                        upload_to="imports/",
+                        verbose_name="input file",
+                    ),
+                ),
+                (
+                    "result_file",
+                    models.FileField(
+                        blank=True,
+                        storage=formula.storage.job_storage,
+                        upload_to="exports/",
+                        verbose_name="result file",
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(default=0, verbose_name="total")),
+                (
+                    "processed",
+                    models.PositiveIntegerField(default=0, verbose_name="processed"),
+                ),
+                (
+                    "summary",
+                    models.JSONField(blank=True, default=dict, verbose_name="summary"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="error")),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="started at"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="finished at"
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                        verbose_name="model",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="import_export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "import/export job",
+                "verbose_name_plural": "import/export jobs",
+                "db_table": "import_export_jobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
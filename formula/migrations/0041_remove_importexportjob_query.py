@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+from django.db import migrations
+
+
+def fail_pending_exports(apps, schema_editor):
+    # 旧的导出任务只保存了序列化的查询，删除字段后无法还原过滤条件
+    ImportExportJob = apps.get_model("formula", "ImportExportJob")
+    ImportExportJob.objects.filter(
+        kind="EXPORT", status__in=["PENDING", "RUNNING"]
+    ).update(status="FAILED", error="Export was queued before an upgrade.")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("formula", "0040_importexportjob"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_pending_exports, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="importexportjob",
+            name="query",
+        ),
+    ]
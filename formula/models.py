@@ -1,13 +1,20 @@
+from collections import defaultdict
+
 from django.contrib.auth.models import AbstractUser
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.translation import gettext_lazy as _
 from djmoney.models.fields import MoneyField
-from simple_history.models import HistoricalRecords
-from django.utils.text import slugify
 
 from formula.encoders import PrettyJSONEncoder
+from formula.history import HistoricalRecords
+from formula.media_types import detect_media_kind
+from formula.slugs import UniqueSlugMixin
+from formula.storage import blob_storage, content_hash, job_storage
 
 
 class DriverStatus(models.TextChoices):
@@ -73,7 +80,9 @@ class User(AbstractUser, AuditedModel):
 
 class Profile(AuditedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    picture = models.ImageField(_("picture"), null=True, blank=True, default=None)
+    picture = models.ImageField(
+        _("picture"), null=True, blank=True, default=None, storage=blob_storage
+    )
     resume = models.FileField(_("resume"), null=True, blank=True, default=None)
     link = models.URLField(_("link"), null=True, blank=True)
     data = models.JSONField(_("data"), null=True, blank=True)
@@ -112,7 +121,9 @@ class Driver(AuditedModel):
         blank=True,
         max_length=255,
     )
-    picture = models.ImageField(_("picture"), null=True, blank=True, default=None)
+    picture = models.ImageField(
+        _("picture"), null=True, blank=True, default=None, storage=blob_storage
+    )
     born_at = models.DateField(_("born"), null=True, blank=True)
     last_race_at = models.DateField(_("last race"), null=True, blank=True)
     best_time = models.TimeField(_("best time"), null=True, blank=True)
@@ -169,7 +180,7 @@ class Driver(AuditedModel):
         help_text="This field is only visible if the status is INACTIVE",
     )
     data = models.JSONField(_("data"), null=True, blank=True, encoder=PrettyJSONEncoder)
-    history = HistoricalRecords()
+    history = HistoricalRecords(skip_unchanged=True)
     is_active = models.BooleanField(_("active"), default=False)
     is_retired = models.BooleanField(
         _("retired"),
@@ -207,7 +218,7 @@ class Driver(AuditedModel):
 
 
 class DriverWithFilters(Driver):
-    history = HistoricalRecords()
+    history = HistoricalRecords(skip_unchanged=True)
 
     class Meta:
         proxy = True
@@ -270,11 +281,47 @@ class Standing(AuditedModel):
         verbose_name = _("standing")
         verbose_name_plural = _("standings")
         ordering = ["weight"]
+        indexes = [
+            # 后台游标分页的排序
+            models.Index(fields=["weight", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.driver.full_name}, {self.position}"
 
 
+class DriverStatistics(models.Model):
+    driver = models.OneToOneField(
+        Driver,
+        verbose_name=_("driver"),
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="statistics",
+    )
+    total_points = models.DecimalField(
+        _("total points"), decimal_places=2, max_digits=10, default=0, db_index=True
+    )
+    total_wins = models.PositiveIntegerField(_("total wins"), default=0)
+    total_races = models.PositiveIntegerField(_("total races"), default=0)
+    latest_constructor = models.ForeignKey(
+        Constructor,
+        verbose_name=_("latest constructor"),
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    modified_at = models.DateTimeField(_("modified at"), auto_now=True)
+
+    class Meta:
+        db_table = "driver_statistics"
+        verbose_name = _("driver statistics")
+        verbose_name_plural = _("driver statistics")
+
+    def __str__(self):
+        return str(self.driver)
+
+
 ######################################################################
 # CMS Content Management Models
 ######################################################################
@@ -286,7 +333,78 @@ class ContentStatus(models.TextChoices):
     ARCHIVED = "ARCHIVED", _("Archived")
 
 
-class Category(AuditedModel):
+class MediaKind(models.TextChoices):
+    IMAGE = "image", _("Image")
+    VIDEO = "video", _("Video")
+    AUDIO = "audio", _("Audio")
+    DOCUMENT = "document", _("Document")
+    OTHER = "other", _("Other")
+
+
+# 物化路径中每一层是固定宽度的十六进制主键，按字符串排序即为树的先序遍历
+CATEGORY_PATH_WIDTH = 8
+CATEGORY_PATH_SEPARATOR = "/"
+
+
+def category_path_segment(pk):
+    return f"{pk:0{CATEGORY_PATH_WIDTH}x}{CATEGORY_PATH_SEPARATOR}"
+
+
+def category_subtree_range(path):
+    """返回子树路径的 [下界, 上界)，范围查询可以使用路径上的索引
+
+    "0" 是 "/" 的下一个字符，所以以 path 开头的路径都小于 path[:-1] + "0"。
+    """
+    return path, path[:-1] + chr(ord(CATEGORY_PATH_SEPARATOR) + 1)
+
+
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, path, include_self=True):
+        lower, upper = category_subtree_range(path)
+
+        if include_self:
+            return self.filter(path__gte=lower, path__lt=upper)
+
+        return self.filter(path__gt=lower, path__lt=upper)
+
+    def rebuild_tree(self, batch_size=500):
+        """根据 parent 重新计算所有路径，用于修复 update() 等绕过 save() 的修改
+
+        返回更新的分类数量，形成环的分类无法从根分类到达，路径会被清空。
+        """
+        children = defaultdict(list)
+        categories = {}
+
+        for category in self.model.objects.only("pk", "parent", "path", "depth"):
+            children[category.parent_id].append(category.pk)
+            categories[category.pk] = category
+
+        positions = {}
+        stack = [(pk, "", 0) for pk in children[None]]
+
+        while stack:
+            pk, prefix, depth = stack.pop()
+            positions[pk] = (prefix + category_path_segment(pk), depth)
+            stack.extend(
+                (child, positions[pk][0], depth + 1) for child in children[pk]
+            )
+
+        changed = []
+
+        for pk, category in categories.items():
+            path, depth = positions.get(pk, ("", 0))
+
+            if (category.path, category.depth) != (path, depth):
+                category.path, category.depth = path, depth
+                changed.append(category)
+
+        self.model.objects.bulk_update(
+            changed, ["path", "depth"], batch_size=batch_size
+        )
+        return len(changed)
+
+
+class Category(UniqueSlugMixin, AuditedModel):
     name = models.CharField(_("name"), max_length=255)
     slug = models.SlugField(_("slug"), max_length=255, unique=True)
     description = models.TextField(_("description"), blank=True)
@@ -298,9 +416,19 @@ class Category(AuditedModel):
         blank=True,
         related_name="children",
     )
-    image = models.ImageField(_("image"), null=True, blank=True)
+    image = models.ImageField(_("image"), null=True, blank=True, storage=blob_storage)
     is_active = models.BooleanField(_("active"), default=True)
     order = models.PositiveIntegerField(_("order"), default=0)
+    path = models.CharField(
+        _("tree path"), max_length=255, default="", editable=False, db_index=True
+    )
+    depth = models.PositiveSmallIntegerField(_("depth"), default=0, editable=False)
+    history = HistoricalRecords(excluded_fields=["path", "depth"], skip_unchanged=True)
+
+    objects = CategoryQuerySet.as_manager()
+
+    slug_source = "name"
+    slug_fallback = "category"
 
     class Meta:
         db_table = "cms_categories"
@@ -311,32 +439,95 @@ class Category(AuditedModel):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        super().clean()
+
+        if self.pk and self.parent_id:
+            parent_path = (
+                Category.objects.filter(pk=self.parent_id)
+                .values_list("path", flat=True)
+                .first()
+            )
+
+            if self.parent_id == self.pk or (
+                self.path and parent_path and parent_path.startswith(self.path)
+            ):
+                raise ValidationError(
+                    {"parent": _("A category cannot be moved below itself.")}
+                )
+
+    @property
+    def ancestor_ids(self):
+        return [
+            int(segment, 16)
+            for segment in self.path.split(CATEGORY_PATH_SEPARATOR)[:-2]
+        ]
+
+    def get_ancestors(self, include_self=False):
+        """从根分类开始的所有上级分类，只需要一次查询"""
+        ids = self.ancestor_ids
+
+        if include_self:
+            ids.append(self.pk)
+
+        return Category.objects.filter(pk__in=ids).order_by("depth")
+
+    def get_descendants(self, include_self=False):
+        """所有下级分类，按树的先序排列"""
+        return Category.objects.subtree(self.path, include_self).order_by("path")
+
+    def _update_tree_path(self):
+        """根据上级分类重新计算路径，移动分类时整个子树一起更新"""
+        parent = None
+
+        if self.parent_id:
+            parent = (
+                Category.objects.filter(pk=self.parent_id)
+                .values("path", "depth")
+                .first()
+            )
+
+        path = (parent["path"] if parent else "") + category_path_segment(self.pk)
+        depth = parent["depth"] + 1 if parent else 0
+        old_path, old_depth = self.path, self.depth
+
+        if path == old_path and depth == old_depth:
+            return
+
+        if not old_path:
+            Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+        elif path.startswith(old_path):
+            raise ValueError("A category cannot be moved below itself.")
+        else:
+            Category.objects.subtree(old_path).update(
+                path=Concat(
+                    Value(path),
+                    Substr("path", len(old_path) + 1),
+                    output_field=models.CharField(),
+                ),
+                depth=F("depth") + (depth - old_depth),
+            )
+
+        self.path, self.depth = path, depth
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Handle Chinese characters and other non-ASCII characters
-            import re
-            import unicodedata
-            
-            # Convert to ASCII-friendly string
-            name = self.name
-            # Normalize unicode characters
-            name = unicodedata.normalize('NFKD', name)
-            # Remove non-ASCII characters and replace with spaces
-            name = re.sub(r'[^\x00-\x7F]+', ' ', name)
-            # Generate slug
-            self.slug = slugify(name)
-            # If slug is still empty, use a fallback
-            if not self.slug:
-                self.slug = f"category-{self.id}" if self.id else "category"
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+            if update_fields is None or {"parent", "parent_id"} & set(update_fields):
+                self._update_tree_path()
 
 
-class Article(AuditedModel):
+class Article(UniqueSlugMixin, AuditedModel):
     title = models.CharField(_("title"), max_length=255)
     slug = models.SlugField(_("slug"), max_length=255, unique=True)
     content = models.TextField(_("content"))
     excerpt = models.TextField(_("excerpt"), blank=True)
-    featured_image = models.ImageField(_("featured image"), null=True, blank=True)
+    featured_image = models.ImageField(
+        _("featured image"), null=True, blank=True, storage=blob_storage
+    )
     category = models.ForeignKey(
         Category,
         verbose_name=_("category"),
@@ -362,34 +553,27 @@ class Article(AuditedModel):
     is_featured = models.BooleanField(_("featured"), default=False)
     view_count = models.PositiveIntegerField(_("view count"), default=0)
     tags = GenericRelation(Tag)
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=["view_count"], skip_unchanged=True)
+
+    slug_fallback = "article"
 
     class Meta:
         db_table = "cms_articles"
         verbose_name = _("article")
         verbose_name_plural = _("articles")
         ordering = ["-published_at", "-created_at"]
+        indexes = [
+            # 文章列表和分类页的游标分页
+            models.Index(fields=["status", "-published_at", "-created_at", "-id"]),
+            models.Index(
+                fields=["category", "status", "-published_at", "-created_at", "-id"]
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Handle Chinese characters and other non-ASCII characters
-            import re
-            import unicodedata
-            
-            # Convert to ASCII-friendly string
-            title = self.title
-            # Normalize unicode characters
-            title = unicodedata.normalize('NFKD', title)
-            # Remove non-ASCII characters and replace with spaces
-            title = re.sub(r'[^\x00-\x7F]+', ' ', title)
-            # Generate slug
-            self.slug = slugify(title)
-            # If slug is still empty, use a fallback
-            if not self.slug:
-                self.slug = f"article-{self.id}" if self.id else "article"
         if self.status == ContentStatus.PUBLISHED and not self.published_at:
             from django.utils import timezone
 
@@ -397,7 +581,38 @@ class Article(AuditedModel):
         super().save(*args, **kwargs)
 
 
-class Page(AuditedModel):
+class RelatedArticle(models.Model):
+    article = models.ForeignKey(
+        Article,
+        verbose_name=_("article"),
+        on_delete=models.CASCADE,
+        related_name="related_links",
+    )
+    related = models.ForeignKey(
+        Article,
+        verbose_name=_("related article"),
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    rank = models.PositiveSmallIntegerField(_("rank"))
+    score = models.FloatField(_("score"))
+
+    class Meta:
+        db_table = "cms_related_articles"
+        verbose_name = _("related article")
+        verbose_name_plural = _("related articles")
+        ordering = ["article", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["article", "rank"], name="unique_related_article_rank"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} -> {self.related_id}"
+
+
+class Page(UniqueSlugMixin, AuditedModel):
     title = models.CharField(_("title"), max_length=255)
     slug = models.SlugField(_("slug"), max_length=255, unique=True)
     content = models.TextField(_("content"))
@@ -414,7 +629,9 @@ class Page(AuditedModel):
     meta_keywords = models.CharField(_("meta keywords"), max_length=255, blank=True)
     is_homepage = models.BooleanField(_("homepage"), default=False)
     order = models.PositiveIntegerField(_("order"), default=0)
-    history = HistoricalRecords()
+    history = HistoricalRecords(skip_unchanged=True)
+
+    slug_fallback = "page"
 
     class Meta:
         db_table = "cms_pages"
@@ -426,22 +643,6 @@ class Page(AuditedModel):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Handle Chinese characters and other non-ASCII characters
-            import re
-            import unicodedata
-            
-            # Convert to ASCII-friendly string
-            title = self.title
-            # Normalize unicode characters
-            title = unicodedata.normalize('NFKD', title)
-            # Remove non-ASCII characters and replace with spaces
-            title = re.sub(r'[^\x00-\x7F]+', ' ', title)
-            # Generate slug
-            self.slug = slugify(title)
-            # If slug is still empty, use a fallback
-            if not self.slug:
-                self.slug = f"page-{self.id}" if self.id else "page"
         if self.status == ContentStatus.PUBLISHED and not self.published_at:
             from django.utils import timezone
 
@@ -451,8 +652,15 @@ class Page(AuditedModel):
 
 class Media(AuditedModel):
     title = models.CharField(_("title"), max_length=255)
-    file = models.FileField(_("file"), upload_to="cms/media/")
+    file = models.FileField(_("file"), upload_to="cms/media/", storage=blob_storage)
     file_type = models.CharField(_("file type"), max_length=50, blank=True)
+    media_kind = models.CharField(
+        _("media kind"),
+        max_length=20,
+        choices=MediaKind.choices,
+        default=MediaKind.OTHER,
+        editable=False,
+    )
     file_size = models.PositiveIntegerField(_("file size"), null=True, blank=True)
     alt_text = models.CharField(_("alt text"), max_length=255, blank=True)
     description = models.TextField(_("description"), blank=True)
@@ -462,25 +670,61 @@ class Media(AuditedModel):
         on_delete=models.CASCADE,
         related_name="uploaded_media",
     )
+    checksum = models.CharField(
+        _("checksum"), max_length=64, blank=True, editable=False, db_index=True
+    )
+    width = models.PositiveIntegerField(_("width"), null=True, blank=True)
+    height = models.PositiveIntegerField(_("height"), null=True, blank=True)
+    duration = models.FloatField(_("duration"), null=True, blank=True)
+    metadata_extracted_at = models.DateTimeField(
+        _("metadata extracted at"), null=True, blank=True, editable=False
+    )
 
     class Meta:
         db_table = "cms_media"
         verbose_name = _("media")
         verbose_name_plural = _("media")
         ordering = ["-created_at"]
+        indexes = [
+            # 媒体浏览器按类型浏览
+            models.Index(fields=["media_kind", "created_at"]),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if self.file:
+        # 只处理新上传的文件，已保存的文件不再读取存储
+        if self.file and not self.file._committed:
             import os
 
-            self.file_type = os.path.splitext(self.file.name)[1].lower()
-            self.file_size = self.file.size
+            upload = self.file.file
+            self.file_type = os.path.splitext(upload.name)[1].lower()
+            self.file_size = upload.size
+            self.media_kind = detect_media_kind(upload)
+            # 哈希会缓存在上传文件上，存储层保存时直接复用
+            self.checksum = content_hash(upload)
+            self.metadata_extracted_at = None
         super().save(*args, **kwargs)
 
 
+class Blob(AuditedModel):
+    """按内容哈希保存的文件，同样的内容只存储一次"""
+
+    checksum = models.CharField(_("checksum"), max_length=64, unique=True)
+    name = models.CharField(_("name"), max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(_("size"), default=0)
+    reference_count = models.IntegerField(_("reference count"), default=0)
+
+    class Meta:
+        db_table = "cms_blobs"
+        verbose_name = _("blob")
+        verbose_name_plural = _("blobs")
+
+    def __str__(self):
+        return self.name
+
+
 ######################################################################
 # Contact & Inquiry Models
 ######################################################################
@@ -600,3 +844,127 @@ class Message(AuditedModel):
 
     def __str__(self):
         return f"{self.name} - {self.subject or 'No Subject'}"
+
+
+######################################################################
+# Dashboard Rollups
+######################################################################
+
+
+class RollupPeriod(models.TextChoices):
+    DAY = "DAY", _("Day")
+    WEEK = "WEEK", _("Week")
+
+
+class Rollup(models.Model):
+    """按天和按周汇总的仪表盘数据，由 formula.rollups 维护"""
+
+    series = models.CharField(_("series"), max_length=32)
+    period = models.CharField(_("period"), max_length=8, choices=RollupPeriod.choices)
+    start = models.DateField(_("start"))
+    value = models.DecimalField(_("value"), decimal_places=2, max_digits=14, default=0)
+    modified_at = models.DateTimeField(_("modified at"), auto_now=True)
+
+    class Meta:
+        db_table = "dashboard_rollups"
+        verbose_name = _("rollup")
+        verbose_name_plural = _("rollups")
+        ordering = ["series", "period", "start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "period", "start"], name="unique_rollup_bucket"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.series}, {self.period}, {self.start}"
+
+
+######################################################################
+# Import/Export Jobs
+######################################################################
+
+
+class JobKind(models.TextChoices):
+    IMPORT = "IMPORT", _("Import")
+    EXPORT = "EXPORT", _("Export")
+
+
+class JobStatus(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    RUNNING = "RUNNING", _("Running")
+    COMPLETED = "COMPLETED", _("Completed")
+    FAILED = "FAILED", _("Failed")
+
+
+class ImportExportJob(AuditedModel):
+    """在后台分块执行的导入或导出，由 formula.jobs 处理"""
+
+    kind = models.CharField(_("kind"), max_length=8, choices=JobKind.choices)
+    status = models.CharField(
+        _("status"),
+        max_length=16,
+        choices=JobStatus.choices,
+        default=JobStatus.PENDING,
+        db_index=True,
+    )
+    content_type = models.ForeignKey(
+        ContentType, verbose_name=_("model"), on_delete=models.CASCADE
+    )
+    resource = models.CharField(_("resource"), max_length=255)
+    file_format = models.CharField(_("format"), max_length=255)
+    # 导出时保存列表页的查询参数，导入时保存文件名和是否只预览
+    options = models.JSONField(_("options"), default=dict, blank=True)
+    input_file = models.FileField(
+        _("input file"), upload_to="imports/", storage=job_storage, blank=True
+    )
+    result_file = models.FileField(
+        _("result file"), upload_to="exports/", storage=job_storage, blank=True
+    )
+    total = models.PositiveIntegerField(_("total"), default=0)
+    processed = models.PositiveIntegerField(_("processed"), default=0)
+    summary = models.JSONField(_("summary"), default=dict, blank=True)
+    error = models.TextField(_("error"), blank=True)
+    created_by = models.ForeignKey(
+        User,
+        verbose_name=_("created by"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_export_jobs",
+    )
+    started_at = models.DateTimeField(_("started at"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("finished at"), null=True, blank=True)
+
+    class Meta:
+        db_table = "import_export_jobs"
+        verbose_name = _("import/export job")
+        verbose_name_plural = _("import/export jobs")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk}"
+
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    @property
+    def percentage(self):
+        if self.status == JobStatus.COMPLETED:
+            return 100
+
+        return min(99, self.processed * 100 // self.total) if self.total else 0
+
+    @property
+    def is_preview(self):
+        return self.kind == JobKind.IMPORT and self.options.get("dry_run", False)
+
+    @property
+    def can_confirm(self):
+        """预览完成且没有错误时可以确认导入"""
+        return (
+            self.is_preview
+            and self.status == JobStatus.COMPLETED
+            and not self.summary.get("errors")
+        )
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+
+from formula.caching import page_cache_versions
+from formula.models import Article, Category, ContentStatus
+
+NAVIGATION_CACHE_PREFIX = "navigation"
+
+# 文章和分类的信号会更新这两个命名空间的版本号，版本号变化后导航随之失效
+NAVIGATION_NAMESPACES = ("article", "category")
+
+NAVIGATION_CACHE_TIMEOUT = 24 * 60 * 60
+
+FEATURED_ARTICLES_LIMIT = 6
+
+# 进程内缓存 (版本, 导航)，整体替换所以不需要加锁
+_local = (None, None)
+
+
+def build_navigation():
+    categories = list(Category.objects.filter(is_active=True).exclude(slug=""))
+    featured_articles = list(
+        Article.objects.filter(
+            status=ContentStatus.PUBLISHED, is_featured=True
+        ).select_related("category", "author")[:FEATURED_ARTICLES_LIMIT]
+    )
+
+    return {
+        "categories": categories,
+        "root_categories": [category for category in categories if not category.depth],
+        "featured_articles": featured_articles,
+    }
+
+
+def get_navigation():
+    """返回公开页面共用的分类和推荐文章
+
+    先查进程内缓存，再查共享缓存，都没有命中时才查询数据库。每次调用只需要
+    从共享缓存读取一次版本号。
+    """
+    global _local
+
+    version = ".".join(
+        str(version) for version in page_cache_versions(NAVIGATION_NAMESPACES)
+    )
+    local_version, navigation = _local
+
+    if local_version == version:
+        return navigation
+
+    key = f"{NAVIGATION_CACHE_PREFIX}:{version}"
+    navigation = cache.get(key)
+
+    if navigation is None:
+        navigation = build_navigation()
+        cache.set(key, navigation, NAVIGATION_CACHE_TIMEOUT)
+
+    _local = (version, navigation)
+    return navigation
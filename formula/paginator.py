@@ -0,0 +1,227 @@
+import base64
+import binascii
+import json
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "cursor"
+
+NEXT = "next"
+PREVIOUS = "prev"
+
+
+def encode_cursor(direction, values):
+    # str() 保留完整的时间精度，数据库比较时会重新转换类型
+    payload = json.dumps({"d": direction, "v": values}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        direction, values = payload["d"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidPage("Invalid cursor") from None
+
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidPage("Invalid cursor")
+
+    return direction, values
+
+
+class KeysetPage(Page):
+    def __init__(self, object_list, number, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator(Paginator):
+    """基于游标的分页器，按排序字段的值定位而不是 OFFSET
+
+    排序来自查询集（没有排序时使用模型默认排序），并且总是以主键结尾以保证
+    顺序唯一。任意一页都只需要沿索引读取 per_page + 1 行，和所在页数无关。
+    """
+
+    template_name = "formula/helpers/pagination_keyset.html"
+    cursor_var = CURSOR_VAR
+
+    def __init__(
+        self, object_list, per_page, orphans=0, allow_empty_first_page=True, cursor=None
+    ):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.cursor = cursor or None
+        self.current_page = None
+
+    @cached_property
+    def count(self):
+        # 和 InfinitePaginator 一样不统计总数
+        return 9_999_999_999
+
+    def validate_number(self, number):
+        return 1
+
+    @cached_property
+    def keys(self):
+        """返回 [(表达式, 是否降序, 是否可为空)]"""
+        query = self.object_list.query
+        ordering = list(query.order_by or self.object_list.model._meta.ordering)
+        keys = []
+
+        for item in ordering:
+            if isinstance(item, str):
+                if item.startswith("?"):
+                    raise ValueError(
+                        "Keyset pagination does not support random ordering"
+                    )
+
+                descending = item.startswith("-")
+                expression = F(item.lstrip("-+"))
+            elif isinstance(item, OrderBy):
+                descending = item.descending
+                expression = item.expression
+            else:
+                descending = False
+                expression = item
+
+            if isinstance(expression, F) and expression.name in ("pk", self.pk_name):
+                keys.append((F("pk"), descending, False))
+                return keys
+
+            keys.append((expression, descending, self._is_nullable(expression)))
+
+        # 主键和最后一个排序字段同向，便于复用复合索引
+        keys.append((F("pk"), keys[-1][1] if keys else False, False))
+        return keys
+
+    @property
+    def pk_name(self):
+        return self.object_list.model._meta.pk.name
+
+    def _is_nullable(self, expression):
+        resolved = expression.resolve_expression(self.object_list.query.clone())
+        target = getattr(resolved, "target", None)
+        return target is None or target.null
+
+    def _ordered(self, reverse, select=True):
+        aliases = {}
+        order_by = []
+
+        for i, (expression, descending, _nullable) in enumerate(self.keys):
+            alias = f"keyset_{i}"
+            aliases[alias] = expression
+            descending = descending != reverse
+            order_by.append(OrderBy(F(alias), descending=descending))
+
+        queryset = self.object_list.annotate if select else self.object_list.alias
+        return queryset(**aliases).order_by(*order_by), list(aliases)
+
+    def _seek(self, values, reverse):
+        """返回排在 values 之后的行的过滤条件"""
+        # 沿用数据库默认的 NULL 排序位置，这样普通索引仍然可用
+        nulls_largest = connections[self.object_list.db].features.nulls_order_largest
+        condition = Q(pk__in=[])
+        equal = Q()
+
+        for i, ((_expression, descending, nullable), value) in enumerate(
+            zip(self.keys, values, strict=True)
+        ):
+            alias = f"keyset_{i}"
+            descending = descending != reverse
+            nulls_after = nulls_largest != descending
+
+            if value is None:
+                after = (
+                    Q(pk__in=[]) if nulls_after else Q(**{f"{alias}__isnull": False})
+                )
+                same = Q(**{f"{alias}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                after = Q(**{f"{alias}__{lookup}": value})
+                if nullable and nulls_after:
+                    after |= Q(**{f"{alias}__isnull": True})
+                same = Q(**{alias: value})
+
+            condition |= equal & after
+            equal &= same
+
+        return condition
+
+    def page(self, number=1):
+        direction, values = NEXT, None
+
+        if self.cursor:
+            direction, values = decode_cursor(self.cursor)
+
+            if len(values) != len(self.keys):
+                raise InvalidPage("Invalid cursor")
+
+        reverse = direction == PREVIOUS
+        queryset, aliases = self._ordered(reverse)
+
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = list(queryset.values_list(*aliases)[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if reverse:
+            rows.reverse()
+
+        if not rows and not self.allow_empty_first_page and values is None:
+            raise InvalidPage("That page contains no results")
+
+        next_cursor = previous_cursor = None
+
+        # 向前翻页时后面一定还有数据，反之亦然
+        if rows and (has_more or reverse):
+            next_cursor = encode_cursor(NEXT, list(rows[-1]))
+
+        if rows and (has_more if reverse else values is not None):
+            previous_cursor = encode_cursor(PREVIOUS, list(rows[0]))
+
+        # 仍然返回查询集，list_editable 的表单集需要它
+        pks = [row[-1] for row in rows]
+        object_list = self._ordered(False, select=False)[0].filter(pk__in=pks)
+
+        # 后台的分页模板只能拿到分页器，这里记录当前页
+        self.current_page = KeysetPage(
+            object_list, 1, self, next_cursor, previous_cursor
+        )
+        return self.current_page
+
+    def get_page(self, number=1):
+        try:
+            return self.page(number)
+        except InvalidPage:
+            self.cursor = None
+            return self.page(number)
+
+
+class KeysetPaginationMixin:
+    """让列表视图使用游标分页，游标来自 ?cursor= 参数"""
+
+    paginator_class = KeysetPaginator
+
+    def get_paginator(
+        self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs
+    ):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            cursor=self.request.GET.get(CURSOR_VAR),
+            **kwargs,
+        )
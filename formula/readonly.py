@@ -0,0 +1,82 @@
+import time
+
+from constance import config
+from django.conf import settings
+
+from formula.exceptions import ReadonlyException
+
+READONLY_MESSAGE = (
+    "Database is operating in readonly mode. Not possible to save any data."
+)
+
+# 只读模式下仍然允许写入的数据表
+READONLY_EXEMPT_TABLES = {"studio_options"}
+
+# 运行时的开关保存在 constance 表中，只有 READONLY_MODE 设置关闭时才允许修改
+READONLY_TOGGLE_TABLE = "constance_constance"
+
+_state = {"enabled": None, "checked_at": 0.0}
+
+
+def is_readonly():
+    """当前进程的只读状态
+
+    READONLY_MODE 设置打开时始终只读。否则读取 constance 中的运行时开关，
+    所有进程共用数据库中的值，每隔 READONLY_MODE_REFRESH_INTERVAL 秒同步一次。
+    """
+    if settings.READONLY_MODE:
+        return True
+
+    now = time.monotonic()
+
+    if (
+        _state["enabled"] is None
+        or now - _state["checked_at"] >= settings.READONLY_MODE_REFRESH_INTERVAL
+    ):
+        # constance 第一次读取时会写入默认值，写入同样会经过路由，先更新时间避免递归
+        _state["checked_at"] = now
+
+        if _state["enabled"] is None:
+            _state["enabled"] = False
+
+        _state["enabled"] = bool(config.READONLY_MODE)
+
+    return _state["enabled"]
+
+
+def set_readonly(enabled):
+    """在运行时切换只读模式，其他进程会在下一次同步时生效
+
+    READONLY_MODE 设置打开时开关所在的表同样只读，无法关闭只读模式。
+    """
+    config.READONLY_MODE = bool(enabled)
+    _state["enabled"] = bool(enabled)
+    _state["checked_at"] = time.monotonic()
+
+
+def reset_readonly():
+    """关闭运行时开关，只读状态恢复为 READONLY_MODE 设置的值"""
+    set_readonly(False)
+
+
+def _is_exempt(model):
+    table = model._meta.db_table
+
+    if table == READONLY_TOGGLE_TABLE:
+        return not settings.READONLY_MODE
+
+    return table in READONLY_EXEMPT_TABLES
+
+
+class ReadonlyRouter:
+    """在选择写入数据库时拦截写操作
+
+    save()、delete()、QuerySet.update() 和 bulk_create() 都会经过
+    db_for_write，所以不需要为每个实例注册 pre_save/pre_delete 信号。
+    """
+
+    def db_for_write(self, model, **hints):
+        if is_readonly() and not _is_exempt(model):
+            raise ReadonlyException(READONLY_MESSAGE)
+
+        return None
@@ -0,0 +1,187 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from formula.models import Article, ContentStatus, RelatedArticle, Tag
+from formula.search import TOKEN_RE
+
+# 每篇文章保存的相关文章数量
+RELATED_ARTICLES_LIMIT = 6
+
+TAG_WEIGHT = 3.0
+TEXT_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+
+# 正文只取开头部分，足够代表主题
+TEXT_LENGTH = 2000
+
+# 出现在太多文章中的词没有区分度，也会让候选集合过大
+MAX_DOCUMENT_FREQUENCY = 0.05
+
+# 每个词或标签最多保留的文章数量（保留较新的文章），限制每篇文章的候选数量
+MAX_TERM_POSTINGS = 200
+
+# 文章较少时按比例计算的上限太小，至少允许出现在这么多文章中
+MIN_DOCUMENT_LIMIT = 20
+
+MIN_TOKEN_LENGTH = 2
+
+RELATED_BATCH_SIZE = 500
+
+
+def _tokens(article):
+    text = " ".join(
+        [article.title, article.title, article.excerpt, strip_tags(article.content)]
+    )
+    return [
+        token
+        for token in TOKEN_RE.findall(text[:TEXT_LENGTH].lower())
+        if len(token) >= MIN_TOKEN_LENGTH
+    ]
+
+
+def _normalize(weights):
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {key: weight / norm for key, weight in weights.items()} if norm else {}
+
+
+def _term_counts(articles):
+    """逐篇统计词频，返回 (分类, 词频)，正文用完即丢弃"""
+    categories = {}
+    counts = {}
+
+    for article in articles:
+        categories[article.pk] = article.category_id
+        counts[article.pk] = Counter(_tokens(article))
+
+    return categories, counts
+
+
+def _text_vectors(counts):
+    """TF-IDF 向量，已归一化，点积即为余弦相似度"""
+    frequencies = Counter(token for tokens in counts.values() for token in tokens)
+    total = len(counts)
+    limit = min(
+        max(MAX_DOCUMENT_FREQUENCY * total, MIN_DOCUMENT_LIMIT), MAX_TERM_POSTINGS
+    )
+
+    idf = {
+        token: math.log(total / frequency)
+        for token, frequency in frequencies.items()
+        if frequency <= limit
+    }
+
+    return {
+        pk: _normalize(
+            {
+                token: (1 + math.log(count)) * idf[token]
+                for token, count in tokens.items()
+                if token in idf
+            }
+        )
+        for pk, tokens in counts.items()
+    }
+
+
+def _tag_vectors(article_ids):
+    tags = defaultdict(set)
+    rows = Tag.objects.filter(
+        content_type=ContentType.objects.get_for_model(Article),
+        object_id__in=article_ids,
+    ).values_list("object_id", "slug")
+
+    for object_id, slug in rows:
+        tags[object_id].add(slug.lower())
+
+    return {pk: _normalize(dict.fromkeys(slugs, 1.0)) for pk, slugs in tags.items()}
+
+
+def _postings(vectors):
+    postings = defaultdict(list)
+
+    for pk, vector in vectors.items():
+        for key, weight in vector.items():
+            postings[key].append((pk, weight))
+
+    for key, items in postings.items():
+        if len(items) > MAX_TERM_POSTINGS:
+            postings[key] = heapq.nlargest(MAX_TERM_POSTINGS, items)
+
+    return postings
+
+
+def score_articles(articles, article_ids=None, limit=RELATED_ARTICLES_LIMIT):
+    """计算每篇文章得分最高的相关文章，返回 {文章: [(相关文章, 得分)]}
+
+    只比较共享标签或关键词的文章，通过倒排表累加得分，避免两两比较。articles
+    可以是迭代器，每篇文章的正文只在统计词频时使用。
+    """
+    categories, counts = _term_counts(articles)
+    text_vectors = _text_vectors(counts)
+    tag_vectors = _tag_vectors(list(categories))
+    text_postings = _postings(text_vectors)
+    tag_postings = _postings(tag_vectors)
+
+    results = {}
+
+    for pk, category_id in categories.items():
+        if article_ids is not None and pk not in article_ids:
+            continue
+
+        scores = defaultdict(float)
+
+        for vector, postings, weight in (
+            (tag_vectors.get(pk, {}), tag_postings, TAG_WEIGHT),
+            (text_vectors[pk], text_postings, TEXT_WEIGHT),
+        ):
+            for key, value in vector.items():
+                for other_pk, other in postings[key]:
+                    scores[other_pk] += weight * value * other
+
+        scores.pop(pk, None)
+
+        # 分类只作为加分项，否则大分类中的每篇文章都会成为候选
+        for other_pk in scores:
+            if categories[other_pk] == category_id:
+                scores[other_pk] += CATEGORY_WEIGHT
+
+        # 得分相同时较新的文章（主键较大）排在前面
+        results[pk] = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], item[0])
+        )
+
+    return results
+
+
+def refresh_related_articles(article_ids=None):
+    """重新计算相关文章表，默认全部文章，返回写入的行数"""
+    articles = (
+        Article.objects.filter(status=ContentStatus.PUBLISHED)
+        .only("pk", "title", "excerpt", "content", "category")
+        .iterator(chunk_size=RELATED_BATCH_SIZE)
+    )
+
+    if article_ids is not None:
+        article_ids = set(article_ids)
+
+    results = score_articles(articles, article_ids)
+    rows = [
+        RelatedArticle(article_id=pk, related_id=related_id, rank=rank, score=score)
+        for pk, related in results.items()
+        for rank, (related_id, score) in enumerate(related)
+    ]
+
+    with transaction.atomic():
+        stale = RelatedArticle.objects.all()
+
+        if article_ids is not None:
+            stale = stale.filter(article_id__in=article_ids)
+
+        stale.delete()
+        RelatedArticle.objects.bulk_create(rows, batch_size=RELATED_BATCH_SIZE)
+
+    return len(rows)
@@ -0,0 +1,219 @@
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from formula.models import (
+    Contact,
+    Inquiry,
+    Message,
+    Race,
+    Rollup,
+    RollupPeriod,
+    Standing,
+)
+
+ROLLUP_BATCH_SIZE = 500
+
+# lookup 用于按天过滤，day 是分组使用的日期表达式
+RollupSeries = namedtuple("RollupSeries", ["model", "lookup", "day", "value"])
+
+# 可以从源数据重新计算的序列
+ROLLUP_SERIES = {
+    "races": RollupSeries(Race, "date", F("date"), Count("pk")),
+    "points": RollupSeries(Standing, "race__date", F("race__date"), Sum("points")),
+    "contacts": RollupSeries(
+        Contact, "created_at__date", TruncDate("created_at"), Count("pk")
+    ),
+    "inquiries": RollupSeries(
+        Inquiry, "created_at__date", TruncDate("created_at"), Count("pk")
+    ),
+    "messages": RollupSeries(
+        Message, "created_at__date", TruncDate("created_at"), Count("pk")
+    ),
+}
+
+MODEL_SERIES = {series.model: name for name, series in ROLLUP_SERIES.items()}
+
+# 文章只保存浏览总数，这个序列只能在写入浏览次数时累加
+ARTICLE_VIEWS = "article_views"
+
+
+def rollup_day(value):
+    """把日期或时间转换为本地日期"""
+    if isinstance(value, datetime):
+        return timezone.localdate(value)
+
+    return value
+
+
+def period_start(day, period):
+    if period == RollupPeriod.WEEK:
+        return day - timedelta(days=day.weekday())
+
+    return day
+
+
+def _upsert(rows):
+    Rollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["series", "period", "start"],
+        update_fields=["value", "modified_at"],
+        batch_size=ROLLUP_BATCH_SIZE,
+    )
+
+
+def _refresh_weeks(name, weeks):
+    """用按天的汇总重新计算所在周的汇总，每周最多读取 7 行"""
+    if not weeks:
+        return
+
+    totals = dict.fromkeys(weeks, Decimal(0))
+    rows = Rollup.objects.filter(
+        series=name,
+        period=RollupPeriod.DAY,
+        start__gte=min(weeks),
+        start__lt=max(weeks) + timedelta(days=7),
+    ).values_list("start", "value")
+
+    for start, value in rows:
+        week = period_start(start, RollupPeriod.WEEK)
+        if week in totals:
+            totals[week] += value
+
+    _upsert(
+        [
+            Rollup(series=name, period=RollupPeriod.WEEK, start=week, value=value)
+            for week, value in totals.items()
+        ]
+    )
+
+
+def refresh_rollups(name, days):
+    """从源数据重新计算指定日期所在的天和周的汇总"""
+    series = ROLLUP_SERIES[name]
+    days = {rollup_day(day) for day in days if day}
+
+    if not days:
+        return
+
+    totals = dict.fromkeys(days, 0)
+    rows = (
+        series.model.objects.filter(**{f"{series.lookup}__in": days})
+        .order_by()
+        .values(rollup_day=series.day)
+        .annotate(rollup_value=series.value)
+        .values_list("rollup_day", "rollup_value")
+    )
+
+    for day, value in rows:
+        totals[day] = value or 0
+
+    with transaction.atomic():
+        _upsert(
+            [
+                Rollup(series=name, period=RollupPeriod.DAY, start=day, value=value)
+                for day, value in totals.items()
+            ]
+        )
+        _refresh_weeks(name, {period_start(day, RollupPeriod.WEEK) for day in totals})
+
+
+def _increment(name, period, start, amount):
+    buckets = Rollup.objects.filter(series=name, period=period, start=start)
+
+    if buckets.update(value=F("value") + amount):
+        return
+
+    # 并发创建同一个桶时唯一约束冲突，改为累加
+    try:
+        with transaction.atomic():
+            Rollup.objects.create(series=name, period=period, start=start, value=amount)
+    except IntegrityError:
+        buckets.update(value=F("value") + amount)
+
+
+def add_rollup(name, day, amount):
+    """把增量累加到某天和所在周的汇总"""
+    if not amount:
+        return
+
+    day = rollup_day(day)
+
+    with transaction.atomic():
+        for period in RollupPeriod.values:
+            _increment(name, period, period_start(day, period), amount)
+
+
+def rebuild_rollups(names=None, since=None):
+    """从源数据重建序列（默认全部可重建的序列），返回写入的行数"""
+    written = 0
+
+    # 从整周开始重建，周汇总才是完整的
+    if since is not None:
+        since = period_start(since, RollupPeriod.WEEK)
+
+    for name in names or ROLLUP_SERIES:
+        series = ROLLUP_SERIES[name]
+        queryset = series.model.objects.all()
+        stale = Rollup.objects.filter(series=name)
+
+        if since is not None:
+            queryset = queryset.filter(**{f"{series.lookup}__gte": since})
+            stale = stale.filter(start__gte=since)
+
+        days = defaultdict(int)
+        weeks = defaultdict(int)
+
+        for day, value in (
+            queryset.order_by()
+            .values(rollup_day=series.day)
+            .annotate(rollup_value=series.value)
+            .values_list("rollup_day", "rollup_value")
+        ):
+            if day is None:
+                continue
+
+            days[day] += value or 0
+            weeks[period_start(day, RollupPeriod.WEEK)] += value or 0
+
+        rows = [
+            Rollup(series=name, period=period, start=start, value=value)
+            for period, totals in (
+                (RollupPeriod.DAY, days),
+                (RollupPeriod.WEEK, weeks),
+            )
+            for start, value in totals.items()
+        ]
+
+        with transaction.atomic():
+            stale.delete()
+            Rollup.objects.bulk_create(rows, batch_size=ROLLUP_BATCH_SIZE)
+
+        written += len(rows)
+
+    return written
+
+
+def read_rollups(names, period, count, end=None):
+    """读取最近 count 个桶，没有数据的桶补 0，返回 (开始日期, {序列: [值]})"""
+    end = period_start(end or timezone.localdate(), period)
+    step = timedelta(days=7 if period == RollupPeriod.WEEK else 1)
+    starts = [end - step * index for index in reversed(range(count))]
+    positions = {start: index for index, start in enumerate(starts)}
+    values = {name: [0] * count for name in names}
+
+    rows = Rollup.objects.filter(
+        series__in=names, period=period, start__gte=starts[0], start__lte=end
+    ).values_list("series", "start", "value")
+
+    for name, start, value in rows:
+        if start in positions:
+            values[name][positions[start]] = value
+
+    return starts, values
@@ -0,0 +1,348 @@
+import re
+
+from django.db import connection
+from django.db.models import CharField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.fields import FloatField
+from django.utils.html import strip_tags
+
+from formula.models import Article, ContentStatus, Page
+
+# 模型 -> (索引表, 标题字段, 正文字段)
+SEARCH_INDEXES = {
+    Article: ("cms_articles_search", "title", ["excerpt", "content"]),
+    Page: ("cms_pages_search", "title", ["content"]),
+}
+
+SEARCH_BATCH_SIZE = 500
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def create_index_tables(schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    for table, _title, _body in SEARCH_INDEXES.values():
+        if vendor == "sqlite":
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        elif vendor == "postgresql":
+            schema_editor.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(id bigint PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_document "
+                f"ON {table} USING GIN (document)"
+            )
+
+
+def drop_index_tables(schema_editor):
+    if schema_editor.connection.vendor not in ("sqlite", "postgresql"):
+        return
+
+    for table, _title, _body in SEARCH_INDEXES.values():
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _document(instance, model):
+    _table, title_field, body_fields = SEARCH_INDEXES[model]
+    body = " ".join(strip_tags(getattr(instance, field) or "") for field in body_fields)
+    return getattr(instance, title_field) or "", body
+
+
+def _write_rows(cursor, table, rows):
+    if connection.vendor == "sqlite":
+        cursor.executemany(
+            f"INSERT INTO {table} (rowid, title, body) VALUES (%s, %s, %s)", rows
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {table} (id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B')) "
+            "ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+
+def _delete_rows(cursor, table, pks):
+    column = "rowid" if connection.vendor == "sqlite" else "id"
+    placeholders = ", ".join(["%s"] * len(pks))
+    cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", pks)
+
+
+def index_object(instance):
+    """更新单个对象的索引，只有已发布内容会被索引"""
+    model = instance._meta.concrete_model
+
+    if not is_supported() or model not in SEARCH_INDEXES:
+        return
+
+    table = SEARCH_INDEXES[model][0]
+
+    with connection.cursor() as cursor:
+        _delete_rows(cursor, table, [instance.pk])
+
+        if instance.status == ContentStatus.PUBLISHED:
+            _write_rows(cursor, table, [(instance.pk, *_document(instance, model))])
+
+
+def index_objects(model, instances):
+    """批量索引新建的对象，用于绕过信号的 bulk_create"""
+    if not is_supported() or model not in SEARCH_INDEXES:
+        return
+
+    rows = [
+        (instance.pk, *_document(instance, model))
+        for instance in instances
+        if instance.status == ContentStatus.PUBLISHED
+    ]
+
+    if rows:
+        with connection.cursor() as cursor:
+            _write_rows(cursor, SEARCH_INDEXES[model][0], rows)
+
+
+def unindex_object(instance):
+    model = instance._meta.concrete_model
+
+    if not is_supported() or model not in SEARCH_INDEXES:
+        return
+
+    with connection.cursor() as cursor:
+        _delete_rows(cursor, SEARCH_INDEXES[model][0], [instance.pk])
+
+
+def rebuild_index(models=None):
+    """重建索引，返回每个模型索引的对象数量"""
+    totals = {}
+
+    if not is_supported():
+        return totals
+
+    for model in models or SEARCH_INDEXES:
+        table, title_field, body_fields = SEARCH_INDEXES[model]
+        queryset = model.objects.filter(status=ContentStatus.PUBLISHED).only(
+            "pk", title_field, *body_fields
+        )
+        totals[model] = 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+            rows = []
+
+            for instance in queryset.iterator(chunk_size=SEARCH_BATCH_SIZE):
+                rows.append((instance.pk, *_document(instance, model)))
+
+                if len(rows) >= SEARCH_BATCH_SIZE:
+                    _write_rows(cursor, table, rows)
+                    totals[model] += len(rows)
+                    rows = []
+
+            if rows:
+                _write_rows(cursor, table, rows)
+                totals[model] += len(rows)
+
+    return totals
+
+
+def _match_expression(query):
+    tokens = TOKEN_RE.findall(query)
+
+    if not tokens:
+        return None
+
+    # 最后一个词做前缀匹配，方便边输边搜
+    if connection.vendor == "sqlite":
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    terms = list(tokens)
+    terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+def search_queryset(queryset, query):
+    """按全文索引过滤查询集，并添加 search_rank 注解（越大越相关）"""
+    model = queryset.model._meta.concrete_model
+    table, title_field, body_fields = SEARCH_INDEXES[model]
+
+    if not is_supported():
+        condition = Q()
+        for field in [title_field, *body_fields]:
+            condition |= Q(**{f"{field}__icontains": query})
+        return queryset.filter(condition).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+    expression = _match_expression(query)
+
+    if expression is None:
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+    outer_pk = f"{model._meta.db_table}.{model._meta.pk.column}"
+
+    if connection.vendor == "sqlite":
+        matches = RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s", (expression,)
+        )
+        rank = RawSQL(
+            f"SELECT -bm25({table}, 10.0, 1.0) FROM {table} "
+            f"WHERE {table} MATCH %s AND rowid = {outer_pk}",
+            (expression,),
+            output_field=FloatField(),
+        )
+    else:
+        matches = RawSQL(
+            f"SELECT id FROM {table} WHERE document @@ to_tsquery('simple', %s)",
+            (expression,),
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {table} "
+            f"WHERE id = {outer_pk}",
+            (expression,),
+            output_field=FloatField(),
+        )
+
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+
+class SearchResults:
+    """文章和页面的合并搜索结果
+
+    两种内容在数据库中合并排序，分页器只会取出当前页的主键，然后按类型
+    批量加载对象。索引表只包含已发布内容，所以可以直接在索引上排序分页。
+    """
+
+    kinds = {"article": Article, "page": Page}
+
+    def __init__(self, query):
+        self.query = query
+        self.expression = _match_expression(query) if is_supported() else None
+        self._count = None
+
+    def _index_selects(self):
+        selects = []
+        params = []
+
+        for kind, model in self.kinds.items():
+            table = SEARCH_INDEXES[model][0]
+
+            if connection.vendor == "sqlite":
+                selects.append(
+                    f"SELECT rowid AS pk, '{kind}' AS kind, "
+                    f"-bm25({table}, 10.0, 1.0) AS search_rank "
+                    f"FROM {table} WHERE {table} MATCH %s"
+                )
+            else:
+                selects.append(
+                    f"SELECT id AS pk, '{kind}' AS kind, "
+                    "ts_rank(document, to_tsquery('simple', %s)) AS search_rank "
+                    f"FROM {table} WHERE document @@ to_tsquery('simple', %s)"
+                )
+                params.append(self.expression)
+
+            params.append(self.expression)
+
+        return selects, params
+
+    def _queryset(self, kind):
+        model = self.kinds[kind]
+        queryset = model.objects.filter(status=ContentStatus.PUBLISHED)
+        return (
+            search_queryset(queryset, self.query)
+            .annotate(kind=Value(kind, output_field=CharField()))
+            .order_by()
+            .values_list("pk", "kind", "search_rank")
+        )
+
+    def _combined(self):
+        return (
+            self._queryset("article")
+            .union(self._queryset("page"), all=True)
+            .order_by("-search_rank", "kind", "-pk")
+        )
+
+    def _rows(self, key):
+        if not is_supported():
+            return list(self._combined()[key])
+
+        if self.expression is None:
+            return []
+
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+
+        if stop <= start:
+            return []
+
+        selects, params = self._index_selects()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                " UNION ALL ".join(selects)
+                + " ORDER BY search_rank DESC, kind, pk DESC LIMIT %s OFFSET %s",
+                [*params, stop - start, start],
+            )
+            return cursor.fetchall()
+
+    def count(self):
+        if self._count is not None:
+            return self._count
+
+        if not is_supported():
+            self._count = self._combined().count()
+        elif self.expression is None:
+            self._count = 0
+        else:
+            selects, params = self._index_selects()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM ({' UNION ALL '.join(selects)}) results",
+                    params,
+                )
+                self._count = cursor.fetchone()[0]
+
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+
+        rows = self._rows(key)
+        objects = {}
+
+        for kind, model in self.kinds.items():
+            pks = [pk for pk, row_kind, _rank in rows if row_kind == kind]
+
+            if not pks:
+                continue
+
+            queryset = model.objects.filter(status=ContentStatus.PUBLISHED)
+            if model is Article:
+                queryset = queryset.select_related("category", "author")
+
+            objects[kind] = queryset.in_bulk(pks)
+
+        results = []
+        for pk, kind, rank in rows:
+            instance = objects.get(kind, {}).get(pk)
+
+            if instance is not None:
+                instance.search_rank = rank
+                instance.result_type = kind
+                results.append(instance)
+
+        return results
@@ -0,0 +1,186 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# blobs/ 和 thumbnails/ 下的文件名包含内容哈希，内容永远不会变化
+HASHED_NAME_RE = re.compile(r"(?:^|/)([0-9a-f]{64})(?:-\d+w)?\.\w+$")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# 压缩文件按原样下载，不设置 Content-Encoding，否则浏览器会直接解压
+ENCODING_CONTENT_TYPES = {
+    "br": "application/x-brotli",
+    "bzip2": "application/x-bzip",
+    "compress": "application/x-compress",
+    "gzip": "application/gzip",
+    "xz": "application/x-xz",
+}
+
+
+def _file_range(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+
+            if not chunk:
+                break
+
+            length -= len(chunk)
+            yield chunk
+
+
+def parse_range(header, size):
+    """解析单个字节范围，返回 (start, end)，无法满足时返回 None
+
+    无法解析或包含多个范围时返回 False，此时发送完整文件（RFC 9110 允许
+    忽略 Range）。
+    """
+    match = RANGE_RE.match(header.strip())
+
+    if not match:
+        return False
+
+    start, end = match.groups()
+
+    if not start and not end:
+        return False
+
+    if not start:
+        # bytes=-500 表示最后 500 个字节
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+
+    if start >= size or start > end:
+        return None
+
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+
+    if not if_range:
+        return True
+
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _cache_headers(response, name, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+
+    # 整个站点需要登录，所以只允许浏览器缓存
+    if HASHED_NAME_RE.search(name):
+        response["Cache-Control"] = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """提供上传的文件，支持 Range、条件请求和 X-Accel-Redirect/X-Sendfile"""
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404 from None
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404 from None
+
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    size = stat.st_size
+    last_modified = stat.st_mtime
+    match = HASHED_NAME_RE.search(path)
+    etag = f'"{match.group(1)}"' if match else f'"{size:x}-{stat.st_mtime_ns:x}"'
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified)
+    )
+
+    if response is not None:
+        return _cache_headers(response, path, etag, last_modified)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = (
+        ENCODING_CONTENT_TYPES.get(encoding, content_type) or "application/octet-stream"
+    )
+
+    # 交给前端服务器发送文件，Range 也由它处理
+    if settings.MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+
+        if settings.MEDIA_SENDFILE_HEADER == "X-Accel-Redirect":
+            # nginx 会对这个头做 URL 解码
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        else:
+            response[settings.MEDIA_SENDFILE_HEADER] = full_path
+
+        return _cache_headers(response, path, etag, last_modified)
+
+    byte_range = False
+
+    if "Range" in request.headers and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers["Range"], size)
+
+    if byte_range is None:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return _cache_headers(response, path, etag, last_modified)
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+
+        if request.method == "HEAD":
+            response = HttpResponse(status=206, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                _file_range(full_path, start, length),
+                status=206,
+                content_type=content_type,
+            )
+
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+    elif request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = str(size)
+    else:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+
+    return _cache_headers(response, path, etag, last_modified)
@@ -111,6 +111,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "formula.context_processors.variables",
+                "formula.context_processors.navigation",
             ],
         },
     },
@@ -126,6 +127,52 @@ DATABASES = {
     },
 }
 
+DATABASE_ROUTERS = ["formula.readonly.ReadonlyRouter"]
+
+######################################################################
+# Caches
+######################################################################
+CACHES = {
+    "default": {
+        "BACKEND": environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": environ.get("CACHE_LOCATION", ""),
+        "OPTIONS": {"MAX_ENTRIES": 10_000},
+    },
+}
+
+######################################################################
+# Celery
+######################################################################
+CELERY_BROKER_URL = environ.get("CELERY_BROKER_URL")
+
+# Without a broker tasks run eagerly in the calling process, i.e. inside the request
+# that queued them, and the beat schedule never runs. This is meant for development
+# and tests only, deployments need a broker, a worker and beat (see docker-compose)
+CELERY_TASK_ALWAYS_EAGER = CELERY_BROKER_URL is None
+
+CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+
+# Installed into the database scheduler when celery beat starts
+CELERY_BEAT_SCHEDULE = {
+    "refresh-related-articles": {
+        "task": "formula.tasks.refresh_related_articles",
+        "schedule": 60 * 60,
+    },
+    "refresh-dashboard-metrics": {
+        "task": "formula.tasks.refresh_dashboard_metrics",
+        "schedule": 5 * 60,
+    },
+    # Rollups are kept up to date by signals, this repairs rows written
+    # without them (fixtures, bulk updates)
+    "rebuild-rollups": {
+        "task": "formula.tasks.rebuild_rollups",
+        "schedule": 24 * 60 * 60,
+        "kwargs": {"days": 8 * 7},
+    },
+}
+
 ######################################################################
 # Authentication
 ######################################################################
@@ -214,6 +261,14 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 MEDIA_URL = "/media/"
 
+MEDIA_CACHE_MAX_AGE = int(environ.get("MEDIA_CACHE_MAX_AGE", 60 * 60))
+
+# "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd) to offload media
+MEDIA_SENDFILE_HEADER = environ.get("MEDIA_SENDFILE_HEADER")
+
+# Internal nginx location that maps onto MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
 STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
@@ -221,8 +276,25 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
     },
+    "blobs": {
+        "BACKEND": "formula.storage.ContentAddressedStorage",
+    },
+    # Import/export job files are kept outside MEDIA_ROOT and only served
+    # through the admin
+    "jobs": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": environ.get("IMPORT_EXPORT_JOBS_ROOT", BASE_DIR / "jobs"),
+        },
+    },
 }
 
+# Uploads are hashed while they are received so storing them never rereads the file
+FILE_UPLOAD_HANDLERS = [
+    "formula.storage.HashingMemoryFileUploadHandler",
+    "formula.storage.HashingTemporaryFileUploadHandler",
+]
+
 ######################################################################
 # Unfold
 ######################################################################
@@ -464,6 +536,13 @@ UNFOLD = {
                             "admin:django_celery_beat_solarschedule_changelist"
                         ),
                     },
+                    {
+                        "title": _("Import/export jobs"),
+                        "icon": "sync_alt",
+                        "link": reverse_lazy(
+                            "admin:formula_importexportjob_changelist"
+                        ),
+                    },
                 ],
             },
         ],
@@ -492,6 +571,33 @@ LOGIN_USERNAME = environ.get("LOGIN_USERNAME")
 
 LOGIN_PASSWORD = environ.get("LOGIN_PASSWORD")
 
+VIEW_COUNT_FLUSH_INTERVAL = int(environ.get("VIEW_COUNT_FLUSH_INTERVAL", 60))
+
+THUMBNAIL_SIZES = [160, 320, 640, 1280]
+
+# The first available format is used when a template does not ask for one
+THUMBNAIL_FORMATS = ["webp", "avif"]
+
+THUMBNAIL_QUALITY = 80
+
+# Freezes the site regardless of the READONLY_MODE constance key. That key is the
+# runtime toggle (readonly_mode command or admin) and is stored in the database so
+# that it reaches every process, but it cannot be changed while this is on
+READONLY_MODE = environ.get("READONLY_MODE", "0") == "1"
+
+READONLY_MODE_REFRESH_INTERVAL = int(environ.get("READONLY_MODE_REFRESH_INTERVAL", 5))
+
+# Dashboard metrics are refreshed by celery beat before they expire
+DASHBOARD_METRICS_TTL = int(environ.get("DASHBOARD_METRICS_TTL", 10 * 60))
+
+# Used by prune_history: the newest rows per object are always kept, older rows
+# are thinned to one per object per day and finally dropped (0 keeps them forever)
+HISTORY_RETENTION = {
+    "keep_latest": 20,
+    "compact_after_days": 30,
+    "max_age_days": 365,
+}
+
 ############################################################################
 # Debug toolbar
 ############################################################################
@@ -545,6 +651,7 @@ CONSTANCE_CONFIG = {
     "SITE_CACHE_TTL": (3600, _("Cache TTL in seconds")),
     "SITE_DATE_FORMAT": ("%Y-%m-%d", _("Date format")),
     "SITE_TIME_ZONE": ("UTC", _("Time zone")),
+    "READONLY_MODE": (False, _("Readonly mode")),
 }
 
 CONSTANCE_CONFIG_FIELDSETS = OrderedDict(
@@ -586,6 +693,7 @@ CONSTANCE_CONFIG_FIELDSETS = OrderedDict(
                 "IN_CONSTRUCTION",
                 "SITE_MAINTENANCE_MODE",
                 "SITE_MAINTENANCE_MESSAGE",
+                "READONLY_MODE",
                 "SITE_CACHE_TTL",
                 "SITE_DATE_FORMAT",
                 "SITE_TIME_ZONE",
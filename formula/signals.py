@@ -1,26 +1,234 @@
-from django.conf import settings
-from django.db.models.signals import pre_delete, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from os import environ
 
-from formula.exceptions import ReadonlyException
+from formula.blobs import blob_field, change_references
+from formula.caching import invalidate_page_cache
+from formula.championship import invalidate_championships
+from formula.driver_statistics import refresh_driver_statistics
+from formula.metrics import invalidate_metrics
+from formula.models import (
+    Article,
+    Category,
+    Constructor,
+    Contact,
+    Driver,
+    Inquiry,
+    Media,
+    Message,
+    Page,
+    Profile,
+    Race,
+    Standing,
+)
+from formula.rollups import MODEL_SERIES, refresh_rollups
+from formula.search import index_object, unindex_object
+from formula.tasks import extract_media_metadata
 
 
-def prevent_modifications(sender, instance, **kwargs):
-    # Check if readonly mode is explicitly enabled via environment variable
-    readonly_mode = environ.get("READONLY_MODE", "0") == "1"
-    
-    if readonly_mode and sender._meta.db_table != "studio_options":
-        raise ReadonlyException(
-            "Database is operating in readonly mode. Not possible to save any data."
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Page)
+def update_search_index(sender, instance, **kwargs):
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Page)
+def delete_search_index(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_pages(sender, instance, **kwargs):
+    invalidate_page_cache("article")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    invalidate_page_cache("category")
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_page_pages(sender, instance, **kwargs):
+    invalidate_page_cache("page")
+
+
+@receiver(post_save, sender=Driver)
+@receiver(post_delete, sender=Driver)
+@receiver(post_save, sender=Standing)
+@receiver(post_delete, sender=Standing)
+@receiver(post_save, sender=Race)
+@receiver(post_delete, sender=Race)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Inquiry)
+@receiver(post_delete, sender=Inquiry)
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_dashboard_metrics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_metrics()
+
+
+@receiver(post_save, sender=Driver)
+@receiver(post_delete, sender=Driver)
+@receiver(post_save, sender=Constructor)
+@receiver(post_delete, sender=Constructor)
+@receiver(post_save, sender=Standing)
+@receiver(post_delete, sender=Standing)
+@receiver(post_save, sender=Race)
+@receiver(post_delete, sender=Race)
+def invalidate_championship_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_championships()
+
+
+# 修改前的车手和比赛日期，车手统计和汇总需要同时更新旧值
+PREVIOUS_FIELDS = {
+    Standing: ("driver_id", "race__date"),
+    Race: ("winner_id", "date"),
+}
+
+
+@receiver(pre_save, sender=Standing)
+@receiver(pre_save, sender=Race)
+def remember_previous_values(sender, instance, raw=False, **kwargs):
+    instance._previous_statistics_driver_id = None
+    instance._previous_rollup_day = None
+
+    if not raw and instance.pk and not instance._state.adding:
+        previous = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(*PREVIOUS_FIELDS[sender])
+            .first()
+        )
+
+        if previous is not None:
+            driver_id, day = previous
+            instance._previous_statistics_driver_id = driver_id
+            instance._previous_rollup_day = day
+
+
+@receiver(post_save, sender=Standing)
+@receiver(post_delete, sender=Standing)
+def update_standing_driver_statistics(sender, instance, raw=False, **kwargs):
+    # 导入夹具时跳过，导入后运行 refresh_driver_statistics
+    if raw:
+        return
+
+    refresh_driver_statistics(
+        [instance.driver_id, getattr(instance, "_previous_statistics_driver_id", None)]
+    )
+
+
+@receiver(post_save, sender=Race)
+@receiver(post_delete, sender=Race)
+def update_race_driver_statistics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    # 比赛日期会影响车手最近所属车队
+    driver_ids = set(
+        Standing.objects.filter(race_id=instance.pk).values_list("driver_id", flat=True)
+    )
+    driver_ids.update(
+        [instance.winner_id, getattr(instance, "_previous_statistics_driver_id", None)]
+    )
+    refresh_driver_statistics(driver_ids)
+
+
+@receiver(post_save, sender=Race)
+@receiver(post_delete, sender=Race)
+def update_race_rollups(sender, instance, raw=False, **kwargs):
+    # 导入夹具时跳过，导入后运行 rebuild_rollups
+    if raw:
+        return
+
+    days = [instance.date, getattr(instance, "_previous_rollup_day", None)]
+    refresh_rollups("races", days)
+    refresh_rollups("points", days)
+
+
+@receiver(post_save, sender=Standing)
+@receiver(post_delete, sender=Standing)
+def update_standing_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    refresh_rollups(
+        "points",
+        [instance.race.date, getattr(instance, "_previous_rollup_day", None)],
+    )
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_save, sender=Inquiry)
+@receiver(post_delete, sender=Inquiry)
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def update_submission_rollups(sender, instance, raw=False, created=True, **kwargs):
+    # 创建时间不会变化，只有新增和删除影响汇总
+    if raw or not created:
+        return
+
+    refresh_rollups(MODEL_SERIES[sender], [instance.created_at])
+
+
+@receiver(post_save, sender=Media)
+def schedule_media_metadata(sender, instance, raw=False, **kwargs):
+    # 提交后再交给后台任务，上传请求不必等待读取文件
+    if raw or not instance.file or instance.metadata_extracted_at:
+        return
+
+    transaction.on_commit(lambda: extract_media_metadata.delay(instance.pk))
+
+
+@receiver(pre_save, sender=Media)
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Driver)
+@receiver(pre_save, sender=Profile)
+def remember_blob_name(sender, instance, raw=False, **kwargs):
+    instance._previous_blob_name = None
+
+    if not raw and instance.pk and not instance._state.adding:
+        instance._previous_blob_name = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(blob_field(sender), flat=True)
+            .first()
         )
 
 
-@receiver(pre_save)
-def block_save(sender, instance, **kwargs):
-    prevent_modifications(sender, instance, **kwargs)
+@receiver(post_save, sender=Media)
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Driver)
+@receiver(post_save, sender=Profile)
+def update_blob_references(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    name = getattr(instance, blob_field(sender)).name or None
+    previous = getattr(instance, "_previous_blob_name", None) or None
+
+    if name != previous:
+        change_references([name], 1)
+        change_references([previous], -1)
 
 
-@receiver(pre_delete)
-def block_delete(sender, instance, **kwargs):
-    prevent_modifications(sender, instance, **kwargs)
+@receiver(post_delete, sender=Media)
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Driver)
+@receiver(post_delete, sender=Profile)
+def release_blob_references(sender, instance, **kwargs):
+    # 文件本身由 collect_media_garbage 命令统一删除
+    change_references([getattr(instance, blob_field(sender)).name], -1)
@@ -0,0 +1,158 @@
+import re
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+from unidecode import unidecode
+
+SUFFIX_SEPARATOR = "-"
+
+SUFFIX_RE = re.compile(r"^(?P<base>.+)-(?P<number>[1-9]\d*)$")
+
+# 为后缀预留的长度
+SUFFIX_LENGTH = 10
+
+SLUG_SAVE_ATTEMPTS = 3
+
+# 每次查询的前缀数量，避免 SQL 过长
+SLUG_BATCH_SIZE = 200
+
+
+def transliterate(value):
+    """把文本转换为 ASCII，中日韩文字按读音转写"""
+    return unidecode(value)
+
+
+def slug_base(value, fallback, max_length=255):
+    """生成不带后缀的 slug，无法转换时使用 fallback"""
+    slug = slugify(transliterate(value or ""))[: max_length - SUFFIX_LENGTH]
+    return slug.strip(SUFFIX_SEPARATOR) or fallback
+
+
+def _base_condition(field, base):
+    # "." 是 "-" 的下一个字符，范围查询可以使用唯一索引
+    return Q(**{field: base}) | Q(
+        **{f"{field}__gt": f"{base}-", f"{field}__lt": f"{base}."}
+    )
+
+
+def _taken_suffixes(queryset, field, bases):
+    """一次查询返回每个前缀已经使用的后缀，没有后缀的 slug 记为 0"""
+    condition = Q()
+    for base in bases:
+        condition |= _base_condition(field, base)
+
+    taken = defaultdict(set)
+    bases = set(bases)
+
+    for slug in queryset.filter(condition).values_list(field, flat=True).iterator():
+        if slug in bases:
+            taken[slug].add(0)
+            continue
+
+        match = SUFFIX_RE.match(slug)
+        if match and match["base"] in bases:
+            taken[match["base"]].add(int(match["number"]))
+
+    return taken
+
+
+def _with_suffix(base, number):
+    return base if number == 0 else f"{base}{SUFFIX_SEPARATOR}{number}"
+
+
+def _next_free(taken):
+    # 第二个使用相同前缀的对象从 -2 开始
+    if 0 not in taken:
+        return 0
+
+    number = 2
+    while number in taken:
+        number += 1
+
+    return number
+
+
+def unique_slug(instance, value, fallback, field="slug"):
+    """为单个对象生成唯一的 slug"""
+    model = type(instance)
+    base = slug_base(value, fallback, model._meta.get_field(field).max_length)
+    queryset = model._default_manager.all()
+
+    if instance.pk is not None:
+        queryset = queryset.exclude(pk=instance.pk)
+
+    taken = _taken_suffixes(queryset, field, [base])[base]
+    return _with_suffix(base, _next_free(taken))
+
+
+def assign_unique_slugs(instances, source, fallback, field="slug"):
+    """批量导入前为还没有 slug 的对象分配唯一的 slug
+
+    每 SLUG_BATCH_SIZE 个前缀查询一次，同一批中重复的标题也不会冲突。
+    """
+    pending = [instance for instance in instances if not getattr(instance, field)]
+
+    if not pending:
+        return instances
+
+    model = type(pending[0])
+    max_length = model._meta.get_field(field).max_length
+    bases = [
+        slug_base(getattr(instance, source), fallback, max_length)
+        for instance in pending
+    ]
+    unique_bases = list(dict.fromkeys(bases))
+    taken = defaultdict(set)
+
+    # 同一批中已经手动指定的 slug 也要避开
+    for instance in instances:
+        slug = getattr(instance, field)
+        if slug:
+            match = SUFFIX_RE.match(slug)
+            if match:
+                taken[match["base"]].add(int(match["number"]))
+            taken[slug].add(0)
+
+    for start in range(0, len(unique_bases), SLUG_BATCH_SIZE):
+        batch = unique_bases[start : start + SLUG_BATCH_SIZE]
+        for base, suffixes in _taken_suffixes(
+            model._default_manager.all(), field, batch
+        ).items():
+            taken[base] |= suffixes
+
+    for instance, base in zip(pending, bases, strict=True):
+        number = _next_free(taken[base])
+        taken[base].add(number)
+        setattr(instance, field, _with_suffix(base, number))
+
+    return instances
+
+
+class UniqueSlugMixin:
+    """保存时根据 slug_source 生成唯一的 slug
+
+    并发保存相同标题时唯一约束可能冲突，此时重新计算后缀并重试。
+    """
+
+    slug_source = "title"
+    slug_fallback = "item"
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(SLUG_SAVE_ATTEMPTS):
+            self.slug = unique_slug(
+                self, getattr(self, self.slug_source), self.slug_fallback
+            )
+
+            try:
+                with transaction.atomic(using=kwargs.get("using")):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = type(self)._default_manager.filter(slug=self.slug).exists()
+
+                if attempt == SLUG_SAVE_ATTEMPTS - 1 or not taken:
+                    raise
@@ -0,0 +1,111 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.utils import timezone
+
+BLOB_DIR = "blobs"
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class HashingUploadHandlerMixin:
+    """在接收上传分块的同时计算 SHA-256，避免保存时再读一遍文件"""
+
+    def new_file(self, *args, **kwargs):
+        # MemoryFileUploadHandler 启用时会在 new_file 中抛出 StopFutureHandlers
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        chunk = super().receive_data_chunk(raw_data, start)
+
+        # 返回 None 说明分块由当前处理器接收
+        if chunk is None:
+            self.hasher.update(raw_data)
+
+        return chunk
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+
+        return file
+
+
+class HashingMemoryFileUploadHandler(
+    HashingUploadHandlerMixin, MemoryFileUploadHandler
+):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(
+    HashingUploadHandlerMixin, TemporaryFileUploadHandler
+):
+    """所有上传都分块写入临时文件，保存时临时文件会被直接移动到目标位置"""
+
+
+def content_hash(file):
+    """返回文件内容的 SHA-256，上传时已经计算过的直接复用"""
+    checksum = getattr(file, "content_hash", None)
+
+    if checksum:
+        return checksum
+
+    hasher = hashlib.sha256()
+    for chunk in file.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+
+    file.seek(0)
+    file.content_hash = hasher.hexdigest()
+    return file.content_hash
+
+
+def content_name(checksum, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{BLOB_DIR}/{checksum[:2]}/{checksum}{extension}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """按内容哈希命名文件，相同内容只保存一次，并登记到 Blob 表"""
+
+    def save(self, name, content, max_length=None):
+        from formula.models import Blob
+
+        if name is None:
+            name = content.name
+
+        checksum = content_hash(content)
+        blob = Blob.objects.filter(checksum=checksum).first()
+
+        # 更新时间后垃圾回收不会再删除这个文件；行已经被删除时重新保存
+        if (
+            blob is not None
+            and Blob.objects.filter(pk=blob.pk).update(modified_at=timezone.now())
+            and self.exists(blob.name)
+        ):
+            return blob.name
+
+        name = content_name(checksum, name)
+
+        if not self.exists(name):
+            name = super().save(name, content, max_length)
+
+        Blob.objects.update_or_create(
+            checksum=checksum, defaults={"name": name, "size": content.size}
+        )
+        return name
+
+
+def blob_storage():
+    return storages["blobs"]
+
+
+def job_storage():
+    return storages["jobs"]
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+
+from formula.jobs import run_job
+from formula.media import extract_metadata
+from formula.metrics import refresh_scheduled_metrics
+from formula.related import refresh_related_articles as refresh_related
+from formula.rollups import rebuild_rollups as rebuild
+
+
+@shared_task
+def extract_media_metadata(media_id):
+    return extract_metadata(media_id)
+
+
+@shared_task
+def refresh_related_articles(article_ids=None):
+    return refresh_related(article_ids)
+
+
+@shared_task
+def refresh_dashboard_metrics():
+    refresh_scheduled_metrics()
+
+
+@shared_task
+def rebuild_rollups(days=None):
+    since = timezone.localdate() - timedelta(days=days) if days else None
+    return rebuild(since=since)
+
+
+@shared_task
+def run_import_export_job(job_id):
+    return run_job(job_id)
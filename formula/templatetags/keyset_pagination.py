@@ -0,0 +1,11 @@
+from django import template
+
+from formula.paginator import CURSOR_VAR
+
+register = template.Library()
+
+
+@register.simple_tag
+def keyset_paginator_url(cl, cursor):
+    """生成带游标的后台列表链接，保留当前的过滤和排序参数"""
+    return cl.get_query_string({CURSOR_VAR: cursor})
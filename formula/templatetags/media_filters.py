@@ -1,28 +1,28 @@
 from django import template
 from django.template.defaultfilters import stringfilter
 
+from formula import thumbnails
+from formula.media_types import AUDIO_EXTENSIONS, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+
 register = template.Library()
 
 @register.filter
 @stringfilter
 def is_image(file_type):
     """检查文件类型是否为图片"""
-    image_types = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp']
-    return file_type.lower() in image_types
+    return file_type.lower() in IMAGE_EXTENSIONS
 
 @register.filter
 @stringfilter
 def is_video(file_type):
     """检查文件类型是否为视频"""
-    video_types = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv']
-    return file_type.lower() in video_types
+    return file_type.lower() in VIDEO_EXTENSIONS
 
 @register.filter
 @stringfilter
 def is_audio(file_type):
     """检查文件类型是否为音频"""
-    audio_types = ['.mp3', '.wav', '.ogg', '.aac', '.flac', '.wma']
-    return file_type.lower() in audio_types
+    return file_type.lower() in AUDIO_EXTENSIONS
 
 @register.filter
 @stringfilter
@@ -37,3 +37,12 @@ def get_media_icon(file_type):
     else:
         return 'fas fa-file'
 
+@register.filter
+def thumbnail(file, width=160):
+    """缩略图地址，例如 {{ media.file|thumbnail:320 }}"""
+    return thumbnails.thumbnail_url(file, int(width))
+
+@register.filter
+def srcset(file, fmt=None):
+    """生成 srcset 属性，可以指定格式，例如 {{ article.featured_image|srcset:"avif" }}"""
+    return thumbnails.srcset(file, fmt)
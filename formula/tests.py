@@ -0,0 +1,639 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from constance import config
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.paginator import InvalidPage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from formula.championship import (
+    compute_championship,
+    constructor_table,
+    driver_progression,
+    driver_table,
+)
+from formula.counters import _key as view_count_key
+from formula.counters import flush_view_counts, record_view
+from formula.history import prune_history
+from formula.models import (
+    Article,
+    Category,
+    Circuit,
+    Constructor,
+    ContentStatus,
+    Driver,
+    Page,
+    Race,
+    RelatedArticle,
+    Standing,
+    Tag,
+)
+from formula.paginator import KeysetPaginator
+from formula.search import SearchResults, search_queryset
+from formula.slugs import SUFFIX_LENGTH, assign_unique_slugs
+
+# 仓库中没有这几个页面的模板，测试使用的模板访问与列表和详情页面相同的关联
+ARTICLE_ROWS = (
+    "{% for article in articles %}{{ article.title }} {{ article.category.name }} "
+    "{{ article.author }}{% for tag in article.tags.all %}{{ tag.title }}"
+    "{% endfor %}{% endfor %}"
+)
+
+MISSING_TEMPLATES = {
+    "formula/cms/article_list.html": ARTICLE_ROWS,
+    "formula/cms/article_detail.html": (
+        "{{ article.title }} {{ article.category.name }} {{ article.author }}"
+        "{% for tag in article.tags.all %}{{ tag.title }}{% endfor %}"
+        "{% for related in related_articles %}{{ related.title }} "
+        "{{ related.category.name }} {{ related.author }}{% endfor %}"
+        "{% for latest in latest_articles %}{{ latest.title }}{% endfor %}"
+    ),
+    "formula/cms/search_results.html": (
+        "{% for result in results %}{{ result.title }}{% endfor %}"
+    ),
+}
+
+TEMPLATES = [
+    {
+        **settings.TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **settings.TEMPLATES[0]["OPTIONS"],
+            "loaders": [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+                ("django.template.loaders.locmem.Loader", MISSING_TEMPLATES),
+            ],
+        },
+    }
+]
+
+
+@override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, TEMPLATES=TEMPLATES)
+class PublicViewQueryCountTests(TestCase):
+    """公开页面缓存为空时首次渲染的查询次数
+
+    文章数量多于一页，查询次数随文章数量增长时说明出现了 N+1 查询。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = author = get_user_model().objects.create_user(
+            username="author", email="author@example.com", password="password"
+        )
+        cls.category = Category.objects.create(name="Racing")
+        child = Category.objects.create(name="Formula", parent=cls.category)
+        content_type = ContentType.objects.get_for_model(Article)
+        cls.articles = []
+
+        for index in range(12):
+            article = Article.objects.create(
+                title=f"Grand prix report {index}",
+                content="Race report from the grand prix weekend.",
+                category=child if index % 2 else cls.category,
+                author=author,
+                status=ContentStatus.PUBLISHED,
+                published_at=timezone.now(),
+            )
+            Tag.objects.bulk_create(
+                Tag(
+                    title=f"Tag {tag}",
+                    slug=f"tag-{tag}",
+                    content_type=content_type,
+                    object_id=article.pk,
+                )
+                for tag in range(3)
+            )
+            cls.articles.append(article)
+
+        RelatedArticle.objects.bulk_create(
+            RelatedArticle(article=cls.articles[0], related=related, rank=rank, score=1)
+            for rank, related in enumerate(cls.articles[1:4], 1)
+        )
+        Page.objects.create(
+            title="Grand prix guide",
+            content="Everything about the grand prix.",
+            status=ContentStatus.PUBLISHED,
+        )
+
+        # constance 第一次读取时会写入默认值
+        config.SITE_CACHE_TTL  # noqa: B018
+
+    def setUp(self):
+        # 站点启用了 LoginRequiredMiddleware，每个请求都有一次读取用户的查询
+        self.client.force_login(self.author)
+        cache.clear()
+
+        # 浏览次数按间隔写入数据库，不计入页面本身的查询
+        cache.add(view_count_key("interval"), 1, timeout=None)
+
+    def assertQueries(self, url, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_home(self):
+        self.assertQueries(reverse("home"), 5)
+
+    def test_article_list(self):
+        self.assertQueries(reverse("article_list"), 7)
+
+    def test_category_detail(self):
+        self.assertQueries(reverse("category_detail", args=[self.category.slug]), 9)
+
+    def test_article_detail(self):
+        self.assertQueries(reverse("article_detail", args=[self.articles[0].slug]), 5)
+
+    def test_search(self):
+        self.assertQueries(f"{reverse('search')}?q=grand", 4)
+
+    def test_cached_page(self):
+        self.client.get(reverse("home"))
+
+        # 命中页面缓存时只剩下读取登录用户的查询
+        self.assertQueries(reverse("home"), 1)
+
+
+class ChampionshipTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        circuit = Circuit.objects.create(name="Monza", city="Monza", country="Italy")
+        constructor = Constructor.objects.create(name="Ferrari")
+        other_constructor = Constructor.objects.create(name="McLaren")
+        cls.driver = Driver.objects.create(first_name="Charles", last_name="Leclerc")
+        cls.other = Driver.objects.create(first_name="Lando", last_name="Norris")
+
+        # 两场比赛后两名车手的积分和胜场都相同，名次并列
+        results = [
+            ((1, Decimal("25")), (2, Decimal("18"))),
+            ((2, Decimal("18")), (1, Decimal("25"))),
+        ]
+
+        for day, ((position, points), (other_position, other_points)) in enumerate(
+            results, 1
+        ):
+            race = Race.objects.create(
+                circuit=circuit,
+                winner=cls.driver if position == 1 else cls.other,
+                year=2024,
+                laps=53,
+                date=date(2024, 9, day),
+            )
+            Standing.objects.create(
+                race=race,
+                driver=cls.driver,
+                constructor=constructor,
+                position=position,
+                number=16,
+                laps=53,
+                points=points,
+            )
+            Standing.objects.create(
+                race=race,
+                driver=cls.other,
+                constructor=other_constructor,
+                position=other_position,
+                number=4,
+                laps=53,
+                points=other_points,
+            )
+
+    def test_driver_table(self):
+        table = driver_table(compute_championship(2024))
+
+        self.assertEqual(
+            [(row["name"], row["rank"], row["points"]) for row in table],
+            [("Charles Leclerc", 1, 43), ("Lando Norris", 1, 43)],
+        )
+
+    def test_progression(self):
+        championship = compute_championship(2024)
+        progression = driver_progression(championship, self.other.pk)
+
+        self.assertEqual(
+            [(points, rank) for _race, points, rank in progression],
+            [(18, 2), (43, 1)],
+        )
+        self.assertEqual(
+            [row["points"] for row in constructor_table(championship)], [43, 43]
+        )
+
+    def test_empty_season(self):
+        self.assertEqual(driver_table(compute_championship(1950)), [])
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            username="author", email="author@example.com", password="password"
+        )
+        category = Category.objects.create(name="Racing")
+        cls.first, cls.second = (
+            Article.objects.create(
+                title=title, content=title, category=category, author=author
+            )
+            for title in ("First", "Second")
+        )
+
+    def setUp(self):
+        cache.clear()
+
+        # 由测试调用 flush_view_counts，浏览时不自动写入
+        cache.add(view_count_key("interval"), 1, timeout=None)
+
+    def assertViews(self, first, second):
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(
+            (self.first.view_count, self.second.view_count), (first, second)
+        )
+
+    def test_flush(self):
+        for article in (self.first, self.first, self.first, self.second):
+            record_view(article.pk)
+
+        self.assertViews(0, 0)
+        self.assertEqual(flush_view_counts(), 4)
+        self.assertViews(3, 1)
+
+        # 已经写入的次数不会重复计算
+        self.assertEqual(flush_view_counts(), 0)
+        record_view(self.second.pk)
+        self.assertEqual(flush_view_counts(), 1)
+        self.assertViews(3, 2)
+
+    def test_evicted_slot(self):
+        record_view(self.first.pk)
+        record_view(self.second.pk)
+        cache.delete(view_count_key("slot", 1))
+
+        # 丢失的槽位被跳过，后面的槽位照常写入
+        self.assertEqual(flush_view_counts(), 1)
+        self.assertViews(0, 1)
+
+        # 登记标记过期后重新登记，缓存中累积的次数一起写入
+        cache.delete(view_count_key("dirty", self.first.pk))
+        record_view(self.first.pk)
+        self.assertEqual(flush_view_counts(), 2)
+        self.assertViews(2, 1)
+
+    def test_evicted_slot_counter(self):
+        record_view(self.first.pk)
+        self.assertEqual(flush_view_counts(), 1)
+
+        # 槽位计数被淘汰后从 0 重新开始，落在游标之前的槽位下次浏览时重新登记
+        cache.delete(view_count_key("slots"))
+        record_view(self.second.pk)
+        self.assertEqual(flush_view_counts(), 0)
+        record_view(self.second.pk)
+        self.assertEqual(flush_view_counts(), 2)
+        self.assertViews(1, 2)
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(
+            username="author", email="author@example.com", password="password"
+        )
+        cls.category = Category.objects.create(name="Racing")
+
+    def create_article(self, title, **fields):
+        fields.setdefault("status", ContentStatus.PUBLISHED)
+        return Article.objects.create(
+            title=title,
+            content=fields.pop("content", "Race report."),
+            category=self.category,
+            author=self.author,
+            **fields,
+        )
+
+    def search(self, query):
+        return list(
+            search_queryset(Article.objects.all(), query).values_list("pk", flat=True)
+        )
+
+    def test_save(self):
+        article = self.create_article(
+            "Monza", content="<p>Temple of <strong>speed</strong></p>"
+        )
+        draft = self.create_article("Monza draft", status=ContentStatus.DRAFT)
+
+        # 只索引已发布内容，正文去掉 HTML 标签
+        self.assertEqual(self.search("monza"), [article.pk])
+        self.assertEqual(self.search("temple speed"), [article.pk])
+        self.assertEqual(self.search("strong"), [])
+
+        # 最后一个词按前缀匹配
+        self.assertEqual(self.search("mon"), [article.pk])
+
+        draft.status = ContentStatus.PUBLISHED
+        draft.save()
+        self.assertCountEqual(self.search("monza"), [article.pk, draft.pk])
+
+    def test_update(self):
+        article = self.create_article("Monza")
+
+        article.title = "Imola"
+        article.save()
+        self.assertEqual(self.search("monza"), [])
+        self.assertEqual(self.search("imola"), [article.pk])
+
+        article.status = ContentStatus.DRAFT
+        article.save()
+        self.assertEqual(self.search("imola"), [])
+
+    def test_delete(self):
+        article = self.create_article("Monza")
+        article.delete()
+
+        self.assertEqual(self.search("monza"), [])
+
+    def test_rank(self):
+        body = self.create_article("Report", content="Spa weekend recap.")
+        title = self.create_article("Spa", content="Weekend recap.")
+
+        # 标题匹配的权重高于正文
+        ranked = search_queryset(Article.objects.all(), "spa").order_by("-search_rank")
+        self.assertEqual([article.pk for article in ranked], [title.pk, body.pk])
+
+    def test_combined_results(self):
+        article = self.create_article("Suzuka")
+        page = Page.objects.create(
+            title="Suzuka guide",
+            content="Suzuka circuit.",
+            status=ContentStatus.PUBLISHED,
+        )
+        Page.objects.create(title="Suzuka draft", content="Suzuka.")
+
+        results = SearchResults("suzuka")
+        self.assertEqual(len(results), 2)
+        self.assertCountEqual(
+            [(item.result_type, item.pk) for item in results[0:10]],
+            [("article", article.pk), ("page", page.pk)],
+        )
+        self.assertEqual(len(results[1:10]), 1)
+        self.assertEqual(len(SearchResults("!!")), 0)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            username="author", email="author@example.com", password="password"
+        )
+        category = Category.objects.create(name="Racing")
+        published_at = timezone.now()
+
+        # 重复和为空的排序值都需要由主键区分先后
+        for index in range(11):
+            Article.objects.create(
+                title=f"Report {index}",
+                content="Race report.",
+                category=category,
+                author=author,
+                published_at=(
+                    None
+                    if index % 4 == 0
+                    else published_at - timedelta(days=index // 3)
+                ),
+            )
+
+        cls.queryset = Article.objects.order_by("-published_at")
+        cls.expected = list(
+            cls.queryset.order_by("-published_at", "-pk").values_list("pk", flat=True)
+        )
+
+    def page(self, cursor=None):
+        page = KeysetPaginator(self.queryset, 3, cursor=cursor).page()
+        return page, [article.pk for article in page.object_list]
+
+    def test_round_trip(self):
+        page, pks = self.page()
+        self.assertFalse(page.has_previous())
+        pages = [pks]
+
+        while page.has_next():
+            page, pks = self.page(page.next_cursor)
+            pages.append(pks)
+
+        self.assertEqual(len(pages), 4)
+        self.assertEqual([pk for pks in pages for pk in pks], self.expected)
+
+        # 从最后一页往回翻得到相同的页
+        for expected in reversed(pages[:-1]):
+            page, pks = self.page(page.previous_cursor)
+            self.assertEqual(pks, expected)
+
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(self.queryset, 3, cursor="not-a-cursor")
+
+        with self.assertRaises(InvalidPage):
+            paginator.page()
+
+        # get_page 遇到无效游标时回到第一页
+        page = paginator.get_page()
+        self.assertEqual(
+            [article.pk for article in page.object_list], self.expected[:3]
+        )
+
+
+class CategoryTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.racing = Category.objects.create(name="Racing")
+        cls.formula = Category.objects.create(name="Formula", parent=cls.racing)
+        cls.junior = Category.objects.create(name="Junior", parent=cls.formula)
+        cls.rally = Category.objects.create(name="Rally")
+
+    def descendants(self, category):
+        category.refresh_from_db()
+        return [
+            (child.name, child.depth)
+            for child in category.get_descendants(include_self=True)
+        ]
+
+    def test_paths(self):
+        self.assertEqual(
+            self.descendants(self.racing),
+            [("Racing", 0), ("Formula", 1), ("Junior", 2)],
+        )
+        self.assertEqual(self.descendants(self.rally), [("Rally", 0)])
+        self.assertEqual(list(self.junior.get_ancestors()), [self.racing, self.formula])
+
+    def test_move_subtree(self):
+        self.formula.parent = self.rally
+        self.formula.save()
+
+        self.assertEqual(self.descendants(self.racing), [("Racing", 0)])
+        self.assertEqual(
+            self.descendants(self.rally),
+            [("Rally", 0), ("Formula", 1), ("Junior", 2)],
+        )
+
+        # 移动到根分类时整个子树的深度一起减少
+        self.formula.parent = None
+        self.formula.save()
+
+        self.assertEqual(self.descendants(self.rally), [("Rally", 0)])
+        self.assertEqual(
+            self.descendants(self.formula), [("Formula", 0), ("Junior", 1)]
+        )
+        self.junior.refresh_from_db()
+        self.assertEqual(list(self.junior.get_ancestors()), [self.formula])
+
+    def test_move_below_itself(self):
+        self.racing.parent = self.junior
+
+        with self.assertRaises(ValidationError):
+            self.racing.full_clean()
+
+        with self.assertRaises(ValueError):
+            self.racing.save()
+
+        self.assertEqual(
+            self.descendants(self.racing),
+            [("Racing", 0), ("Formula", 1), ("Junior", 2)],
+        )
+
+    def test_rebuild_tree(self):
+        # update() 绕过 save()，路径需要重新计算
+        Category.objects.filter(pk=self.formula.pk).update(parent=self.rally)
+
+        self.assertEqual(Category.objects.rebuild_tree(), 2)
+        self.assertEqual(Category.objects.rebuild_tree(), 0)
+        self.assertEqual(
+            self.descendants(self.rally),
+            [("Rally", 0), ("Formula", 1), ("Junior", 2)],
+        )
+
+
+class UniqueSlugTests(TestCase):
+    def slugs(self, *names):
+        return [Category.objects.create(name=name).slug for name in names]
+
+    def test_suffixes(self):
+        self.assertEqual(
+            self.slugs("Monza", "Monza", "Monza GP", "Monza"),
+            ["monza", "monza-2", "monza-gp", "monza-3"],
+        )
+
+        # 空出的后缀会被重新使用
+        Category.objects.filter(slug="monza-2").delete()
+        self.assertEqual(self.slugs("Monza"), ["monza-2"])
+
+    def test_existing_slug(self):
+        category = Category.objects.create(name="Monza")
+        category.name = "Imola"
+        category.save()
+
+        self.assertEqual(category.slug, "monza")
+
+    def test_transliteration(self):
+        self.assertEqual(
+            self.slugs("上海", "Nürburgring", "!!!", "x" * 300),
+            ["shang-hai", "nurburgring", "category", "x" * (255 - SUFFIX_LENGTH)],
+        )
+
+    def test_assign_unique_slugs(self):
+        Category.objects.create(name="Monza")
+        categories = [
+            Category(name="Monza"),
+            Category(name="Monza", slug="monza-2"),
+            Category(name="Monza"),
+            Category(name="Spa"),
+            Category(name="Spa"),
+        ]
+
+        # 已有的 slug 和同一批中手动指定的 slug 都会避开
+        assign_unique_slugs(categories, "name", "category")
+        self.assertEqual(
+            [category.slug for category in categories],
+            ["monza-3", "monza-2", "monza-4", "spa", "spa-2"],
+        )
+
+
+class PruneHistoryTests(TestCase):
+    policy = {"keep_latest": 2, "compact_after_days": 10, "max_age_days": 100}
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localtime().replace(hour=12, minute=0)
+        cls.category = Category.objects.create(name="Racing")
+
+        # 从旧到新：超过保留期、同一天的两条、最新的两条
+        dates = [
+            today - timedelta(days=200),
+            today - timedelta(days=20, hours=1),
+            today - timedelta(days=20),
+            today - timedelta(days=1),
+            today,
+        ]
+        for index in range(1, len(dates)):
+            cls.category.description = f"Revision {index}"
+            cls.category.save()
+
+        cls.history = list(cls.category.history.order_by("history_id"))
+        for record, history_date in zip(cls.history, dates, strict=True):
+            record.history_date = history_date
+            record.save(update_fields=["history_date"])
+
+        # 只有一条过期记录的对象仍然保留最新的记录
+        cls.archived = Category.objects.create(name="Archived")
+        cls.archived.history.update(history_date=dates[0])
+
+    def remaining(self):
+        return list(
+            Category.history.filter(id=self.category.pk)
+            .order_by("history_id")
+            .values_list("history_id", flat=True)
+        )
+
+    def test_prune(self):
+        history_model = Category.history.model
+
+        self.assertEqual(prune_history(history_model, dry_run=True, **self.policy), 2)
+        self.assertEqual(len(self.remaining()), 5)
+
+        self.assertEqual(prune_history(history_model, **self.policy), 2)
+        self.assertEqual(
+            self.remaining(),
+            [record.history_id for record in self.history[2:]],
+        )
+        self.assertTrue(self.archived.history.exists())
+        self.assertEqual(prune_history(history_model, **self.policy), 0)
+
+    def test_keep_forever(self):
+        policy = {**self.policy, "max_age_days": 0}
+
+        self.assertEqual(prune_history(Category.history.model, **policy), 1)
+        self.assertEqual(
+            self.remaining(),
+            [self.history[0].history_id]
+            + [record.history_id for record in self.history[2:]],
+        )
+
+    def test_command(self):
+        with override_settings(HISTORY_RETENTION=self.policy):
+            call_command("prune_history", "--keep-latest", "5", stdout=StringIO())
+
+        # 命令行参数覆盖设置中的策略
+        self.assertEqual(len(self.remaining()), 5)
+
+        with override_settings(HISTORY_RETENTION=self.policy):
+            call_command("prune_history", stdout=StringIO())
+
+        self.assertEqual(len(self.remaining()), 3)
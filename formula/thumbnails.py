@@ -0,0 +1,133 @@
+import hashlib
+import io
+from functools import cache as memoize
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+THUMBNAIL_DIR = "thumbnails"
+
+THUMBNAIL_CACHE_PREFIX = "thumbnail"
+
+# 格式 -> (Pillow 格式名, MIME 类型)
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+}
+
+
+@memoize
+def available_formats():
+    """配置中当前 Pillow 支持编码的格式"""
+    return [
+        fmt
+        for fmt in settings.THUMBNAIL_FORMATS
+        if fmt in THUMBNAIL_FORMATS and features.check(fmt)
+    ]
+
+
+def thumbnail_name(source_name, width, fmt):
+    # 上传文件本身按内容哈希命名，所以相同内容的缩略图也只生成一次
+    digest = hashlib.sha256(
+        f"{source_name}:{width}:{settings.THUMBNAIL_QUALITY}".encode()
+    ).hexdigest()
+    return f"{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{width}w.{fmt}"
+
+
+def _cache_key(source_name, width, fmt):
+    return f"{THUMBNAIL_CACHE_PREFIX}:{thumbnail_name(source_name, width, fmt)}"
+
+
+def generate_thumbnail(source_name, width, fmt, storage=default_storage):
+    """生成缩略图并返回应当提供的文件名，无法处理的文件返回原文件"""
+    name = thumbnail_name(source_name, width, fmt)
+
+    if not storage.exists(name):
+        try:
+            with storage.open(source_name, "rb") as file, Image.open(file) as image:
+                image = ImageOps.exif_transpose(image)
+
+                # 只缩小不放大，保持宽高比
+                image.thumbnail((width, width * 10))
+
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+                output = io.BytesIO()
+                image.save(
+                    output,
+                    THUMBNAIL_FORMATS[fmt][0],
+                    quality=settings.THUMBNAIL_QUALITY,
+                )
+        # 像素过多的图片可能是解压炸弹，同样提供原文件
+        except (
+            UnidentifiedImageError,
+            Image.DecompressionBombError,
+            OSError,
+            ValueError,
+        ):
+            name = source_name
+        else:
+            name = storage.save(name, ContentFile(output.getvalue()))
+
+    cache.set(_cache_key(source_name, width, fmt), name, timeout=None)
+    return name
+
+
+def delete_thumbnails(source_name, storage=default_storage):
+    """删除某个文件的所有缩略图"""
+    keys = []
+
+    for width in settings.THUMBNAIL_SIZES:
+        for fmt in THUMBNAIL_FORMATS:
+            storage.delete(thumbnail_name(source_name, width, fmt))
+            keys.append(_cache_key(source_name, width, fmt))
+
+    cache.delete_many(keys)
+
+
+def _thumbnail_urls(file, widths, fmt):
+    formats = available_formats()
+
+    if not formats:
+        return dict.fromkeys(widths, file.url)
+
+    fmt = fmt if fmt in formats else formats[0]
+    keys = {width: _cache_key(file.name, width, fmt) for width in widths}
+    names = cache.get_many(list(keys.values()))
+    urls = {}
+
+    for width, key in keys.items():
+        if key in names:
+            urls[width] = file.storage.url(names[key])
+        else:
+            urls[width] = reverse(
+                "thumbnail", kwargs={"width": width, "fmt": fmt, "name": file.name}
+            )
+
+    return urls
+
+
+def thumbnail_url(file, width, fmt=None):
+    """返回缩略图地址；还没有生成时指向按需生成的视图"""
+    if not file:
+        return ""
+
+    # 使用不小于所需宽度的最小尺寸
+    width = min(
+        (size for size in settings.THUMBNAIL_SIZES if size >= width),
+        default=max(settings.THUMBNAIL_SIZES),
+    )
+    return _thumbnail_urls(file, [width], fmt)[width]
+
+
+def srcset(file, fmt=None):
+    if not file:
+        return ""
+
+    urls = _thumbnail_urls(file, settings.THUMBNAIL_SIZES, fmt)
+    return ", ".join(f"{url} {width}w" for width, url in urls.items())
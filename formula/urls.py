@@ -1,8 +1,8 @@
 from django.conf import settings
 from django.conf.urls.i18n import i18n_patterns
-from django.conf.urls.static import static
 from django.urls import include, path
 
+from formula.serving import serve_media
 from formula.sites import formula_admin_site
 from formula.views import (
     HomeView,
@@ -24,6 +24,7 @@ from formula.views import (
     # Media Views
     MediaUploadView,
     MediaBrowserView,
+    thumbnail_view,
 )
 
 urlpatterns = (
@@ -54,9 +55,10 @@ urlpatterns = (
         # Media URLs
         path("admin/formula/media/upload/", MediaUploadView.as_view(), name="media_upload"),
         path("admin/formula/media/browser/", MediaBrowserView.as_view(), name="media_browser"),
+        path("thumbnails/<int:width>/<str:fmt>/<path:name>", thumbnail_view, name="thumbnail"),
+        path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name="media"),
     ]
     + i18n_patterns(
         path("admin/", formula_admin_site.urls),
     )
-    + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 )
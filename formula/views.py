@@ -1,21 +1,26 @@
 import json
-import random
-from functools import lru_cache
 
 from django.contrib import messages
 from django.contrib.humanize.templatetags.humanize import intcomma
+from django.template.defaultfilters import floatformat
 from django.forms import modelformset_factory
 from django.urls import reverse_lazy
-from django.utils.safestring import mark_safe
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import FormView, RedirectView, ListView, DetailView, TemplateView
 from django.views.generic.edit import CreateView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q
 from unfold.views import UnfoldModelAdminViewMixin
 
+from formula.caching import CachedPageMixin
+from formula.championship import driver_progression, driver_table, get_championship
+from formula.counters import record_view
+from formula.metrics import change, get_metrics, progress
+from formula.rollups import ARTICLE_VIEWS, read_rollups
+from formula.navigation import NAVIGATION_NAMESPACES, get_navigation
+from formula.paginator import CURSOR_VAR, KeysetPaginationMixin, KeysetPaginator
 from formula.forms import (
     CustomForm,
     CustomHorizontalForm,
@@ -28,7 +33,8 @@ from formula.forms import (
     NewsletterForm,
     SearchForm,
 )
-from formula.models import Driver, Article, Category, Page, Contact, Inquiry, Message, ContentStatus
+from formula.models import Driver, Article, Category, Page, Contact, Inquiry, Message, ContentStatus, RelatedArticle, RollupPeriod
+from formula.search import SearchResults, search_queryset
 
 
 class HomeView(RedirectView):
@@ -100,27 +106,127 @@ class CrispyFormsetView(UnfoldModelAdminViewMixin, FormView):
 
 
 def dashboard_callback(request, context):
-    context.update(random_data())
+    context.update(dashboard_data())
+    context.update(championship_data(get_championship()))
+    context["kpi"] = dashboard_kpi(get_metrics())
     return context
 
 
-@lru_cache
-def random_data():
-    WEEKDAYS = [
-        "Mon",
-        "Tue",
-        "Wed",
-        "Thu",
-        "Fri",
-        "Sat",
-        "Sun",
+def dashboard_kpi(metrics):
+    return [
+        {
+            "title": title,
+            "metric": intcomma(metrics[key]["recent"]),
+            "footer": _trend_footer(
+                metrics[key]["recent"],
+                metrics[key]["previous"],
+                _("change from previous week"),
+            ),
+        }
+        for title, key in (
+            (_("Published articles"), "articles"),
+            (_("New inquiries"), "inquiries"),
+            (_("New messages"), "messages"),
+        )
     ]
 
-    positive = [[1, random.randrange(8, 28)] for i in range(1, 28)]
-    negative = [[-1, -random.randrange(8, 28)] for i in range(1, 28)]
-    average = [r[1] - random.randint(3, 5) for r in positive]
-    performance_positive = [[1, random.randrange(8, 28)] for i in range(1, 28)]
-    performance_negative = [[-1, -random.randrange(8, 28)] for i in range(1, 28)]
+
+# 积分走势图显示的车手数量
+CHAMPIONSHIP_LEADERS = 5
+
+
+def _rank_change(change):
+    if not change:
+        return "-"
+
+    return f"{change:+d}"
+
+
+def championship_data(championship):
+    """最近赛季的车手积分榜和领先车手的积分走势"""
+    table = driver_table(championship)
+    leaders = table[:CHAMPIONSHIP_LEADERS]
+    colors = [
+        "var(--color-primary-700)",
+        "var(--color-primary-500)",
+        "var(--color-primary-300)",
+        "var(--color-gray-500)",
+        "var(--color-gray-300)",
+    ]
+
+    return {
+        "championship_season": championship.season,
+        "championship_table": {
+            "headers": [_("Pos"), _("Driver"), _("Points"), _("Wins"), _("Change")],
+            "rows": [
+                [
+                    row["rank"],
+                    row["name"],
+                    floatformat(row["points"], -1),
+                    row["wins"],
+                    _rank_change(row["change"]),
+                ]
+                for row in table
+            ],
+        },
+        "championship_chart": json.dumps(
+            {
+                "labels": [
+                    championship.labels["races"][race] for race in championship.races
+                ],
+                "datasets": [
+                    {
+                        "label": row["name"],
+                        "data": [
+                            float(points)
+                            for _race, points, _rank in driver_progression(
+                                championship, row["driver"]
+                            )
+                        ],
+                        "borderColor": color,
+                    }
+                    for row, color in zip(leaders, colors, strict=False)
+                ],
+            }
+        ),
+    }
+
+
+DASHBOARD_DAYS = 28
+
+DASHBOARD_WEEKS = 8
+
+
+def _trend_footer(recent, previous, label):
+    trend, percentage = progress(change(recent, previous))
+    color = {
+        "positive": "text-green-700 dark:text-green-400",
+        "negative": "text-red-700 dark:text-red-400",
+    }.get(trend, "text-gray-500")
+
+    return format_html(
+        '<strong class="{} font-semibold">{}</strong>&nbsp;{}',
+        color,
+        percentage,
+        label,
+    )
+
+
+def dashboard_data():
+    """仪表盘的图表和表格，全部从按天和按周的汇总读取"""
+    days, daily = read_rollups(
+        [ARTICLE_VIEWS, "points", "contacts", "inquiries", "messages"],
+        RollupPeriod.DAY,
+        DASHBOARD_DAYS,
+    )
+    weeks, weekly = read_rollups(
+        [ARTICLE_VIEWS, "points"], RollupPeriod.WEEK, DASHBOARD_WEEKS * 2
+    )
+    labels = [day.strftime("%b %d") for day in days]
+
+    recent_views = weekly[ARTICLE_VIEWS][DASHBOARD_WEEKS:]
+    previous_views = weekly[ARTICLE_VIEWS][:DASHBOARD_WEEKS]
+    most_views = max(recent_views)
 
     return {
         "navigation": [
@@ -135,95 +241,39 @@ def random_data():
                 "link": "#",
             },
         ],
-        "kpi": [
-            {
-                "title": "Product A Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")}%</strong>&nbsp;progress from last week'
-                ),
-                "chart": json.dumps(
-                    {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
-                        "datasets": [{"data": average, "borderColor": "#9333ea"}],
-                    }
-                ),
-            },
-            {
-                "title": "Product B Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")}%</strong>&nbsp;progress from last week'
-                ),
-            },
-            {
-                "title": "Product C Performance",
-                "metric": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "footer": mark_safe(
-                    f'<strong class="text-green-700 font-semibold dark:text-green-400">+{intcomma(f"{random.uniform(1, 9):.02f}")}%</strong>&nbsp;progress from last week'
-                ),
-            },
-        ],
+        "views_total": intcomma(f"{sum(recent_views):.0f}"),
+        "views_footer": _trend_footer(
+            sum(recent_views), sum(previous_views), _("compared to the 8 weeks before")
+        ),
         "progress": [
             {
-                "title": "Social marketing e-book",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Freelancing tasks",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Development coaching",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Product consulting",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Other income",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Course sales",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Ads revenue",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
-            {
-                "title": "Customer Retention Rate",
-                "description": f"${intcomma(f'{random.uniform(1000, 9999):.02f}')}",
-                "value": random.randint(10, 90),
-            },
+                "title": week.strftime("%B %d, %Y"),
+                "description": _("%(views)s views")
+                % {"views": intcomma(f"{views:.0f}")},
+                "value": round(views * 100 / most_views) if most_views else 0,
+            }
+            for week, views in zip(
+                reversed(weeks[DASHBOARD_WEEKS:]), reversed(recent_views), strict=True
+            )
         ],
         "chart": json.dumps(
             {
-                "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
+                "labels": labels,
                 "datasets": [
                     {
-                        "label": "Example 1",
+                        "label": str(_("Article views")),
                         "type": "line",
-                        "data": average,
+                        "data": [float(value) for value in daily[ARTICLE_VIEWS]],
                         "borderColor": "var(--color-primary-500)",
                     },
                     {
-                        "label": "Example 2",
-                        "data": positive,
+                        "label": str(_("Inquiries")),
+                        "data": [float(value) for value in daily["inquiries"]],
                         "backgroundColor": "var(--color-primary-700)",
                     },
                     {
-                        "label": "Example 3",
-                        "data": negative,
+                        "label": str(_("Messages")),
+                        "data": [float(value) for value in daily["messages"]],
                         "backgroundColor": "var(--color-primary-300)",
                     },
                 ],
@@ -231,52 +281,43 @@ def random_data():
         ),
         "performance": [
             {
-                "title": _("Last week revenue"),
-                "metric": "$1,234.56",
-                "footer": mark_safe(
-                    '<strong class="text-green-600 font-medium">+3.14%</strong>&nbsp;progress from last week'
+                "title": title,
+                "metric": intcomma(f"{weekly[name][-1]:.0f}"),
+                "footer": _trend_footer(
+                    weekly[name][-1], weekly[name][-2], _("compared to last week")
                 ),
                 "chart": json.dumps(
                     {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
+                        "labels": labels,
                         "datasets": [
                             {
-                                "data": performance_positive,
-                                "borderColor": "var(--color-primary-700)",
+                                "data": [float(value) for value in daily[name]],
+                                "borderColor": color,
                             }
                         ],
                     }
                 ),
-            },
-            {
-                "title": _("Last week expenses"),
-                "metric": "$1,234.56",
-                "footer": mark_safe(
-                    '<strong class="text-green-600 font-medium">+3.14%</strong>&nbsp;progress from last week'
-                ),
-                "chart": json.dumps(
-                    {
-                        "labels": [WEEKDAYS[day % 7] for day in range(1, 28)],
-                        "datasets": [
-                            {
-                                "data": performance_negative,
-                                "borderColor": "var(--color-primary-300)",
-                            }
-                        ],
-                    }
+            }
+            for title, name, color in (
+                (
+                    _("Article views this week"),
+                    ARTICLE_VIEWS,
+                    "var(--color-primary-700)",
                 ),
-            },
+                (_("Points this week"), "points", "var(--color-primary-300)"),
+            )
         ],
         "table_data": {
-            "headers": [_("Day"), _("Income"), _("Expenses")],
+            "headers": [_("Day"), _("Contacts"), _("Inquiries"), _("Messages")],
             "rows": [
-                ["22-10-2025", "$2,341.89", "$1,876.45"],
-                ["23-10-2025", "$1,987.23", "$2,109.67"],
-                ["24-10-2025", "$3,456.78", "$1,543.21"],
-                ["25-10-2025", "$1,765.43", "$2,987.65"],
-                ["26-10-2025", "$2,876.54", "$1,234.56"],
-                ["27-10-2025", "$1,543.21", "$2,765.43"],
-                ["28-10-2025", "$3,210.98", "$1,987.65"],
+                [
+                    day.strftime("%d-%m-%Y"),
+                    *[
+                        intcomma(f"{daily[name][index]:.0f}")
+                        for name in ("contacts", "inquiries", "messages")
+                    ],
+                ]
+                for index, day in reversed(list(enumerate(days))[-7:])
             ],
         },
     }
@@ -286,8 +327,9 @@ def random_data():
 # CMS Views
 ######################################################################
 
-class ArticleListView(ListView):
+class ArticleListView(CachedPageMixin, KeysetPaginationMixin, ListView):
     """文章列表视图"""
+    cache_namespaces = ("article", "category")
     model = Article
     template_name = "formula/cms/article_list.html"
     context_object_name = "articles"
@@ -304,22 +346,18 @@ class ArticleListView(ListView):
         # 搜索过滤
         search_query = self.request.GET.get("q")
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query) |
-                Q(excerpt__icontains=search_query)
+            queryset = search_queryset(queryset, search_query).order_by(
+                "-search_rank", "-published_at"
             )
         
         return queryset.select_related("category", "author").prefetch_related("tags")
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["categories"] = Category.objects.filter(is_active=True)
+        navigation = get_navigation()
+        context["categories"] = navigation["categories"]
         context["search_form"] = SearchForm(self.request.GET)
-        context["featured_articles"] = Article.objects.filter(
-            status=ContentStatus.PUBLISHED,
-            is_featured=True
-        )[:5]
+        context["featured_articles"] = navigation["featured_articles"][:5]
         return context
 
 
@@ -336,59 +374,85 @@ class ArticleDetailView(DetailView):
     
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        # 增加浏览次数
-        obj.view_count += 1
-        obj.save(update_fields=["view_count"])
+        # 增加浏览次数（缓冲后批量写入）
+        record_view(obj.pk)
         return obj
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        article = self.get_object()
+        # 复用 get() 中已经加载的对象，避免重复查询和重复计数
+        article = self.object
+        articles = Article.objects.filter(
+            status=ContentStatus.PUBLISHED
+        ).exclude(id=article.id).select_related("category", "author")
         
-        # 相关文章
-        context["related_articles"] = Article.objects.filter(
-            status=ContentStatus.PUBLISHED,
-            category=article.category
-        ).exclude(id=article.id)[:3]
+        # 相关文章由后台任务预先计算，新文章还没有计算时退回到同分类的文章
+        related_articles = [
+            link.related
+            for link in RelatedArticle.objects.filter(
+                article_id=article.pk, related__status=ContentStatus.PUBLISHED
+            ).select_related("related__category", "related__author")[:3]
+        ]
+        context["related_articles"] = related_articles or articles.filter(
+            category_id=article.category_id
+        )[:3]
         
         # 最新文章
-        context["latest_articles"] = Article.objects.filter(
-            status=ContentStatus.PUBLISHED
-        ).exclude(id=article.id)[:5]
+        context["latest_articles"] = articles[:5]
         
         return context
 
 
-class CategoryDetailView(DetailView):
+class CategoryDetailView(CachedPageMixin, DetailView):
     """分类详情视图"""
+    cache_namespaces = ("article", "category")
     model = Category
     template_name = "formula/cms/category_detail.html"
     context_object_name = "category"
     
+    # ?subcategories=1 时同时列出所有下级分类的文章
+    subcategories_var = "subcategories"
+    
     def get_queryset(self):
         return Category.objects.filter(is_active=True)
     
+    def include_subcategories(self):
+        return self.request.GET.get(self.subcategories_var) == "1"
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        category = self.get_object()
+        category = self.object
+        include_subcategories = self.include_subcategories()
         
-        # 分页文章列表
-        articles = Article.objects.filter(
-            status=ContentStatus.PUBLISHED,
-            category=category
-        ).select_related("author").prefetch_related("tags")
+        # 分页文章列表（游标分页）
+        articles = Article.objects.filter(status=ContentStatus.PUBLISHED)
         
-        paginator = Paginator(articles, 10)
-        page_number = self.request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
+        if include_subcategories:
+            # 子树按路径范围查询，不需要递归
+            articles = articles.filter(
+                category__in=category.get_descendants(include_self=True).filter(is_active=True)
+            )
+        else:
+            articles = articles.filter(category=category)
+        
+        articles = articles.select_related("author", "category").prefetch_related("tags")
+        
+        paginator = KeysetPaginator(
+            articles, 10, cursor=self.request.GET.get(CURSOR_VAR)
+        )
+        page_obj = paginator.get_page()
         
         context["page_obj"] = page_obj
         context["articles"] = page_obj.object_list
+        context["ancestors"] = category.get_ancestors().filter(is_active=True)
+        context["subcategories"] = category.children.filter(is_active=True)
+        context["include_subcategories"] = include_subcategories
         return context
 
 
-class PageDetailView(DetailView):
+class PageDetailView(CachedPageMixin, DetailView):
     """页面详情视图"""
+    cache_namespaces = ("page", *NAVIGATION_NAMESPACES)
     model = Page
     template_name = "formula/cms/page_detail.html"
     context_object_name = "page"
@@ -404,20 +468,19 @@ class PageDetailView(DetailView):
         return super().get_object(queryset)
 
 
-class HomePageView(TemplateView):
+class HomePageView(CachedPageMixin, TemplateView):
     """首页视图"""
+    cache_namespaces = ("article", "category")
     template_name = "formula/cms/home.html"
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["featured_articles"] = Article.objects.filter(
-            status=ContentStatus.PUBLISHED,
-            is_featured=True
-        )[:6]
+        navigation = get_navigation()
+        context["featured_articles"] = navigation["featured_articles"][:6]
         context["latest_articles"] = Article.objects.filter(
             status=ContentStatus.PUBLISHED
-        )[:10]
-        context["categories"] = Category.objects.filter(is_active=True).exclude(slug__isnull=True).exclude(slug="")[:8]
+        ).select_related("author")[:10]
+        context["categories"] = navigation["categories"][:8]
         return context
 
 
@@ -540,22 +603,8 @@ def search_view(request):
     if form.is_valid():
         query = form.cleaned_data["q"]
         if query:
-            # 搜索文章
-            articles = Article.objects.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(excerpt__icontains=query),
-                status=ContentStatus.PUBLISHED
-            ).select_related("category", "author")
-            
-            # 搜索页面
-            pages = Page.objects.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query),
-                status=ContentStatus.PUBLISHED
-            )
-            
-            results = list(articles) + list(pages)
+            # 文章和页面在数据库中合并排序，只加载当前页
+            results = SearchResults(query)
     
     # 分页
     paginator = Paginator(results, 10)
@@ -579,7 +628,12 @@ def search_view(request):
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
-from formula.models import Media
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404
+from formula.models import Media, MediaKind
+from formula.storage import HashingTemporaryFileUploadHandler
+from formula.thumbnails import available_formats, generate_thumbnail
 import os
 
 
@@ -588,6 +642,9 @@ class MediaUploadView(View):
     """媒体文件上传视图"""
     
     def post(self, request, *args, **kwargs):
+        # 上传内容分块写入磁盘并同时计算哈希，必须在读取 request.FILES 之前设置
+        request.upload_handlers = [HashingTemporaryFileUploadHandler(request)]
+        
         try:
             if 'file' not in request.FILES:
                 return JsonResponse({
@@ -612,7 +669,8 @@ class MediaUploadView(View):
                     'title': media.title,
                     'url': media.file.url,
                     'file_type': media.file_type,
-                    'file_size': media.file_size
+                    'file_size': media.file_size,
+                    'checksum': media.checksum
                 }
             })
             
@@ -633,15 +691,10 @@ class MediaBrowserView(ListView):
     def get_queryset(self):
         queryset = Media.objects.all().order_by('-created_at')
         
-        # 按文件类型过滤
+        # 按文件类型过滤（media_kind, created_at 复合索引）
         file_type = self.request.GET.get('file_type')
-        if file_type:
-            if file_type == 'image':
-                queryset = queryset.filter(file_type__in=['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'])
-            elif file_type == 'video':
-                queryset = queryset.filter(file_type__in=['.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv'])
-            elif file_type == 'audio':
-                queryset = queryset.filter(file_type__in=['.mp3', '.wav', '.ogg', '.aac', '.flac', '.wma'])
+        if file_type in MediaKind.values:
+            queryset = queryset.filter(media_kind=file_type)
         
         return queryset
     
@@ -649,3 +702,14 @@ class MediaBrowserView(ListView):
         context = super().get_context_data(**kwargs)
         context['file_type'] = self.request.GET.get('file_type', '')
         return context
+
+
+def thumbnail_view(request, width, fmt, name):
+    """按需生成缩略图，然后重定向到生成的文件"""
+    if width not in settings.THUMBNAIL_SIZES or fmt not in available_formats():
+        raise Http404
+    
+    if not default_storage.exists(name):
+        raise Http404
+    
+    return redirect(default_storage.url(generate_thumbnail(name, width, fmt)))